@@ -1,7 +1,82 @@
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
-from .models import Ministry, Department, Complaint, ComplaintUpdate, UserProfile
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Exists, OuterRef, Prefetch
+from django.forms.models import BaseInlineFormSet
+from django.http import FileResponse, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.functional import cached_property
+from django.utils.html import format_html
+from . import short_codes
+from .events import acting_as
+from .models import (
+    Ministry, Department, Complaint, ComplaintUpdate, UserProfile, RoutingRule, OutboxEvent,
+    WebhookEndpoint, WebhookDelivery, RequestProfile, MinistryReport,
+)
+
+
+# --- Changelist helpers ---
+class EstimatedCountPaginator(Paginator):
+    """
+    On PostgreSQL, uses the planner's row estimate (pg_class.reltuples for the
+    whole table, EXPLAIN for filtered lists) instead of COUNT(*) once it exceeds
+    ADMIN_ESTIMATED_COUNT_THRESHOLD. Small results are still counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        threshold = getattr(settings, 'ADMIN_ESTIMATED_COUNT_THRESHOLD', 100000)
+        if connections[queryset.db].vendor == 'postgresql':
+            estimate = self.estimate(queryset)
+            if estimate is not None and estimate > threshold:
+                return estimate
+        return super().count
+
+    def estimate(self, queryset):
+        with connections[queryset.db].cursor() as cursor:
+            if not queryset.query.where:
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                               [queryset.model._meta.db_table])
+                row = cursor.fetchone()
+                # -1 means the table has never been analyzed
+                return row[0] if row and row[0] >= 0 else None
+            sql, params = queryset.order_by().query.get_compiler(using=queryset.db).as_sql()
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+            return int(plan[0]['Plan']['Plan Rows'])
+
+
+class ScalableChangeListMixin:
+    """
+    Large-table changelists: estimated counts and no second unfiltered COUNT(*).
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+def uuid_search(queryset, field, term, code_field=None):
+    """
+    Matches a short code (`code_field`, as quoted to the phone desk: "K3M9-QX7T"),
+    a full UUID exactly, or a hex prefix (as quoted by citizens before short codes:
+    "3f2a9c1b") as an index range scan instead of a LIKE over the whole table.
+    Returns None when `term` is none of those (or an unknown short code), so
+    the default search still runs: many usernames are valid short codes.
+    """
+    code = short_codes.normalize(term) if code_field else None
+    if code:
+        matched = queryset.filter(**{code_field: code})
+        if matched.exists():
+            return matched
+    bounds = short_codes.uuid_prefix_range(term)
+    if bounds is None:
+        return None
+    return queryset.filter(**{f'{field}__range': bounds})
 
 
 # --- User Admin ---
@@ -44,18 +119,60 @@ class DepartmentAdmin(admin.ModelAdmin):
     list_filter = ('ministry',)
 
 
+@admin.register(RoutingRule)
+class RoutingRuleAdmin(admin.ModelAdmin):
+    list_display = ('pattern', 'kind', 'department', 'weight', 'is_active', 'updated_at')
+    list_filter = ('kind', 'is_active', 'department__ministry')
+    list_select_related = ('department', 'department__ministry')
+    search_fields = ('pattern', 'department__name')
+    autocomplete_fields = ('department',)
+
+
 # --- Complaint Admins ---
+class LatestUpdatesFormSet(BaseInlineFormSet):
+    """
+    Only the newest ADMIN_INLINE_UPDATES_LIMIT updates are rendered inline;
+    the full history is linked from the complaint page.
+    """
+
+    def get_queryset(self):
+        if not hasattr(self, '_latest'):
+            limit = getattr(settings, 'ADMIN_INLINE_UPDATES_LIMIT', 20)
+            self._latest = super().get_queryset().select_related('user', 'complaint')[:limit]
+        return self._latest
+
+
 class ComplaintUpdateInline(admin.TabularInline):
     model = ComplaintUpdate
+    formset = LatestUpdatesFormSet
     extra = 0
     readonly_fields = ('user', 'update_text', 'created_at')
     can_delete = False
 
 
+class MinistryListFilter(admin.SimpleListFilter):
+    """
+    Ministry filter as an EXISTS over the through table, so the changelist
+    needs neither a join nor DISTINCT.
+    """
+    title = 'ministry'
+    parameter_name = 'ministry'
+
+    def lookups(self, request, model_admin):
+        return list(Ministry.objects.order_by('name').values_list('id', 'name'))
+
+    def queryset(self, request, queryset):
+        if not self.value():
+            return queryset
+        through = Complaint.ministries.through
+        return queryset.filter(Exists(through.objects.filter(complaint_id=OuterRef('pk'), ministry_id=self.value())))
+
+
 @admin.register(Complaint)
-class ComplaintAdmin(admin.ModelAdmin):
+class ComplaintAdmin(ScalableChangeListMixin, admin.ModelAdmin):
     list_display = (
         'tracking_id',
+        'short_code',
         'title',
         'status',
         'created_by',
@@ -63,23 +180,214 @@ class ComplaintAdmin(admin.ModelAdmin):
         'created_at',
         'ai_suggested_priority'
     )
-    search_fields = ('title', 'tracking_id', 'created_by__username', 'ministries__name')
-    list_filter = ('status', 'ministries', 'ai_suggested_priority')
+    list_select_related = ('created_by',)
+    list_filter = ('status', MinistryListFilter, 'ai_suggested_priority')
+    ordering = ('-created_at',)
+    # Indexed lookups only: a full LIKE over title/ministry names times out on large tables
+    search_fields = ('=created_by__username',)
+    search_help_text = 'Short code, tracking ID (or its first 8+ characters), exact username, or "title:<words>".'
     readonly_fields = (
-        'tracking_id', 'created_by', 'created_at', 'updated_at',
-        'ai_suggested_category', 'ai_suggested_priority'
+        'tracking_id', 'short_code', 'created_by', 'created_at', 'updated_at',
+        'ai_suggested_category', 'ai_suggested_priority', 'ai_triage_source',
+        'resolved_at', 'due_at', 'escalated_at', 'reopened_at', 'routing_suggestions', 'all_updates'
     )
     inlines = [ComplaintUpdateInline]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(
+            Prefetch('ministries', queryset=Ministry.objects.only('id', 'name'))
+        )
+
+    def formfield_for_manytomany(self, db_field, request, **kwargs):
+        if db_field.name == 'departments':
+            # Department.__str__ includes the ministry name
+            kwargs['queryset'] = Department.objects.select_related('ministry')
+        return super().formfield_for_manytomany(db_field, request, **kwargs)
+
+    def save_model(self, request, obj, form, change):
+        # Status changes made here are attributed to the admin in the event log
+        with acting_as(request.user):
+            super().save_model(request, obj, form, change)
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if term.lower().startswith('title:'):
+            # Explicit (unindexed) title search
+            return queryset.filter(title__icontains=term[6:].strip()), False
+        matched = uuid_search(queryset, 'tracking_id', term, code_field='short_code')
+        if matched is not None:
+            return matched, False
+        return super().get_search_results(request, queryset, search_term)
+
     # Custom method to display M2M field in list
     def get_ministries(self, obj):
         return ", ".join([m.name for m in obj.ministries.all()])
 
     get_ministries.short_description = 'Ministries'
 
+    @admin.display(description='Update history')
+    def all_updates(self, obj):
+        if obj.pk is None:
+            return '-'
+        url = reverse('admin:complaints_complaintupdate_changelist') + f'?complaint={obj.pk}'
+        return format_html('<a href="{}">{} update(s)</a>', url, obj.updates.count())
+
 
 @admin.register(ComplaintUpdate)
-class ComplaintUpdateAdmin(admin.ModelAdmin):
+class ComplaintUpdateAdmin(ScalableChangeListMixin, admin.ModelAdmin):
     list_display = ('complaint', 'user', 'created_at')
-    search_fields = ('complaint__tracking_id', 'user__username')
-    readonly_fields = ('complaint', 'user', 'update_text', 'created_at')
\ No newline at end of file
+    list_select_related = ('complaint', 'user')
+    search_fields = ('=user__username',)
+    search_help_text = 'Complaint short code, tracking ID (or its first 8+ characters) or exact username.'
+    readonly_fields = ('complaint', 'user', 'update_text', 'created_at')
+
+    def get_search_results(self, request, queryset, search_term):
+        matched = uuid_search(queryset, 'complaint_id', search_term.strip(), code_field='complaint__short_code')
+        if matched is not None:
+            return matched, False
+        return super().get_search_results(request, queryset, search_term)
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ('event_type', 'status', 'attempts', 'available_at', 'created_at', 'sent_at')
+    list_filter = ('status', 'event_type')
+    search_fields = ('idempotency_key',)
+    readonly_fields = [f.name for f in OutboxEvent._meta.fields]
+    actions = ['retry_now']
+
+    @admin.action(description='Retry selected events now')
+    def retry_now(self, request, queryset):
+        from django.utils import timezone
+        updated = queryset.exclude(status='SENT').update(status='PENDING', available_at=timezone.now())
+        self.message_user(request, f"{updated} event(s) queued for the relay.")
+
+
+@admin.register(WebhookEndpoint)
+class WebhookEndpointAdmin(admin.ModelAdmin):
+    list_display = ('ministry', 'url', 'is_active', 'max_concurrency', 'batch_size', 'last_success_at')
+    list_filter = ('is_active', 'ministry')
+    list_select_related = ('ministry',)
+    readonly_fields = ('last_success_at', 'last_error', 'created_at')
+
+
+@admin.register(WebhookDelivery)
+class WebhookDeliveryAdmin(ScalableChangeListMixin, admin.ModelAdmin):
+    list_display = ('endpoint', 'event_id', 'status', 'attempts', 'available_at', 'response_status', 'sent_at')
+    list_filter = ('status', 'endpoint')
+    list_select_related = ('endpoint', 'endpoint__ministry')
+    readonly_fields = [f.name for f in WebhookDelivery._meta.fields]
+    actions = ['requeue']
+
+    @admin.action(description='Requeue selected deliveries (dead-letter queue)')
+    def requeue(self, request, queryset):
+        from .webhooks import requeue
+        updated = requeue(queryset)
+        self.message_user(request, f"{updated} delivery(ies) queued again.")
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'kind', 'name', 'method', 'path', 'user', 'status_code',
+                    'duration_ms', 'sql_count', 'sql_ms', 'download')
+    list_filter = ('kind', 'error')
+    list_select_related = ('user',)
+    search_fields = ('name', 'path')
+    date_hierarchy = 'created_at'
+    exclude = ('stats', 'queries', 'summary')
+    readonly_fields = ('kind', 'name', 'method', 'path', 'user', 'status_code', 'error', 'duration_ms',
+                       'sql_count', 'sql_ms', 'created_at', 'download', 'profile_summary', 'sql_trace')
+
+    def get_queryset(self, request):
+        # The pstats blob and SQL trace are only needed on the detail page
+        queryset = super().get_queryset(request)
+        return queryset.defer('stats', 'queries', 'summary') if request.resolver_match.url_name.endswith(
+            '_changelist') else queryset
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path('<int:pk>/download/', self.admin_site.admin_view(self.download_view),
+                 name='complaints_requestprofile_download'),
+        ] + super().get_urls()
+
+    def download_view(self, request, pk):
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        # admin_view only checks is_staff; the trace can hold SQL parameters
+        if not self.has_view_permission(request, profile):
+            raise PermissionDenied
+        if request.GET.get('format') == 'sql':
+            response = JsonResponse(profile.queries, safe=False, json_dumps_params={'indent': 2})
+            response['Content-Disposition'] = f'attachment; filename="profile-{pk}-sql.json"'
+            return response
+        # Open with `python -m pstats profile-N.prof` or snakeviz
+        response = HttpResponse(bytes(profile.stats), content_type='application/octet-stream')
+        response['Content-Disposition'] = f'attachment; filename="profile-{pk}.prof"'
+        return response
+
+    @admin.display(description='Download')
+    def download(self, obj):
+        url = reverse('admin:complaints_requestprofile_download', args=[obj.pk])
+        return format_html('<a href="{}">.prof</a> | <a href="{}?format=sql">SQL</a>', url, url)
+
+    @admin.display(description='Profile (cumulative)')
+    def profile_summary(self, obj):
+        return format_html('<pre style="font-size:11px">{}</pre>', obj.summary)
+
+    @admin.display(description='SQL')
+    def sql_trace(self, obj):
+        ordered = sorted(obj.queries, key=lambda q: -q['ms'])
+        lines = '\n\n'.join(f"[{q['ms']:.2f} ms, {q['db']}] {q['sql']}  -- {q['params']}" for q in ordered)
+        return format_html('<pre style="font-size:11px; white-space:pre-wrap">{} statements, slowest first\n\n{}</pre>',
+                           len(obj.queries), lines)
+
+
+@admin.register(MinistryReport)
+class MinistryReportAdmin(admin.ModelAdmin):
+    list_display = ('ministry', 'period', 'format', 'status', 'size', 'row_count', 'generated_at', 'checked_at',
+                    'download')
+    list_filter = ('status', 'format', 'ministry')
+    list_select_related = ('ministry',)
+    date_hierarchy = 'period'
+    exclude = ('file',)
+    readonly_fields = ('ministry', 'period', 'format', 'status', 'fingerprint', 'download', 'size', 'row_count',
+                       'requested_by', 'requested_at', 'checked_at', 'generated_at', 'build_ms', 'error')
+    actions = ['refresh']
+
+    def has_add_permission(self, request):
+        return False  # Requested through the API or the refresh action
+
+    def get_urls(self):
+        return [
+            path('<int:pk>/download/', self.admin_site.admin_view(self.download_view),
+                 name='complaints_ministryreport_download'),
+        ] + super().get_urls()
+
+    def download_view(self, request, pk):
+        from .reports import CONTENT_TYPES, filename
+
+        report = get_object_or_404(MinistryReport.objects.select_related('ministry'), pk=pk, file__gt='')
+        if not self.has_view_permission(request, report):
+            raise PermissionDenied
+        return FileResponse(report.file.open('rb'), as_attachment=True, filename=filename(report),
+                            content_type=CONTENT_TYPES[report.format])
+
+    @admin.display(description='File')
+    def download(self, obj):
+        if not obj.file:
+            return '-'
+        return format_html('<a href="{}">Download</a>', reverse('admin:complaints_ministryreport_download',
+                                                                args=[obj.pk]))
+
+    @admin.action(description='Refresh selected reports (rebuilt only if their data changed)')
+    def refresh(self, request, queryset):
+        from .reports import request as request_report
+
+        queued = sum(request_report(r.ministry_id, r.period, r.format, user=request.user, force=True)[1]
+                     for r in queryset)
+        self.message_user(request, f"{queued} report(s) queued.")
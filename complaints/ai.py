@@ -0,0 +1,196 @@
+import json
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = """
+You are a grievance analysis bot for a national government portal.
+Analyze the following complaint text.
+Respond ONLY with a valid JSON object (no markdown, no other text).
+The JSON object must have exactly two keys:
+1. "category": A concise category for the complaint (e.g., "Corruption / Bribe", "Service Delay", "Officer Misconduct", "Policy Issue", "Infrastructure Problem", "Public Safety", "Other").
+2. "priority": Your suggested priority ("LOW", "MEDIUM", or "HIGH").
+"""
+
+
+class ProviderUnavailable(Exception):
+    """
+    The provider cannot run at all (missing key or SDK). Not worth retrying.
+    """
+
+
+class TriageProvider:
+    """
+    Base class for AI triage backends. classify() returns a dict with
+    'category' and 'priority' (LOW/MEDIUM/HIGH) for one complaint.
+    Heavy dependencies must be imported inside the provider, never at module
+    level, so web processes that only enqueue work never load them.
+    """
+    name = 'base'
+
+    def is_available(self):
+        return True
+
+    def classify(self, title, description):
+        raise NotImplementedError
+
+    def classify_many(self, items):
+        """
+        items: list of (title, description). Providers that can vectorize override this.
+        """
+        return [self.classify(title, description) for title, description in items]
+
+
+class GeminiProvider(TriageProvider):
+    """
+    Google Gemini. The SDK (~1s to import) is loaded and configured on first use.
+    """
+    name = 'gemini'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._model = None
+        self._retry = None
+
+    @property
+    def api_key(self):
+        return os.environ.get('GEMINI_API_KEY')
+
+    def is_available(self):
+        return bool(self.api_key)
+
+    def _load(self):
+        with self._lock:
+            if self._model is not None:
+                return self._model
+            try:
+                from google.api_core.client_options import ClientOptions
+                from google.api_core.retry import Retry, if_transient_error
+                from google.generativeai import GenerativeModel, configure
+            except ImportError as e:
+                raise ProviderUnavailable(f"Gemini SDK not installed: {e}")
+
+            configure(
+                api_key=self.api_key,
+                client_options=ClientOptions(
+                    api_endpoint=os.environ.get("GEMINI_ENDPOINT", "generativelanguage.googleapis.com"),
+                ),
+                transport="rest"
+            )
+            # Default retry settings for API calls
+            self._retry = Retry(initial=1.0, maximum=60.0, multiplier=2.0, deadline=300.0,
+                                predicate=if_transient_error)
+            self._model = GenerativeModel(
+                model_name=getattr(settings, 'AI_GEMINI_MODEL', 'gemini-2.5-flash-preview-09-2025'),
+                system_instruction=SYSTEM_PROMPT,
+                generation_config={"response_mime_type": "application/json"}
+            )
+            logger.info("Gemini client initialised")
+            return self._model
+
+    def classify(self, title, description):
+        if not self.api_key:
+            raise ProviderUnavailable("GEMINI_API_KEY environment variable not set")
+
+        model = self._load()
+        response = model.generate_content(
+            f"\nTitle: {title}\nDetails: {description}\n",
+            request_options={'retry': self._retry}
+        )
+        data = json.loads(response.candidates[0].content.parts[0].text)
+        return {
+            'category': data.get('category', 'Uncategorized'),
+            'priority': data.get('priority', 'MEDIUM').upper(),
+            'source': self.name,
+        }
+
+
+class LocalProvider(TriageProvider):
+    """
+    Naive Bayes classifier trained from past triage (`manage.py train_triage_model`).
+    Offline, deterministic and fast enough for thousands of complaints per second.
+    The model file is reloaded when it changes on disk.
+    """
+    name = 'local'
+
+    def __init__(self, path=None):
+        self.path = path or getattr(settings, 'AI_LOCAL_MODEL_PATH', None)
+        self._lock = threading.Lock()
+        self._model = None
+        self._mtime = None
+
+    def is_available(self):
+        return bool(self.path) and os.path.exists(self.path)
+
+    def model(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except (OSError, TypeError):
+            raise ProviderUnavailable(f"No local triage model at {self.path}; run `manage.py train_triage_model`")
+        with self._lock:
+            if self._model is None or mtime != self._mtime:
+                from .classifier import TriageModel
+
+                self._model = TriageModel.load(self.path)
+                self._mtime = mtime
+                logger.info(f"Loaded local triage model from {self.path}")
+            return self._model
+
+    def classify(self, title, description):
+        return self.classify_many([(title, description)])[0]
+
+    def classify_many(self, items):
+        results = self.model().classify_many(items)
+        for result in results:
+            result['source'] = self.name
+        return results
+
+
+class TieredProvider(TriageProvider):
+    """
+    Local model first; only predictions below AI_LOCAL_CONFIDENCE are escalated
+    to the LLM provider. If the LLM is unavailable or fails (no key, quota), the
+    local prediction is kept so triage never stops.
+    """
+    name = 'tiered'
+
+    def __init__(self):
+        self.local = get_provider('complaints.ai.LocalProvider')
+        self.remote = get_provider(getattr(settings, 'AI_ESCALATION_PROVIDER', 'complaints.ai.GeminiProvider'))
+
+    def is_available(self):
+        return self.local.is_available() or self.remote.is_available()
+
+    def needs_escalation(self, result):
+        return result['confidence'] < getattr(settings, 'AI_LOCAL_CONFIDENCE', 0.8)
+
+    def classify(self, title, description):
+        if not self.local.is_available():
+            return self.remote.classify(title, description)
+
+        result = self.local.classify(title, description)
+        if not self.needs_escalation(result) or not self.remote.is_available():
+            return result
+        try:
+            return self.remote.classify(title, description)
+        except Exception as e:
+            logger.warning(f"{self.remote.name} triage failed, keeping local prediction: {e}")
+            return result
+
+
+_providers = {}
+
+
+def get_provider(path=None):
+    """
+    Returns the (per-process) provider instance named by settings.AI_PROVIDER.
+    """
+    path = path or getattr(settings, 'AI_PROVIDER', 'complaints.ai.GeminiProvider')
+    if path not in _providers:
+        _providers[path] = import_string(path)()
+    return _providers[path]
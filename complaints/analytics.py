@@ -0,0 +1,236 @@
+import logging
+from datetime import datetime, time as dt_time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import ArchivedComplaint, Complaint, DailyComplaintRollup, Department, JobWatermark
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_NAME = 'analytics.daily_rollup'
+
+# Re-read a little behind the watermark so rows committed late are not missed.
+# Rebuilding a day is idempotent, so the overlap is harmless.
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+COUNT_FIELDS = ('created_count', 'pending_count', 'in_progress_count', 'resolved_count', 'rejected_count')
+
+
+def _day_ranges(days):
+    """
+    (start, end) bounds of the local days in `days`, consecutive days merged,
+    so created_at is compared as a raw column and its index can be used.
+    """
+    ranges = []
+    for day in sorted(set(days)):
+        start = timezone.make_aware(datetime.combine(day, dt_time.min))
+        end = timezone.make_aware(datetime.combine(day + timedelta(days=1), dt_time.min))
+        if ranges and ranges[-1][1] == start:
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            ranges.append((start, end))
+    return ranges
+
+
+def _aggregate(through_model, prefix, group_field, days):
+    """
+    Aggregates complaints created on `days` through one of the M2M through
+    tables, grouped by day, ministry/department, category and priority.
+    """
+    resolution = ExpressionWrapper(
+        F(f'{prefix}resolved_at') - F(f'{prefix}created_at'), output_field=DurationField()
+    )
+    fields = {
+        'day': TruncDate(f'{prefix}created_at'),
+        'category': Coalesce(f'{prefix}ai_suggested_category', Value('')),
+        'priority': Coalesce(f'{prefix}ai_suggested_priority', Value('')),
+    }
+    created_on_days = Q()
+    for start, end in _day_ranges(days):
+        created_on_days |= Q(**{f'{prefix}created_at__gte': start, f'{prefix}created_at__lt': end})
+    qs = (
+        through_model.objects
+        .filter(created_on_days)
+        .annotate(**fields)
+        .values('day', group_field, 'category', 'priority')
+        .annotate(
+            created_count=Count('id'),
+            pending_count=Count('id', filter=Q(**{f'{prefix}status': 'PENDING'})),
+            in_progress_count=Count('id', filter=Q(**{f'{prefix}status': 'IN_PROGRESS'})),
+            resolved_count=Count('id', filter=Q(**{f'{prefix}status': 'RESOLVED'})),
+            rejected_count=Count('id', filter=Q(**{f'{prefix}status': 'REJECTED'})),
+            resolution=Sum(resolution, filter=Q(**{f'{prefix}resolved_at__isnull': False})),
+        )
+        .order_by()
+    )
+    return qs
+
+
+def rebuild_days(days):
+    """
+    Recomputes every rollup row for the given creation days. Only complaints
+    created on those days are scanned.
+    """
+    days = sorted(set(days))
+    if not days:
+        return 0
+
+    rows = []
+    for row in _merged(days, 'ministries', 'ministry_id'):
+        rows.append(_to_rollup(row, ministry_id=row['ministry_id']))
+
+    ministry_of = dict(Department.objects.values_list('id', 'ministry_id'))
+    for row in _merged(days, 'departments', 'department_id'):
+        rows.append(_to_rollup(row, ministry_id=ministry_of.get(row['department_id']),
+                               department_id=row['department_id']))
+
+    with transaction.atomic():
+        DailyComplaintRollup.objects.filter(day__in=days).delete()
+        DailyComplaintRollup.objects.bulk_create([r for r in rows if r.ministry_id], batch_size=1000)
+    return len(rows)
+
+
+def _merged(days, relation, group_field):
+    """
+    Sums the hot (Complaint) and cold (ArchivedComplaint) aggregates so
+    archiving never changes the numbers.
+    """
+    sources = (
+        (getattr(Complaint, relation).through, 'complaint__'),
+        (getattr(ArchivedComplaint, relation).through, 'archivedcomplaint__'),
+    )
+    merged = {}
+    for through_model, prefix in sources:
+        for row in _aggregate(through_model, prefix, group_field, days):
+            key = (row['day'], row[group_field], row['category'], row['priority'])
+            if key not in merged:
+                merged[key] = row
+                continue
+            target = merged[key]
+            for field in COUNT_FIELDS:
+                target[field] += row[field]
+            if row['resolution']:
+                target['resolution'] = (target['resolution'] or timedelta()) + row['resolution']
+    return merged.values()
+
+
+def _to_rollup(row, ministry_id, department_id=None):
+    resolution = row['resolution']
+    return DailyComplaintRollup(
+        day=row['day'],
+        ministry_id=ministry_id,
+        department_id=department_id,
+        category=row['category'][:255],
+        priority=row['priority'],
+        created_count=row['created_count'],
+        pending_count=row['pending_count'],
+        in_progress_count=row['in_progress_count'],
+        resolved_count=row['resolved_count'],
+        rejected_count=row['rejected_count'],
+        resolution_seconds=int(resolution.total_seconds()) if resolution else 0,
+    )
+
+
+def update_rollups(batch_days=31):
+    """
+    Incremental refresh: finds the creation days of complaints changed since
+    the watermark and rebuilds only those days.
+    """
+    started = timezone.now()
+    watermark, _ = JobWatermark.objects.get_or_create(name=WATERMARK_NAME)
+
+    changed = Complaint.objects.all()
+    if watermark.value:
+        changed = changed.filter(updated_at__gte=watermark.value - WATERMARK_OVERLAP)
+
+    days = list(
+        changed.annotate(day=TruncDate('created_at')).values_list('day', flat=True).distinct().order_by('day')
+    )
+    total = 0
+    for i in range(0, len(days), batch_days):
+        total += rebuild_days(days[i:i + batch_days])
+
+    watermark.value = started
+    watermark.save(update_fields=['value', 'updated_at'])
+    logger.info(f"Analytics rollups refreshed: {len(days)} days, {total} rows")
+    return len(days), total
+
+
+def backfill(since=None, until=None, batch_days=31):
+    """
+    Rebuilds rollups for every creation day in [since, until]. A full
+    backfill (no bounds) also resets the incremental watermark.
+    """
+    started = timezone.now()
+    days = set()
+    for model in (Complaint, ArchivedComplaint):
+        qs = model.objects.all()
+        if since:
+            qs = qs.filter(created_at__date__gte=since)
+        if until:
+            qs = qs.filter(created_at__date__lte=until)
+        days.update(qs.annotate(day=TruncDate('created_at')).values_list('day', flat=True).distinct().order_by())
+    days = sorted(days)
+
+    total = 0
+    for i in range(0, len(days), batch_days):
+        total += rebuild_days(days[i:i + batch_days])
+
+    if not since and not until:
+        JobWatermark.objects.update_or_create(name=WATERMARK_NAME, defaults={'value': started})
+    return len(days), total
+
+
+# --- Read side (rollups only, never the fact tables) ---
+
+def summarize(rollups, today=None):
+    """
+    Turns a filtered DailyComplaintRollup queryset into trend series:
+    per-day volume, resolution time, backlog age and category/priority mix.
+    """
+    today = today or timezone.localdate()
+    sums = dict(
+        created=Sum('created_count'), pending=Sum('pending_count'), in_progress=Sum('in_progress_count'),
+        resolved=Sum('resolved_count'), rejected=Sum('rejected_count'), resolution_seconds=Sum('resolution_seconds'),
+    )
+
+    per_day = []
+    backlog_open, backlog_age_days = 0, 0
+    for row in rollups.values('day').annotate(**sums).order_by('day'):
+        closed = row['resolved'] + row['rejected']
+        open_count = row['pending'] + row['in_progress']
+        backlog_open += open_count
+        backlog_age_days += open_count * (today - row['day']).days
+        per_day.append({
+            'day': row['day'],
+            'created': row['created'],
+            'open': open_count,
+            'resolved': row['resolved'],
+            'rejected': row['rejected'],
+            'avg_resolution_hours': round(row['resolution_seconds'] / closed / 3600, 2) if closed else None,
+        })
+
+    def mix(field):
+        return {
+            (row[field] or 'UNCLASSIFIED'): row['created']
+            for row in rollups.values(field).annotate(created=Sum('created_count')).order_by('-created')
+        }
+
+    totals = rollups.aggregate(**sums)
+    closed = (totals['resolved'] or 0) + (totals['rejected'] or 0)
+    return {
+        'totals': {
+            'created': totals['created'] or 0,
+            'open': (totals['pending'] or 0) + (totals['in_progress'] or 0),
+            'resolved': totals['resolved'] or 0,
+            'rejected': totals['rejected'] or 0,
+            'avg_resolution_hours': round(totals['resolution_seconds'] / closed / 3600, 2) if closed else None,
+            'avg_backlog_age_days': round(backlog_age_days / backlog_open, 1) if backlog_open else None,
+        },
+        'per_day': per_day,
+        'category_mix': mix('category'),
+        'priority_mix': mix('priority'),
+    }
@@ -0,0 +1,99 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import sync
+from .models import ArchivedComplaint, ArchivedComplaintUpdate, Complaint, ComplaintUpdate
+
+logger = logging.getLogger(__name__)
+
+# Plain columns copied one-to-one from Complaint to ArchivedComplaint
+COPIED_FIELDS = (
+    'tracking_id', 'short_code', 'title', 'description', 'status', 'created_at', 'updated_at', 'resolved_at',
+    'created_by_id', 'attachment', 'ai_suggested_category', 'ai_suggested_priority', 'ai_triage_source',
+)
+
+
+def archivable(cutoff):
+    """
+    Closed complaints whose resolution (or last update, for rows closed before
+    resolved_at existed) is older than `cutoff`.
+    """
+    return Complaint.objects.filter(status__in=Complaint.CLOSED_STATUSES).filter(
+        Q(resolved_at__lt=cutoff) | Q(resolved_at__isnull=True, updated_at__lt=cutoff)
+    )
+
+
+def archive_batch(cutoff, batch_size=500):
+    """
+    Moves one chunk of complaints, their updates and M2M links to the archive
+    tables in a single transaction. Returns the number of complaints moved.
+    """
+    with transaction.atomic():
+        ids = list(
+            archivable(cutoff).select_for_update(skip_locked=True)
+            .order_by('created_at').values_list('tracking_id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+
+        rows = list(Complaint.objects.filter(tracking_id__in=ids).values(*COPIED_FIELDS))
+        ArchivedComplaint.objects.bulk_create([ArchivedComplaint(**row) for row in rows], batch_size=batch_size)
+
+        ministry_links = list(Complaint.ministries.through.objects.filter(complaint_id__in=ids).values_list(
+            'complaint_id', 'ministry_id'))
+        ArchivedComplaint.ministries.through.objects.bulk_create([
+            ArchivedComplaint.ministries.through(archivedcomplaint_id=c, ministry_id=m) for c, m in ministry_links
+        ], batch_size=1000)
+
+        department_links = list(Complaint.departments.through.objects.filter(complaint_id__in=ids).values_list(
+            'complaint_id', 'department_id'))
+        ArchivedComplaint.departments.through.objects.bulk_create([
+            ArchivedComplaint.departments.through(archivedcomplaint_id=c, department_id=d)
+            for c, d in department_links
+        ], batch_size=1000)
+
+        updates = ComplaintUpdate.objects.filter(complaint_id__in=ids).values_list(
+            'complaint_id', 'user_id', 'update_text', 'created_at')
+        ArchivedComplaintUpdate.objects.bulk_create([
+            ArchivedComplaintUpdate(complaint_id=c, user_id=u, update_text=t, created_at=at)
+            for c, u, t, at in updates
+        ], batch_size=1000)
+
+        # Delta-sync clients see archived complaints as tombstones (one bulk insert, not one per row)
+        scopes = {row['tracking_id']: {'created_by_id': row['created_by_id'], 'ministry_ids': [],
+                                       'department_ids': []} for row in rows}
+        for c, m in ministry_links:
+            scopes[c]['ministry_ids'].append(m)
+        for c, d in department_links:
+            scopes[c]['department_ids'].append(d)
+        # Cascades to ComplaintUpdate and both through tables
+        with sync.suppress_tombstones():
+            Complaint.objects.filter(tracking_id__in=ids).delete()
+        # Last, so the change-sequence row is only locked from here to commit
+        sync.record_tombstones('complaint', [(c, c, scope) for c, scope in scopes.items()], reason='archived')
+    return len(ids)
+
+
+def archive_old_complaints(older_than_days=None, batch_size=None, max_batches=None):
+    """
+    Archives closed complaints older than ARCHIVE_AFTER_DAYS in bounded chunks,
+    so each transaction stays short and the job can be stopped at any point.
+    """
+    older_than_days = older_than_days or getattr(settings, 'ARCHIVE_AFTER_DAYS', 365)
+    batch_size = batch_size or getattr(settings, 'ARCHIVE_BATCH_SIZE', 500)
+    max_batches = max_batches or getattr(settings, 'ARCHIVE_MAX_BATCHES', 100)
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+
+    total = 0
+    for _ in range(max_batches):
+        moved = archive_batch(cutoff, batch_size)
+        total += moved
+        if moved < batch_size:
+            break
+    logger.info(f"Archived {total} complaints closed before {cutoff:%Y-%m-%d}")
+    return total
@@ -0,0 +1,134 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import DEFERRED
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .models import Department, Ministry, UserProfile
+
+AUTH_VERSION_KEY = 'auth:version:{user_id}'
+AUTH_USER_KEY = 'auth:user:{user_id}:{version}'
+
+# Only what authentication, permissions and scope_complaints() read; anything
+# else (names, email, the password hash) stays deferred and loads on access.
+USER_FIELDS = ('id', 'username', 'is_active', 'is_staff', 'is_superuser')
+PROFILE_FIELDS = ('user_id', 'role', 'ministry_id', 'department_id')
+MINISTRY_FIELDS = ('id', 'name')
+DEPARTMENT_FIELDS = ('id', 'ministry_id', 'name')
+
+
+def get_auth_version(user_id):
+    """
+    Returns the current cache version for a user. Bumping it makes every
+    previously cached user/profile entry for that user unreachable.
+    """
+    return cache.get_or_set(AUTH_VERSION_KEY.format(user_id=user_id), 1, timeout=None)
+
+
+def invalidate_cached_user(user_id):
+    """
+    Called from signals whenever a user, their role or their jurisdiction changes.
+    """
+    key = AUTH_VERSION_KEY.format(user_id=user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Key was evicted or never set; any new value starts a fresh namespace.
+        cache.set(key, 2, timeout=None)
+
+
+def load_user_with_profile(user_id):
+    """
+    Loads the user together with profile, ministry and department in one query,
+    so permissions and get_queryset() never lazily fetch them afterwards.
+    """
+    return User.objects.select_related(
+        'profile', 'profile__ministry', 'profile__department'
+    ).get(**{api_settings.USER_ID_FIELD: user_id})
+
+
+def _values(obj, fields):
+    return None if obj is None else [getattr(obj, field) for field in fields]
+
+
+def _from_values(model, fields, values):
+    # from_db() expects values in concrete field order, DEFERRED for the rest
+    data = dict(zip(fields, values))
+    return model.from_db(None, fields, [data.get(f.attname, DEFERRED) for f in model._meta.concrete_fields])
+
+
+def snapshot_user(user):
+    """
+    The cacheable part of a user: plain field values, plus a digest of the
+    password hash (as carried in the token) instead of the hash itself.
+    """
+    profile = getattr(user, 'profile', None)
+    return {
+        'user': _values(user, USER_FIELDS),
+        'password': get_md5_hash_password(user.password) if api_settings.CHECK_REVOKE_TOKEN else None,
+        'profile': _values(profile, PROFILE_FIELDS),
+        'ministry': _values(profile and profile.ministry, MINISTRY_FIELDS),
+        'department': _values(profile and profile.department, DEPARTMENT_FIELDS),
+    }
+
+
+def restore_user(snapshot):
+    """
+    Rebuilds user, profile, ministry and department from a snapshot, wired
+    together the way select_related() leaves them, so reading them costs no
+    query. Fields left out of the snapshot are deferred.
+    """
+    user = _from_values(User, USER_FIELDS, snapshot['user'])
+    profile = None
+    if snapshot['profile'] is not None:
+        profile = _from_values(UserProfile, PROFILE_FIELDS, snapshot['profile'])
+        profile._state.fields_cache['user'] = user
+        profile._state.fields_cache['ministry'] = snapshot['ministry'] and _from_values(
+            Ministry, MINISTRY_FIELDS, snapshot['ministry'])
+        profile._state.fields_cache['department'] = snapshot['department'] and _from_values(
+            Department, DEPARTMENT_FIELDS, snapshot['department'])
+    # A cached None makes `hasattr(user, 'profile')` False without a query
+    user._state.fields_cache['profile'] = profile
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    Drop-in replacement for JWTAuthentication that resolves the user and the
+    profile with a single select_related query and caches a snapshot of the
+    result briefly, keyed by user id and auth version. Invalidation only
+    reaches other workers through a shared cache (REDIS_URL); with the local
+    memory cache they rely on the short AUTH_USER_CACHE_TIMEOUT instead.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        timeout = getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60)
+        key = AUTH_USER_KEY.format(user_id=user_id, version=get_auth_version(user_id))
+
+        snapshot = cache.get(key) if timeout else None
+        if snapshot is None:
+            try:
+                snapshot = snapshot_user(load_user_with_profile(user_id))
+            except User.DoesNotExist as e:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+            if timeout:
+                cache.set(key, snapshot, timeout)
+        user = restore_user(snapshot)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != snapshot['password']:
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
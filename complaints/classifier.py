@@ -0,0 +1,145 @@
+import json
+import math
+import os
+import re
+import zlib
+from datetime import datetime, timezone as dt_timezone
+
+# Hashed feature space: 2^18 buckets keeps collisions rare for complaint-sized vocabularies
+# while the stored model only holds the buckets actually seen in training.
+N_FEATURES = 1 << 18
+MODEL_VERSION = 1
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def features(text):
+    """
+    Hashed unigram + bigram features of `text` (binary, so a word repeated
+    ten times counts once). crc32 is stable across processes, unlike hash().
+    """
+    tokens = [t for t in _TOKEN_RE.findall(text.lower()) if len(t) > 1]
+    grams = tokens + [f'{a} {b}' for a, b in zip(tokens, tokens[1:])]
+    mask = N_FEATURES - 1
+    return {zlib.crc32(g.encode('utf-8')) & mask for g in grams}
+
+
+def complaint_text(title, description):
+    # The title carries most of the signal, so it is counted twice
+    return f'{title} {title} {description or ""}'
+
+
+class NaiveBayesHead:
+    """
+    Multinomial naive Bayes over hashed features, stored sparsely as
+    per-feature deltas from each class's "unseen feature" weight, so a
+    prediction only touches the features present in the document.
+    """
+
+    def __init__(self, labels, priors, unseen, deltas):
+        self.labels = labels
+        self.priors = priors
+        self.unseen = unseen
+        self.deltas = deltas
+
+    @classmethod
+    def train(cls, docs, labels, alpha=0.5):
+        classes = sorted(set(labels))
+        index = {label: i for i, label in enumerate(classes)}
+        counts = [dict() for _ in classes]
+        totals = [0] * len(classes)
+        docs_per_class = [0] * len(classes)
+
+        for feats, label in zip(docs, labels):
+            ci = index[label]
+            docs_per_class[ci] += 1
+            totals[ci] += len(feats)
+            bucket = counts[ci]
+            for f in feats:
+                bucket[f] = bucket.get(f, 0) + 1
+
+        n_docs = len(docs)
+        priors = [math.log(n / n_docs) for n in docs_per_class]
+        unseen = [math.log(alpha / (totals[ci] + alpha * N_FEATURES)) for ci in range(len(classes))]
+        deltas = {}
+        for ci, bucket in enumerate(counts):
+            denominator = totals[ci] + alpha * N_FEATURES
+            for f, n in bucket.items():
+                deltas.setdefault(f, []).append((ci, math.log((n + alpha) / denominator) - unseen[ci]))
+        return cls(classes, priors, unseen, deltas)
+
+    def predict_many(self, docs):
+        """
+        Returns (label, probability) per document.
+        """
+        results = []
+        deltas = self.deltas
+        for feats in docs:
+            n = len(feats)
+            scores = [p + u * n for p, u in zip(self.priors, self.unseen)]
+            for f in feats:
+                for ci, delta in deltas.get(f, ()):
+                    scores[ci] += delta
+            best = max(range(len(scores)), key=scores.__getitem__)
+            top = scores[best]
+            total = sum(math.exp(s - top) for s in scores)
+            results.append((self.labels[best], 1.0 / total))
+        return results
+
+    def to_dict(self):
+        return {
+            'labels': self.labels,
+            'priors': self.priors,
+            'unseen': self.unseen,
+            'deltas': {str(f): [[ci, round(d, 5)] for ci, d in pairs] for f, pairs in self.deltas.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        deltas = {int(f): [tuple(pair) for pair in pairs] for f, pairs in data['deltas'].items()}
+        return cls(data['labels'], data['priors'], data['unseen'], deltas)
+
+
+class TriageModel:
+    """
+    Category and priority heads trained from historically triaged complaints.
+    """
+
+    def __init__(self, heads, meta=None):
+        self.heads = heads
+        self.meta = meta or {}
+
+    def classify_many(self, items):
+        """
+        items: iterable of (title, description). Returns one dict per item with
+        category, priority and the lower of the two heads' confidences.
+        """
+        docs = [features(complaint_text(title, description)) for title, description in items]
+        category = self.heads['category'].predict_many(docs)
+        priority = self.heads['priority'].predict_many(docs)
+        return [
+            {'category': c, 'priority': p, 'confidence': min(c_conf, p_conf)}
+            for (c, c_conf), (p, p_conf) in zip(category, priority)
+        ]
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        payload = {
+            'version': MODEL_VERSION,
+            'n_features': N_FEATURES,
+            'meta': dict(self.meta, saved_at=datetime.now(dt_timezone.utc).isoformat()),
+            'heads': {name: head.to_dict() for name, head in self.heads.items()},
+        }
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(payload, f, separators=(',', ':'))
+        os.replace(tmp, path)  # Atomic, so running workers never read a half-written file
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            payload = json.load(f)
+        if payload.get('version') != MODEL_VERSION or payload.get('n_features') != N_FEATURES:
+            raise ValueError(f'{path} was trained with an incompatible classifier version; retrain it.')
+        heads = {name: NaiveBayesHead.from_dict(data) for name, data in payload['heads'].items()}
+        return cls(heads, payload.get('meta'))
@@ -0,0 +1,20 @@
+import time
+
+from django.db.backends.postgresql import base
+
+from complaints import instrumentation
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL backend that times how long it takes to get a connection:
+    the TCP/TLS/auth handshake for direct connections, or the wait for a free
+    connection when DB_POOL_MODE=pool. Reported as the 'db' series in /metrics.
+    """
+
+    def get_new_connection(self, conn_params):
+        start = time.perf_counter()
+        try:
+            return super().get_new_connection(conn_params)
+        finally:
+            instrumentation.record_connection_wait(self.alias, time.perf_counter() - start, pooled=bool(self.pool))
@@ -0,0 +1,71 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+_use_replica = ContextVar('use_replica', default=False)
+
+STICKY_KEY = 'db:sticky:{user_id}'
+
+
+def replicas():
+    return getattr(settings, 'REPLICA_DATABASES', [])
+
+
+@contextmanager
+def read_from_replica():
+    """
+    Routes ORM reads inside the block to a replica (if any are configured).
+    """
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def pin_replica():
+    return _use_replica.set(True)
+
+
+def unpin_replica(token):
+    _use_replica.reset(token)
+
+
+def mark_sticky(user_id):
+    """
+    After a write, the user's reads stay on the primary for a short window
+    so they always see their own changes despite replication lag.
+    """
+    if replicas():
+        cache.set(STICKY_KEY.format(user_id=user_id), 1, getattr(settings, 'REPLICA_STICKY_SECONDS', 10))
+
+
+def is_sticky(user_id):
+    return bool(replicas()) and cache.get(STICKY_KEY.format(user_id=user_id)) is not None
+
+
+class PrimaryReplicaRouter:
+    """
+    Writes and ordinary reads go to 'default'. Reads made inside
+    read_from_replica() (read-only views, stats, analytics) go to a random replica.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get():
+            choices = replicas()
+            if choices:
+                return random.choice(choices)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
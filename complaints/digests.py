@@ -0,0 +1,155 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from . import short_codes
+from .models import Complaint, UserProfile
+from .utils import send_email_notifications_each
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'HOURLY': timedelta(hours=1), 'DAILY': timedelta(days=1)}
+
+# The beat schedule isn't exact; a digest due within this margin goes out now rather than a cycle late
+SLACK = timedelta(minutes=5)
+
+PRIORITY_ORDER = {'HIGH': 0, 'MEDIUM': 1, 'LOW': 2, None: 3}
+
+
+def due_profiles(now):
+    """
+    Admins with an email address whose digest period has elapsed (one query).
+    """
+    due = Q(digest_sent_at__isnull=True)
+    for frequency, period in PERIODS.items():
+        due |= Q(digest_frequency=frequency, digest_sent_at__lte=now - period + SLACK)
+    return list(
+        UserProfile.objects.filter(due, role='ADMIN', ministry__isnull=False, user__is_active=True)
+        .exclude(digest_frequency='OFF').exclude(user__email='')
+        .select_related('user', 'ministry', 'department')
+    )
+
+
+def window_start(profile, now):
+    return profile.digest_sent_at or now - PERIODS[profile.digest_frequency]
+
+
+def _new_complaints(profiles, now):
+    """
+    Complaints created since the oldest watermark among `profiles`, indexed by
+    ministry and by department: one query per link table for the whole cycle.
+    """
+    since = min(window_start(p, now) for p in profiles)
+    fields = ('complaint_id', 'complaint__short_code', 'complaint__title', 'complaint__ai_suggested_priority',
+              'complaint__created_at')
+    complaints = {}
+    scoped = {'ministry': defaultdict(list), 'department': defaultdict(list)}
+    for scope, relation in (('ministry', Complaint.ministries), ('department', Complaint.departments)):
+        ids = {getattr(p, f'{scope}_id') for p in profiles} - {None}
+        if not ids:
+            continue
+        rows = relation.through.objects.filter(
+            **{f'{scope}_id__in': ids}, complaint__created_at__gt=since, complaint__created_at__lte=now
+        ).values_list(f'{scope}_id', *fields)
+        for scope_id, tid, code, title, priority, created_at in rows:
+            complaints[tid] = (short_codes.display(code) or str(tid)[:8], title, priority, created_at)
+            scoped[scope][scope_id].append(tid)
+    return complaints, scoped
+
+
+def _open_counts(profiles):
+    """
+    Open and escalated backlog per ministry and department, grouped in the database.
+    """
+    counts = {}
+    for scope, relation in (('ministry', Complaint.ministries), ('department', Complaint.departments)):
+        ids = {getattr(p, f'{scope}_id') for p in profiles} - {None}
+        if not ids:
+            continue
+        rows = (
+            relation.through.objects
+            .filter(**{f'{scope}_id__in': ids}, complaint__status__in=('PENDING', 'IN_PROGRESS'))
+            .values(f'{scope}_id')
+            .annotate(open=Count('complaint_id'), escalated=Count('complaint_id',
+                                                                  filter=Q(complaint__escalated_at__isnull=False)))
+            .order_by()
+        )
+        for row in rows:
+            counts[(scope, row[f'{scope}_id'])] = (row['open'], row['escalated'])
+    return counts
+
+
+def render(profile, items, backlog, since):
+    """
+    (subject, body) of one admin's digest. `items` are (tracking_id, reference, title, priority, created_at).
+    """
+    scope = profile.department or profile.ministry
+    limit = getattr(settings, 'DIGEST_MAX_ITEMS', 20)
+    by_priority = defaultdict(int)
+    for _, _, _, priority, _ in items:
+        by_priority[priority or 'UNTRIAGED'] += 1
+    ordered = sorted(items, key=lambda item: (PRIORITY_ORDER.get(item[3], 3), item[4]))
+
+    lines = [
+        f"- {reference} [{priority or 'UNTRIAGED'}] {title} "
+        f"({timezone.localtime(created_at):%Y-%m-%d %H:%M})"
+        for _, reference, title, priority, created_at in ordered[:limit]
+    ]
+    if len(ordered) > limit:
+        lines.append(f"... and {len(ordered) - limit} more")
+    summary = ', '.join(f"{count} {priority}" for priority, count in sorted(
+        by_priority.items(), key=lambda item: PRIORITY_ORDER.get(item[0], 3)))
+    open_count, escalated = backlog
+
+    subject = f"[Gunaso Portal] {len(items)} new grievance(s) for {scope}"
+    body = (
+        f"Dear {profile.user.first_name or profile.user.username},\n\n"
+        f"{len(items)} new grievance(s) were submitted to {scope} since "
+        f"{timezone.localtime(since):%Y-%m-%d %H:%M} ({summary}):\n\n" + "\n".join(lines) +
+        f"\n\nOpen grievances in your jurisdiction: {open_count} ({escalated} escalated past their deadline)."
+        "\n\nPlease log in to the Gunaso Portal to act on them.\n\nGunaso Portal Team"
+    )
+    return subject, body
+
+
+def send_digests(now=None):
+    """
+    One digest cycle: finds due admins, loads new complaints for all of their
+    ministries/departments at once, renders one email per admin and sends them
+    over a single mail connection. Each admin's watermark only advances once
+    their digest is sent.
+    Returns the number of digests sent.
+    """
+    now = now or timezone.now()
+    profiles = due_profiles(now)
+    if not profiles:
+        return 0
+
+    complaints, scoped = _new_complaints(profiles, now)
+    backlog = _open_counts(profiles) if complaints else {}
+
+    messages, recipients, quiet = [], [], []
+    for profile in profiles:
+        scope = ('department', profile.department_id) if profile.department_id else ('ministry', profile.ministry_id)
+        since = window_start(profile, now)
+        items = [
+            (tid, *complaints[tid]) for tid in dict.fromkeys(scoped[scope[0]].get(scope[1], ()))
+            if complaints[tid][3] > since
+        ]
+        if not items:
+            quiet.append(profile.pk)
+            continue
+        messages.append((*render(profile, items, backlog.get(scope, (0, 0)), since), [profile.user.email]))
+        recipients.append(profile.pk)
+
+    delivered = [recipients[i] for i in send_email_notifications_each(messages)] if messages else []
+    UserProfile.objects.filter(pk__in=quiet + delivered).update(digest_sent_at=now)
+    if len(delivered) != len(messages):
+        logger.warning(f"Digest cycle sent {len(delivered)} of {len(messages)} emails; "
+                       "unsent digests retry next cycle")
+    logger.info(f"Digests: {len(delivered)} sent, {len(quiet)} admins had nothing new")
+    return len(delivered)
@@ -0,0 +1,179 @@
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.utils import timezone
+
+from .models import Complaint, ComplaintEvent
+
+logger = logging.getLogger(__name__)
+
+_actor = ContextVar('event_actor', default=None)
+
+
+# --- Writing ---
+
+@contextmanager
+def acting_as(user):
+    """
+    Events recorded inside the block (e.g. from model signals) are attributed to `user`.
+    """
+    token = _actor.set(user.pk if user is not None and user.is_authenticated else None)
+    try:
+        yield
+    finally:
+        _actor.reset(token)
+
+
+def record(complaint_id, kind, data=None, actor_id=None, at=None):
+    """
+    Appends one event. Call it inside the transaction that makes the change,
+    so the event commits (or rolls back) with it.
+    """
+    return ComplaintEvent.objects.create(
+        complaint_id=complaint_id, kind=kind, data=data or {},
+        actor_id=actor_id if actor_id is not None else _actor.get(),
+        created_at=at or timezone.now(),
+    )
+
+
+def record_many(kind, entries, actor_id=None, at=None):
+    """
+    entries: iterable of (complaint_id, data). One bulk insert for bulk writes.
+    """
+    actor_id = actor_id if actor_id is not None else _actor.get()
+    at = at or timezone.now()
+    ComplaintEvent.objects.bulk_create([
+        ComplaintEvent(complaint_id=complaint_id, kind=kind, data=data or {}, actor_id=actor_id, created_at=at)
+        for complaint_id, data in entries
+    ], batch_size=1000)
+
+
+# --- Reading ---
+
+def timeline(complaint_id, after=0, limit=50):
+    """
+    One page of a complaint's events in order, keyset-paginated on the event
+    id (served by the (complaint_id, id) index). Returns (events, next_after).
+    """
+    events = list(
+        ComplaintEvent.objects.filter(complaint_id=complaint_id, id__gt=after)
+        .order_by('id')[:limit + 1]
+    )
+    has_more = len(events) > limit
+    events = events[:limit]
+    return events, (events[-1].id if has_more else None)
+
+
+def replay(projections, after=0, until=None, batch_size=5000):
+    """
+    Feeds every event after sequence `after` (up to `until`) in order to each
+    projection's apply(seq, complaint_id, kind, data, at). Reads in keyset
+    batches of plain tuples, never the whole log at once. Returns the last
+    sequence seen, to resume from.
+    """
+    last = after
+    while True:
+        batch = ComplaintEvent.objects.filter(id__gt=last).order_by('id')
+        if until is not None:
+            batch = batch.filter(id__lte=until)
+        rows = list(batch.values_list('id', 'complaint_id', 'kind', 'data', 'created_at')[:batch_size])
+        for row in rows:
+            for projection in projections:
+                projection.apply(*row)
+        if len(rows) < batch_size:
+            return rows[-1][0] if rows else last
+        last = rows[-1][0]
+
+
+# --- Projections ---
+
+class StatusProjection:
+    """
+    Current status of every complaint ever recorded (archived ones included),
+    rebuilt from 'created' and 'status' events.
+    """
+
+    def __init__(self):
+        self.status = {}
+
+    def apply(self, seq, complaint_id, kind, data, at):
+        if kind == 'created':
+            self.status[complaint_id] = data.get('status', 'PENDING')
+        elif kind == 'status':
+            self.status[complaint_id] = data['to']
+
+    def counts(self):
+        totals = {s: 0 for s, _ in Complaint.STATUS_CHOICES}
+        for value in self.status.values():
+            totals[value] = totals.get(value, 0) + 1
+        totals['total'] = len(self.status)
+        return totals
+
+
+class ResolutionProjection:
+    """
+    Resolution times from the status transitions themselves: time from
+    creation to first closure, total time spent open (reopened complaints
+    included) and the number of reopenings. `since`/`until` restrict the
+    samples to closures inside that window.
+    """
+
+    def __init__(self, since=None, until=None):
+        self.since = since
+        self.until = until
+        self.opened = {}       # complaint -> created_at
+        self.open_since = {}   # complaint -> start of the current open interval
+        self.open_total = {}   # complaint -> seconds spent open before the current interval
+        self.resolved = set()
+        self.first_resolution = []
+        self.closed_open_seconds = []
+        self.reopened = 0
+
+    def apply(self, seq, complaint_id, kind, data, at):
+        if kind == 'created':
+            self.opened[complaint_id] = at
+            self.open_since[complaint_id] = at
+            self.open_total[complaint_id] = 0.0
+            return
+        if kind != 'status' or complaint_id not in self.opened:
+            return
+
+        closing = data['to'] in Complaint.CLOSED_STATUSES
+        was_closed = data.get('from') in Complaint.CLOSED_STATUSES
+        if closing and not was_closed:
+            start = self.open_since.pop(complaint_id, None)
+            if start is None:
+                return
+            self.open_total[complaint_id] += (at - start).total_seconds()
+            first = complaint_id not in self.resolved
+            self.resolved.add(complaint_id)
+            if self.in_window(at):
+                self.closed_open_seconds.append(self.open_total[complaint_id])
+                if first:
+                    self.first_resolution.append((at - self.opened[complaint_id]).total_seconds())
+        elif was_closed and not closing:
+            self.open_since[complaint_id] = at
+            if self.in_window(at):
+                self.reopened += 1
+
+    def in_window(self, at):
+        return (self.since is None or at >= self.since) and (self.until is None or at < self.until)
+
+    def summary(self):
+        def hours(samples, pct=None):
+            if not samples:
+                return None
+            if pct is None:
+                return round(sum(samples) / len(samples) / 3600, 2)
+            ordered = sorted(samples)
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] / 3600, 2)
+
+        return {
+            'closed': len(self.closed_open_seconds),
+            'avg_open_hours': hours(self.closed_open_seconds),
+            'p50_open_hours': hours(self.closed_open_seconds, 50),
+            'p90_open_hours': hours(self.closed_open_seconds, 90),
+            'avg_first_resolution_hours': hours(self.first_resolution),
+            'reopened': self.reopened,
+        }
@@ -0,0 +1,146 @@
+import hashlib
+import json
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.shortcuts import render
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+
+from .authentication import CachedJWTAuthentication
+from .models import Ministry
+from .serializers import UserProfileSerializer
+
+# Set by static/js/app.js at login so a page load can embed the profile without an API call
+ACCESS_COOKIE = 'gp_access'
+
+MINISTRIES_KEY = 'frontend:ministries'
+
+# Third-party assets: pinned CDN URL -> file under static/vendor/ (see `manage.py fetch_frontend_vendor`).
+# Pages use the local, hashed and precompressed copy once it has been fetched, the CDN until then.
+VENDOR = {
+    'tailwind': ('https://cdn.tailwindcss.com/3.4.16', 'tailwind-3.4.16.js'),
+    'toastify_js': ('https://cdn.jsdelivr.net/npm/toastify-js@1.12.0/src/toastify.js', 'toastify-1.12.0.js'),
+    'toastify_css': ('https://cdn.jsdelivr.net/npm/toastify-js@1.12.0/src/toastify.min.css', 'toastify-1.12.0.css'),
+    'chart': ('https://cdn.jsdelivr.net/npm/chart.js@4.4.7/dist/chart.umd.js', 'chart-4.4.7.js'),
+    'html2canvas': ('https://cdnjs.cloudflare.com/ajax/libs/html2canvas/1.4.1/html2canvas.min.js',
+                    'html2canvas-1.4.1.js'),
+}
+
+# Font Awesome 6.5.2 (the version the pages were built against) already ships with jazzmin
+FONTAWESOME = 'vendor/fontawesome-free/css/all.min.css'
+
+# Local assets of the app shell, precached by the service worker
+SHELL = ['js/app.js', 'images/Govt Logo.jpeg', FONTAWESOME]
+
+PAGES = {
+    'index': 'frontend/index.html',
+    'login': 'frontend/login.html',
+    'register': 'frontend/register.html',
+    'dashboard': 'frontend/admin_dashboard.html',
+}
+
+
+# --- Assets ---
+
+@lru_cache(maxsize=None)
+def _available(path):
+    # Manifest storage knows every collected file; finders cover DEBUG without collectstatic
+    try:
+        return bool(staticfiles_storage.exists(path) or finders.find(path))
+    except Exception:
+        return False
+
+
+def vendor_urls():
+    urls = {}
+    for name, (cdn_url, filename) in VENDOR.items():
+        path = f'vendor/{filename}'
+        urls[name] = static(path) if _available(path) else cdn_url
+    urls['fontawesome'] = static(FONTAWESOME)
+    return urls
+
+
+def shell_urls():
+    """
+    Same-origin URLs the service worker precaches: hashed in production, so
+    a deploy that changes any asset changes the list (and the cache version).
+    """
+    vendored = [f'vendor/{filename}' for _, filename in VENDOR.values()]
+    return [static(path) for path in SHELL + vendored if _available(path)]
+
+
+# --- Bootstrap ---
+
+def request_user(request):
+    """
+    The user whose access token is in the ACCESS_COOKIE, or None. Page views
+    only read it to pre-render data; the API still authenticates every call.
+    """
+    raw = request.COOKIES.get(ACCESS_COOKIE)
+    if not raw:
+        return None
+    auth = CachedJWTAuthentication()
+    try:
+        return auth.get_user(auth.get_validated_token(raw))
+    except (AuthenticationFailed, InvalidToken, TokenError):
+        return None
+
+
+def ministries():
+    # Reference data shared by every visitor; changes rarely
+    return cache.get_or_set(
+        MINISTRIES_KEY,
+        lambda: list(Ministry.objects.order_by('name').values('id', 'name')),  # MinistrySerializer's fields
+        timeout=getattr(settings, 'FRONTEND_REFERENCE_CACHE_SECONDS', 300),
+    )
+
+
+def bootstrap(request):
+    """
+    Everything a page needs before its first paint: API location, page URLs,
+    the signed-in user's profile (when known) and the ministry list.
+    """
+    user = request_user(request)
+    profile = getattr(user, 'profile', None)
+    return {
+        'api_url': reverse('api-root').rstrip('/'),
+        'urls': {name: reverse(f'frontend-{name}') for name in PAGES} | {'sw': reverse('frontend-sw')},
+        'access_cookie': ACCESS_COOKIE,
+        'profile': UserProfileSerializer(profile, context={'request': request}).data if profile else None,
+        'is_superuser': bool(user and user.is_superuser),
+        'ministries': ministries(),
+    }
+
+
+# --- Views ---
+
+def page(request, name):
+    response = render(request, PAGES[name], {'bootstrap': bootstrap(request), 'vendor': vendor_urls()})
+    # Carries the user's profile: never stored by shared caches
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Cookie'])
+    return response
+
+
+def service_worker(request):
+    shell = shell_urls()
+    config = {
+        'version': hashlib.sha256(json.dumps(shell).encode()).hexdigest()[:12],
+        'shell': shell,
+        'pages': [reverse(f'frontend-{name}') for name in PAGES],
+        'staticUrl': settings.STATIC_URL,
+        'referenceApi': [reverse('ministry-list'), reverse('department-list')],
+        'cdnHosts': sorted({url.split('/')[2] for url, _ in VENDOR.values()}),
+    }
+    response = render(request, 'frontend/sw.js', {'config': json.dumps(config)},
+                      content_type='application/javascript')
+    # Browsers must revalidate the worker itself on every visit to pick up a deploy
+    patch_cache_control(response, no_cache=True, max_age=0)
+    response['Service-Worker-Allowed'] = '/'
+    return response
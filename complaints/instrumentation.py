@@ -0,0 +1,296 @@
+import logging
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Latency histogram buckets (seconds), Prometheus style
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+SNAPSHOT_KEY = 'metrics:snapshot:{pid}'
+PIDS_KEY = 'metrics:pids'
+
+_local = threading.local()
+_NUMBER_RE = re.compile(r"\b\d+\b|'[^']*'")
+
+
+def normalize_sql(sql):
+    """
+    Collapses literals so the same statement with different parameters
+    is aggregated under a single key.
+    """
+    return _NUMBER_RE.sub('?', ' '.join(sql.split()))[:500]
+
+
+class MetricsRegistry:
+    """
+    Per-process metrics store. Each process periodically publishes a snapshot
+    to the cache so /metrics and the perf_report command see every worker.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.series = defaultdict(self._new_series)
+            self.queries = defaultdict(lambda: {'count': 0, 'seconds': 0.0, 'max': 0.0})
+            self.last_flush = 0.0
+
+    @staticmethod
+    def _new_series():
+        return {
+            'count': 0, 'errors': 0, 'seconds': 0.0, 'max': 0.0,
+            'sql_count': 0, 'sql_seconds': 0.0, 'serialize_seconds': 0.0,
+            'buckets': [0] * len(BUCKETS),
+        }
+
+    def observe(self, kind, name, seconds, error=False, sql_count=0, sql_seconds=0.0, serialize_seconds=0.0):
+        with self.lock:
+            series = self.series[(kind, name)]
+            series['count'] += 1
+            series['errors'] += int(error)
+            series['seconds'] += seconds
+            series['max'] = max(series['max'], seconds)
+            series['sql_count'] += sql_count
+            series['sql_seconds'] += sql_seconds
+            series['serialize_seconds'] += serialize_seconds
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    series['buckets'][i] += 1
+        self.maybe_flush()
+
+    def observe_queries(self, queries):
+        limit = getattr(settings, 'METRICS_MAX_QUERIES', 500)
+        with self.lock:
+            for sql, seconds in queries:
+                key = normalize_sql(sql)
+                if key not in self.queries and len(self.queries) >= limit:
+                    continue
+                stats = self.queries[key]
+                stats['count'] += 1
+                stats['seconds'] += seconds
+                stats['max'] = max(stats['max'], seconds)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'series': {f'{kind}|{name}': dict(v, buckets=list(v['buckets']))
+                           for (kind, name), v in self.series.items()},
+                'queries': {k: dict(v) for k, v in self.queries.items()},
+                'pools': pool_stats(),
+            }
+
+    def maybe_flush(self, force=False):
+        interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 10)
+        now = time.monotonic()
+        if not force and now - self.last_flush < interval:
+            return
+        self.last_flush = now
+        pid = os.getpid()
+        try:
+            cache.set(SNAPSHOT_KEY.format(pid=pid), self.snapshot(), timeout=24 * 3600)
+            pids = cache.get(PIDS_KEY) or []
+            if pid not in pids:
+                cache.set(PIDS_KEY, (pids + [pid])[-256:], timeout=None)
+        except Exception as e:
+            logger.warning(f"Could not publish metrics snapshot: {e}")
+
+
+registry = MetricsRegistry()
+
+
+def collect_snapshots():
+    """
+    Merges the snapshots published by every process into one view.
+    """
+    registry.maybe_flush(force=True)
+    merged = {'series': {}, 'queries': {}, 'pools': {}}
+    for pid in cache.get(PIDS_KEY) or []:
+        snap = cache.get(SNAPSHOT_KEY.format(pid=pid))
+        if not snap:
+            continue
+        for key, v in snap['series'].items():
+            target = merged['series'].setdefault(key, MetricsRegistry._new_series())
+            for field in ('count', 'errors', 'seconds', 'sql_count', 'sql_seconds', 'serialize_seconds'):
+                target[field] += v[field]
+            target['max'] = max(target['max'], v['max'])
+            target['buckets'] = [a + b for a, b in zip(target['buckets'], v['buckets'])]
+        for key, v in snap['queries'].items():
+            target = merged['queries'].setdefault(key, {'count': 0, 'seconds': 0.0, 'max': 0.0})
+            target['count'] += v['count']
+            target['seconds'] += v['seconds']
+            target['max'] = max(target['max'], v['max'])
+        if snap.get('pools'):
+            merged['pools'][pid] = snap['pools']
+    return merged
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+
+def render_prometheus(merged):
+    """
+    Renders merged snapshots in the Prometheus text exposition format.
+    """
+    lines = []
+    families = {
+        'http': ('gunaso_http_request', 'view'),
+        'task': ('gunaso_celery_task', 'task'),
+        'db': ('gunaso_db_connect', 'alias'),
+    }
+    for kind, (prefix, label) in families.items():
+        rows = [(key.split('|', 1)[1], v) for key, v in sorted(merged['series'].items())
+                if key.split('|', 1)[0] == kind]
+        if not rows:
+            continue
+        lines.append(f'# TYPE {prefix}_duration_seconds histogram')
+        for name, v in rows:
+            lbl = f'{label}="{_label(name)}"'
+            for bound, count in zip(BUCKETS, v['buckets']):
+                lines.append(f'{prefix}_duration_seconds_bucket{{{lbl},le="{bound}"}} {count}')
+            lines.append(f'{prefix}_duration_seconds_bucket{{{lbl},le="+Inf"}} {v["count"]}')
+            lines.append(f'{prefix}_duration_seconds_sum{{{lbl}}} {v["seconds"]:.6f}')
+            lines.append(f'{prefix}_duration_seconds_count{{{lbl}}} {v["count"]}')
+        for metric, field, mtype in (
+            ('errors_total', 'errors', 'counter'),
+            ('sql_queries_total', 'sql_count', 'counter'),
+            ('sql_duration_seconds_total', 'sql_seconds', 'counter'),
+            ('serialize_duration_seconds_total', 'serialize_seconds', 'counter'),
+        )[:1 if kind == 'db' else None]:
+            lines.append(f'# TYPE {prefix}_{metric} {mtype}')
+            for name, v in rows:
+                value = v[field]
+                value = f'{value:.6f}' if isinstance(value, float) else value
+                lines.append(f'{prefix}_{metric}{{{label}="{_label(name)}"}} {value}')
+
+    for stat, mtype in (('pool_size', 'gauge'), ('pool_available', 'gauge'), ('requests_waiting', 'gauge'),
+                        ('requests_num', 'counter'), ('requests_wait_ms', 'counter'), ('requests_errors', 'counter'),
+                        ('connections_lost', 'counter')):
+        rows = [(pid, alias, stats[stat]) for pid, pools in sorted(merged.get('pools', {}).items())
+                for alias, stats in sorted(pools.items()) if stat in stats]
+        if not rows:
+            continue
+        lines.append(f'# TYPE gunaso_db_pool_{stat} {mtype}')
+        for pid, alias, value in rows:
+            lines.append(f'gunaso_db_pool_{stat}{{alias="{_label(alias)}",pid="{pid}"}} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+# --- Per-request collection ---
+
+def activate(stats):
+    _local.stats = stats
+
+
+def deactivate():
+    _local.stats = None
+
+
+def current_request_stats():
+    """
+    Returns the stats dict for the request being handled on this thread, if any.
+    """
+    return getattr(_local, 'stats', None)
+
+
+def record_serialize_time(seconds):
+    stats = current_request_stats()
+    if stats is not None:
+        stats['serialize_seconds'] += seconds
+
+
+class QueryTimer:
+    """
+    connection.execute_wrapper() hook that times every SQL statement.
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stats['sql_count'] += 1
+            self.stats['sql_seconds'] += elapsed
+            self.stats['queries'].append((sql, elapsed))
+
+
+def new_stats():
+    return {'sql_count': 0, 'sql_seconds': 0.0, 'serialize_seconds': 0.0, 'connect_seconds': 0.0, 'queries': []}
+
+
+# --- Database connections ---
+
+def record_connection_wait(alias, seconds, pooled=False):
+    """
+    Called by complaints.db_backend each time a connection is opened or
+    taken from the pool.
+    """
+    stats = current_request_stats()
+    if stats is not None:
+        stats['connect_seconds'] += seconds
+    registry.observe('db', f"{alias} {'pool' if pooled else 'connect'}", seconds)
+
+
+def pool_stats():
+    """
+    psycopg_pool counters for the pools this process has opened (DB_POOL_MODE=pool).
+    """
+    from django.db import connections
+
+    pools = {}
+    for alias in connections:
+        pool = getattr(connections[alias], '_connection_pools', {}).get(alias)
+        if pool is not None:
+            pools[alias] = pool.get_stats()
+    return pools
+
+
+# --- Celery task timing ---
+
+_task_starts = {}
+
+
+def task_started(task_id):
+    """
+    Starts timing a Celery task and its SQL on the worker thread running it.
+    An eager task inside a request gets its own stats; the request's are
+    restored when it finishes.
+    """
+    from django.db import connections
+
+    stats = new_stats()
+    stack = ExitStack()
+    for conn in connections.all():
+        stack.enter_context(conn.execute_wrapper(QueryTimer(stats)))
+    _task_starts[task_id] = (time.perf_counter(), stats, stack, current_request_stats())
+    _local.stats = stats
+
+
+def task_finished(task_id, task_name, error=False):
+    started = _task_starts.pop(task_id, None)
+    if started is None:
+        _local.stats = None
+        return
+    start, stats, stack, previous = started
+    stack.close()
+    _local.stats = previous
+    elapsed = time.perf_counter() - start
+    registry.observe('task', task_name, elapsed, error=error,
+                     sql_count=stats['sql_count'], sql_seconds=stats['sql_seconds'])
+    registry.observe_queries(stats['queries'])
+    logger.info(f"Task {task_name} [{task_id}] finished in {elapsed * 1000:.1f}ms "
+                f"({stats['sql_count']} queries, error={error})")
@@ -0,0 +1,348 @@
+import csv
+import io
+import json
+import logging
+import os
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from . import events, outbox, short_codes, sync
+from .models import Complaint, Department, Ministry, UserProfile
+from .routing import suggest_departments
+from .sla import compute_due_at
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('csv', 'xlsx', 'json')
+CHANNELS = ('hotline', 'paper', 'email', 'other')
+
+# Several ministries/departments in one cell: "Health; Education" or "3;7"
+SEPARATOR = ';'
+
+# Header spellings accepted for each field
+ALIASES = {
+    'ministry': 'ministries', 'ministry_ids': 'ministries',
+    'department': 'departments', 'department_ids': 'departments',
+    'username': 'citizen', 'phone_number': 'phone',
+}
+
+
+class IntakeError(Exception):
+    """
+    The file as a whole can't be imported (unreadable, wrong format, too many rows).
+    """
+
+
+# --- Reading ---
+
+def detect_format(name, head):
+    """
+    Format from the file extension, else from the first bytes of the file.
+    """
+    extension = os.path.splitext(name or '')[1].lower().lstrip('.')
+    if extension in FORMATS:
+        return extension
+    if head.startswith(b'PK'):  # Zip container
+        return 'xlsx'
+    if head.lstrip()[:1] in (b'[', b'{'):
+        return 'json'
+    return 'csv'
+
+
+def _key(header):
+    key = str(header or '').strip().lower().replace(' ', '_')
+    return ALIASES.get(key, key)
+
+
+def _cell(value):
+    # Spreadsheet ids come back as floats (3.0)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _table(header, rows, first_row):
+    keys = [_key(h) for h in header]
+    for number, values in enumerate(rows, start=first_row):
+        if not any(v not in (None, '') for v in values):
+            continue
+        yield number, {k: _cell(v) for k, v in zip(keys, values) if k}
+
+
+def read_rows(file, fmt=None):
+    """
+    [(row_number, {field: value})] from a CSV/XLSX/JSON upload. Row numbers are
+    spreadsheet lines (data starts on row 2) or 1-based positions in a JSON list.
+    """
+    data = file.read()
+    fmt = fmt or detect_format(getattr(file, 'name', ''), data[:8])
+    if fmt not in FORMATS:
+        raise IntakeError(f"Unsupported format '{fmt}'; use one of {', '.join(FORMATS)}.")
+
+    try:
+        if fmt == 'json':
+            return records_rows(json.loads(data))
+        if fmt == 'csv':
+            reader = csv.reader(io.StringIO(data.decode('utf-8-sig')))
+            header = next(reader, [])
+            return list(_table(header, reader, 2))
+
+        import openpyxl  # Only spreadsheet uploads need it; keeps web worker startup lean
+
+        workbook = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+        try:
+            sheet_rows = workbook.active.iter_rows(values_only=True)
+            header = next(sheet_rows, ())
+            return list(_table(header, sheet_rows, 2))
+        finally:
+            workbook.close()
+    except IntakeError:
+        raise
+    except Exception as e:
+        raise IntakeError(f"Could not read the {fmt.upper()} file: {e}")
+
+
+def records_rows(payload):
+    """
+    Rows from JSON: a list of objects or {"complaints": [...]}.
+    """
+    if isinstance(payload, dict):
+        payload = payload.get('complaints')
+    if not isinstance(payload, list) or not all(isinstance(item, dict) for item in payload):
+        raise IntakeError('Expected a list of complaint objects or {"complaints": [...]}.')
+    return [(number, {_key(k): v for k, v in item.items()}) for number, item in enumerate(payload, start=1)]
+
+
+# --- Validation ---
+
+def _split(value):
+    if value in (None, ''):
+        return []
+    if isinstance(value, (list, tuple)):
+        return [v for v in value if v not in (None, '')]
+    if isinstance(value, int):
+        return [value]
+    return [part.strip() for part in str(value).split(SEPARATOR) if part.strip()]
+
+
+def _reference(value):
+    """
+    An id (int) or a case-insensitive name.
+    """
+    if isinstance(value, int) or str(value).strip().isdigit():
+        return int(value)
+    return str(value).strip().lower()
+
+
+def _text(row, field):
+    value = row.get(field)
+    return '' if value is None else str(value).strip()
+
+
+def load_catalogue():
+    """
+    Ministry and department lookups by id and by lower-cased name: two queries per file.
+    """
+    ministries = {}
+    for pk, name in Ministry.objects.values_list('id', 'name'):
+        ministries[pk] = pk
+        ministries[name.strip().lower()] = pk
+    departments, department_names = {}, {}
+    for pk, name, ministry_id in Department.objects.values_list('id', 'name', 'ministry_id'):
+        departments[pk] = ministry_id
+        # Department names only need to be unique within a ministry
+        department_names[(ministry_id, name.strip().lower())] = pk
+    return ministries, departments, department_names
+
+
+def load_citizens(rows):
+    """
+    Account ids for the usernames and phone numbers quoted in `rows`: two queries per file.
+    """
+    usernames = {_text(row, 'citizen') for _, row in rows} - {''}
+    phones = {_text(row, 'phone') for _, row in rows} - {''}
+    by_username = dict(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+    by_phone = defaultdict(list)
+    for phone, user_id in (UserProfile.objects.filter(role='CITIZEN', phone_number__in=phones)
+                           .values_list('phone_number', 'user_id')):
+        by_phone[phone].append(user_id)
+    return by_username, by_phone
+
+
+def operator_ministry(operator):
+    """
+    The only ministry a ministry admin may file complaints to, or None for super admins.
+    """
+    profile = getattr(operator, 'profile', None)
+    if operator.is_superuser or profile is None or profile.role == 'SUPER':
+        return None
+    return profile.ministry_id
+
+
+def validate(rows, operator):
+    """
+    Checks every row against lookups loaded once for the whole file (no
+    per-row queries). Returns (valid, errors): valid rows as dicts of resolved
+    ids, errors as [{"row": n, "errors": [...]}].
+    """
+    ministries, departments, department_names = load_catalogue()
+    by_username, by_phone = load_citizens(rows)
+    only_ministry = operator_ministry(operator)
+    max_title = Complaint._meta.get_field('title').max_length
+
+    valid, errors = [], []
+    for number, row in rows:
+        problems = []
+        title, description = _text(row, 'title'), _text(row, 'description')
+        if not title:
+            problems.append('Title is required.')
+        elif len(title) > max_title:
+            problems.append(f'Title is longer than {max_title} characters.')
+        if not description:
+            problems.append('Description is required.')
+
+        ministry_ids = []
+        for value in _split(row.get('ministries')):
+            pk = ministries.get(_reference(value))
+            if pk is None:
+                problems.append(f"Unknown ministry '{value}'.")
+            elif pk not in ministry_ids:
+                ministry_ids.append(pk)
+        if not _split(row.get('ministries')):
+            problems.append('At least one ministry is required.')
+        if only_ministry is not None and any(pk != only_ministry for pk in ministry_ids):
+            problems.append('You can only file complaints to your own ministry.')
+
+        department_ids = []
+        for value in _split(row.get('departments')):
+            ref = _reference(value)
+            if isinstance(ref, int):
+                pk = ref if ref in departments else None
+            else:
+                pk = next((department_names[(m, ref)] for m in ministry_ids if (m, ref) in department_names), None)
+            if pk is None:
+                problems.append(f"Unknown department '{value}' in the given ministries.")
+            elif departments[pk] not in ministry_ids:
+                problems.append(f"Department '{value}' does not belong to the given ministries.")
+            elif pk not in department_ids:
+                department_ids.append(pk)
+
+        # Complaints belong to the citizen when they have an account, else to the operator entering them
+        created_by_id = operator.pk
+        username, phone = _text(row, 'citizen'), _text(row, 'phone')
+        if username:
+            created_by_id = by_username.get(username)
+            if created_by_id is None:
+                problems.append(f"Unknown citizen '{username}'.")
+        elif phone and by_phone.get(phone):
+            if len(by_phone[phone]) > 1:
+                problems.append(f"Phone number {phone} matches several citizens; give the username instead.")
+            else:
+                created_by_id = by_phone[phone][0]
+
+        if problems:
+            errors.append({'row': number, 'errors': problems})
+        else:
+            valid.append({'row': number, 'title': title, 'description': description, 'ministries': ministry_ids,
+                          'departments': department_ids, 'created_by_id': created_by_id})
+    return valid, errors
+
+
+# --- Writing ---
+
+def _route(item):
+    """
+    What route_complaint() does on the single-create path, from the in-memory
+    automaton: suggestions, plus departments to assign when none were given.
+    """
+    suggestions = suggest_departments(item['title'], item['description'])
+    threshold = getattr(settings, 'ROUTING_AUTO_ASSIGN_SCORE', 2)
+    if item['departments'] or not threshold:
+        return suggestions, []
+    return suggestions, [s['department'] for s in suggestions
+                         if s['score'] >= threshold and s['ministry'] in item['ministries']]
+
+
+def create(valid, operator, channel='other', chunk_size=None):
+    """
+    Inserts validated rows in chunks, one transaction each: bulk_create for
+    the complaints and both link tables, one change-sequence number (taken
+    last), bulk
+    'created'/'routed' events and one batch triage job per chunk. bulk_create
+    skips the Complaint signals, so their work is done here.
+    Returns the created complaints in row order.
+    """
+    chunk_size = chunk_size or getattr(settings, 'INTAKE_CHUNK_SIZE', 1000)
+    MinistryLink, DepartmentLink = Complaint.ministries.through, Complaint.departments.through
+    created = []
+    for i in range(0, len(valid), chunk_size):
+        chunk = valid[i:i + chunk_size]
+        complaints, assigned = [], {}
+        for item in chunk:
+            suggestions, routed = _route(item)
+            complaint = Complaint(title=item['title'], description=item['description'], status='PENDING',
+                                  created_by_id=item['created_by_id'], routing_suggestions=suggestions)
+            complaints.append(complaint)
+            if routed:
+                assigned[complaint.pk] = routed
+        short_codes.assign(complaints)
+
+        with transaction.atomic():
+            now = timezone.now()
+            for complaint in complaints:
+                complaint.created_at = now
+                complaint.due_at = compute_due_at(complaint)
+            Complaint.objects.bulk_create(complaints, batch_size=500)
+            MinistryLink.objects.bulk_create([
+                MinistryLink(complaint_id=c.pk, ministry_id=m) for c, item in zip(complaints, chunk)
+                for m in item['ministries']
+            ], batch_size=1000)
+            DepartmentLink.objects.bulk_create([
+                DepartmentLink(complaint_id=c.pk, department_id=d) for c, item in zip(complaints, chunk)
+                for d in item['departments'] or assigned.get(c.pk, ())
+            ], batch_size=1000)
+            events.record_many('created', [(c.pk, {'status': c.status, 'channel': channel}) for c in complaints],
+                               actor_id=operator.pk, at=now)
+            events.record_many('routed', [(pk, {'departments': d}) for pk, d in assigned.items()],
+                               actor_id=operator.pk, at=now)
+            # One triage job for the chunk instead of a process_complaint_ai job per complaint
+            outbox.enqueue('complaint.bulk_created', 'complaints.tasks.triage_untriaged_complaints',
+                           args=[[str(c.pk) for c in complaints]])
+            # Taken last: the sequence row stays locked until commit, so the inserts above don't hold it
+            seq = sync.next_seq()
+            Complaint.objects.filter(pk__in=[c.pk for c in complaints]).update(change_seq=seq)
+            for complaint in complaints:
+                complaint.change_seq = seq
+        created.extend(complaints)
+    return created
+
+
+def import_rows(rows, operator, channel='other', dry_run=False, skip_invalid=False):
+    """
+    Validates and imports `rows` (see read_rows) on behalf of `operator`.
+    Nothing is written when a row is invalid unless `skip_invalid` is set.
+    """
+    max_rows = getattr(settings, 'INTAKE_MAX_ROWS', 20000)
+    if len(rows) > max_rows:
+        raise IntakeError(f"{len(rows)} rows is more than the {max_rows} allowed per file; split it up.")
+    if channel not in CHANNELS:
+        raise IntakeError(f"Unknown channel '{channel}'; use one of {', '.join(CHANNELS)}.")
+
+    valid, errors = validate(rows, operator)
+    result = {'rows': len(rows), 'valid': len(valid), 'created': 0, 'errors': errors, 'complaints': []}
+    if dry_run or not valid or (errors and not skip_invalid):
+        return result
+
+    created = create(valid, operator, channel=channel)
+    result['created'] = len(created)
+    result['complaints'] = [
+        {'row': item['row'], 'tracking_id': str(c.tracking_id), 'short_code': short_codes.display(c.short_code)}
+        for item, c in zip(valid, created)
+    ]
+    logger.info(f"Intake by {operator.username}: {len(created)} {channel} complaints created, "
+                f"{len(errors)} rows rejected")
+    return result
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from complaints.archive import archivable, archive_old_complaints
+
+
+class Command(BaseCommand):
+    help = 'Moves RESOLVED/REJECTED complaints older than ARCHIVE_AFTER_DAYS to the archive tables in chunks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=None)
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--max-batches', type=int, default=100000, help='Stop after this many chunks.')
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be archived.')
+
+    def handle(self, *args, **options):
+        days = options['older_than_days'] or getattr(settings, 'ARCHIVE_AFTER_DAYS', 365)
+        if options['dry_run']:
+            count = archivable(timezone.now() - timedelta(days=days)).count()
+            self.stdout.write(f"{count} complaints would be archived (closed more than {days} days ago).")
+            return
+
+        moved = archive_old_complaints(days, options['batch_size'], options['max_batches'])
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} complaints."))
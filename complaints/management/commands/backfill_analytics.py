@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from complaints import analytics
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the daily analytics rollups from the Complaint table (all days, or a date range).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='First creation day to rebuild (YYYY-MM-DD).')
+        parser.add_argument('--until', help='Last creation day to rebuild (YYYY-MM-DD).')
+        parser.add_argument('--batch-days', type=int, default=31, help='Days rebuilt per transaction.')
+
+    def handle(self, *args, **options):
+        since = parse_date(options['since']) if options['since'] else None
+        until = parse_date(options['until']) if options['until'] else None
+        if (options['since'] and not since) or (options['until'] and not until):
+            raise CommandError('Dates must be in YYYY-MM-DD format.')
+
+        days, rows = analytics.backfill(since=since, until=until, batch_days=options['batch_days'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} rollup rows across {days} days.'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from complaints.models import ArchivedComplaint, Complaint
+from complaints.short_codes import backfill
+
+
+class Command(BaseCommand):
+    help = 'Assigns short tracking codes to live and archived complaints that predate them, in chunks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Complaints updated per transaction.')
+        parser.add_argument('--dry-run', action='store_true', help='Only count complaints without a code.')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            for model in (Complaint, ArchivedComplaint):
+                count = model.objects.filter(short_code__isnull=True).count()
+                self.stdout.write(f"{model.__name__}: {count} without a short code.")
+            return
+
+        assigned = backfill(options['batch_size'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"Assigned {assigned} short codes."))
@@ -0,0 +1,218 @@
+import io
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import openpyxl
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from complaints.models import Complaint, UserProfile
+from .seed_benchmark_data import BENCH_PREFIX, BENCH_PASSWORD
+
+DEFAULT_BASELINE_DIR = Path(settings.BASE_DIR) / 'benchmarks'
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    k = (len(ordered) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+class Command(BaseCommand):
+    help = (
+        'Drives the main API endpoints against data from seed_benchmark_data and reports throughput, '
+        'p50/p95/p99 latency and query counts. Results can be saved as a baseline and compared later.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50, help='Requests per endpoint.')
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--only', nargs='*', help='Run only these scenario names.')
+        parser.add_argument('--base-url', help='Load-test a running server over HTTP instead of the test client.')
+        parser.add_argument('--concurrency', type=int, default=1, help='Parallel clients (with --base-url).')
+        parser.add_argument('--save-baseline', metavar='NAME', help=f'Save results to {DEFAULT_BASELINE_DIR}/NAME.json')
+        parser.add_argument('--compare', metavar='NAME', help='Compare results against a saved baseline.')
+
+    def handle(self, *args, **options):
+        complaint = Complaint.objects.filter(title__startswith=BENCH_PREFIX).order_by('created_at').first()
+        if complaint is None:
+            raise CommandError('No benchmark data found. Run `manage.py seed_benchmark_data` first.')
+
+        ministry = complaint.ministries.first()
+        admin_username = f'{BENCH_PREFIX}admin_0'
+        admin_profile = UserProfile.objects.filter(user__username__startswith=f'{BENCH_PREFIX}admin_',
+                                                   ministry=ministry).select_related('user').first()
+        if admin_profile:
+            admin_username = admin_profile.user.username
+
+        tid = complaint.tracking_id
+        scenarios = [
+            ('list_super', 'super', 'get', '/api/complaints/', None),
+            ('list_admin', admin_username, 'get', '/api/complaints/', None),
+            ('list_citizen', complaint.created_by.username, 'get', '/api/complaints/', None),
+            ('stats_super', 'super', 'get', '/api/complaints/stats/', None),
+            ('stats_admin', admin_username, 'get', '/api/complaints/stats/', None),
+            ('detail_admin', admin_username, 'get', f'/api/complaints/{tid}/', None),
+            ('patch_admin', admin_username, 'patch', f'/api/complaints/{tid}/', {'status': 'IN_PROGRESS'}),
+            ('bulk_upload', 'super', 'bulk', '/api/bulk-admin-create/', None),
+        ]
+        if options['only']:
+            scenarios = [s for s in scenarios if s[0] in options['only']]
+
+        with override_settings(ALLOWED_HOSTS=['*']):
+            if options['base_url']:
+                results = self.run_http(scenarios, options)
+            else:
+                results = self.run_client(scenarios, options)
+
+        self.report(results)
+
+        if options['compare']:
+            self.compare(results, options['compare'])
+        if options['save_baseline']:
+            DEFAULT_BASELINE_DIR.mkdir(parents=True, exist_ok=True)
+            path = DEFAULT_BASELINE_DIR / f"{options['save_baseline']}.json"
+            path.write_text(json.dumps(results, indent=2))
+            self.stdout.write(self.style.SUCCESS(f'Baseline saved to {path}'))
+
+    # --- Helpers ---
+
+    def username(self, who):
+        return f'{BENCH_PREFIX}super_0' if who == 'super' else who
+
+    def bulk_file(self, iteration):
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.append(['username', 'email', 'password', 'first_name', 'last_name', 'phone', 'ministry', 'department'])
+        stamp = f'{int(time.time() * 1000)}_{iteration}'
+        for i in range(20):
+            ws.append([f'{BENCH_PREFIX}bulk_{stamp}_{i}', f'bulk{i}@example.com', BENCH_PASSWORD,
+                       'Bulk', str(i), '9800000000', 'Bench Ministry 0', None])
+        buf = io.BytesIO()
+        wb.save(buf)
+        buf.seek(0)
+        buf.name = 'bench.xlsx'
+        return buf
+
+    def obtain_token(self, post, who):
+        response = post('/api/token/', {'username': self.username(who), 'password': BENCH_PASSWORD})
+        if response.status_code != 200:
+            raise CommandError(f'Could not authenticate {self.username(who)}: HTTP {response.status_code}')
+        return response.json()['access']
+
+    # --- Runners ---
+
+    def run_client(self, scenarios, options):
+        client = Client()
+        tokens = {}
+        results = {}
+        for name, who, method, url, body in scenarios:
+            if who not in tokens:
+                tokens[who] = self.obtain_token(client.post, who)
+            headers = {'HTTP_AUTHORIZATION': f'Bearer {tokens[who]}'}
+
+            def call(i):
+                if method == 'bulk':
+                    return client.post(url, {'file': self.bulk_file(i)}, **headers)
+                if method == 'patch':
+                    return client.patch(url, json.dumps(body), content_type='application/json', **headers)
+                return client.get(url, **headers)
+
+            iterations = 3 if method == 'bulk' else options['iterations']
+            for i in range(options['warmup'] if method != 'bulk' else 0):
+                call(i)
+
+            latencies, queries, sizes, errors = [], [], [], 0
+            started = time.perf_counter()
+            for i in range(iterations):
+                with CaptureQueriesContext(connection) as ctx:
+                    t0 = time.perf_counter()
+                    response = call(i)
+                    latencies.append(time.perf_counter() - t0)
+                queries.append(len(ctx.captured_queries))
+                sizes.append(len(response.content))
+                errors += int(response.status_code >= 400)
+            results[name] = self.summarize(latencies, time.perf_counter() - started, queries, sizes, errors)
+        return results
+
+    def run_http(self, scenarios, options):
+        import requests
+
+        base = options['base_url'].rstrip('/')
+        session = requests.Session()
+        tokens = {}
+        results = {}
+        for name, who, method, url, body in scenarios:
+            if who not in tokens:
+                tokens[who] = self.obtain_token(lambda u, d: session.post(base + u, data=d), who)
+            headers = {'Authorization': f'Bearer {tokens[who]}'}
+
+            def call(i):
+                t0 = time.perf_counter()
+                if method == 'bulk':
+                    r = session.post(base + url, files={'file': self.bulk_file(i)}, headers=headers)
+                elif method == 'patch':
+                    r = session.patch(base + url, json=body, headers=headers)
+                else:
+                    r = session.get(base + url, headers=headers)
+                return time.perf_counter() - t0, len(r.content), r.status_code
+
+            iterations = 3 if method == 'bulk' else options['iterations']
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=max(1, options['concurrency'])) as pool:
+                samples = list(pool.map(call, range(iterations)))
+            elapsed = time.perf_counter() - started
+            results[name] = self.summarize(
+                [s[0] for s in samples], elapsed, [], [s[1] for s in samples], sum(s[2] >= 400 for s in samples)
+            )
+        return results
+
+    def summarize(self, latencies, elapsed, queries, sizes, errors):
+        return {
+            'requests': len(latencies),
+            'errors': errors,
+            'rps': len(latencies) / elapsed if elapsed else 0.0,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'mean_ms': statistics.fmean(latencies) * 1000 if latencies else 0.0,
+            'queries': max(queries) if queries else None,
+            'bytes': int(statistics.fmean(sizes)) if sizes else 0,
+        }
+
+    # --- Output ---
+
+    def report(self, results):
+        self.stdout.write(f"\n{'scenario':<16} {'req':>5} {'err':>4} {'req/s':>8} {'p50 ms':>8} "
+                          f"{'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'bytes':>9}")
+        for name, r in results.items():
+            queries = '-' if r['queries'] is None else r['queries']
+            self.stdout.write(
+                f"{name:<16} {r['requests']:>5} {r['errors']:>4} {r['rps']:>8.1f} {r['p50_ms']:>8.1f} "
+                f"{r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {queries:>8} {r['bytes']:>9}"
+            )
+
+    def compare(self, results, name):
+        path = DEFAULT_BASELINE_DIR / f'{name}.json'
+        if not path.exists():
+            raise CommandError(f'Baseline {path} not found.')
+        baseline = json.loads(path.read_text())
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\nCompared with baseline "{name}"'))
+        for scenario, r in results.items():
+            base = baseline.get(scenario)
+            if not base:
+                continue
+            delta = (r['p95_ms'] - base['p95_ms']) / base['p95_ms'] * 100 if base['p95_ms'] else 0.0
+            line = (f"{scenario:<16} p95 {base['p95_ms']:.1f} -> {r['p95_ms']:.1f} ms ({delta:+.0f}%), "
+                    f"queries {base['queries']} -> {r['queries']}")
+            regressed = delta > 10 or (r['queries'] or 0) > (base['queries'] or 0)
+            self.stdout.write(self.style.ERROR(line) if regressed else self.style.SUCCESS(line))
@@ -0,0 +1,43 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from complaints.frontend import VENDOR
+
+
+class Command(BaseCommand):
+    help = (
+        'Downloads the pinned third-party scripts and styles of the portal pages into frontend/static/vendor/, '
+        'so collectstatic serves them hashed and precompressed instead of pages loading them from CDNs.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Download files that are already present.')
+        parser.add_argument('--timeout', type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        import requests
+
+        target = os.path.join(settings.BASE_DIR, 'frontend', 'static', 'vendor')
+        os.makedirs(target, exist_ok=True)
+        failed = []
+        for name, (url, filename) in VENDOR.items():
+            path = os.path.join(target, filename)
+            if os.path.exists(path) and not options['force']:
+                self.stdout.write(f"{filename}: present")
+                continue
+            try:
+                response = requests.get(url, timeout=options['timeout'])
+                response.raise_for_status()
+            except requests.RequestException as e:
+                self.stderr.write(f"{filename}: {e}")
+                failed.append(name)
+                continue
+            with open(path, 'wb') as out:
+                out.write(response.content)
+            self.stdout.write(f"{filename}: {len(response.content) / 1024:.0f} KB from {url}")
+
+        if failed:
+            raise CommandError(f"Could not fetch {', '.join(failed)}; pages keep loading those from the CDN.")
+        self.stdout.write(self.style.SUCCESS('Vendor assets ready; run collectstatic to hash and compress them.'))
@@ -0,0 +1,56 @@
+import csv
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from complaints import intake
+
+
+class Command(BaseCommand):
+    help = (
+        'Imports complaints collected offline (hotline, paper forms) from a CSV/XLSX/JSON file '
+        'in chunks, with one batch triage job per chunk.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV, XLSX or JSON file.')
+        parser.add_argument('--operator', required=True,
+                            help='Username of the admin entering the complaints; owns those without a citizen.')
+        parser.add_argument('--channel', default='other', choices=intake.CHANNELS)
+        parser.add_argument('--format', choices=intake.FORMATS, help='Defaults to the file extension.')
+        parser.add_argument('--dry-run', action='store_true', help='Only validate the file.')
+        parser.add_argument('--skip-invalid', action='store_true', help='Import the valid rows even if some fail.')
+        parser.add_argument('--receipts', help='Write row, tracking ID and short code of each complaint to this CSV.')
+
+    def handle(self, *args, **options):
+        operator = User.objects.filter(username=options['operator']).select_related('profile').first()
+        if operator is None:
+            raise CommandError(f"User '{options['operator']}' not found.")
+
+        start = time.perf_counter()
+        try:
+            with open(options['path'], 'rb') as file:
+                rows = intake.read_rows(file, fmt=options['format'])
+            result = intake.import_rows(rows, operator, channel=options['channel'],
+                                        dry_run=options['dry_run'], skip_invalid=options['skip_invalid'])
+        except (OSError, intake.IntakeError) as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - start
+
+        for error in result['errors'][:50]:
+            self.stderr.write(f"Row {error['row']}: {' '.join(error['errors'])}")
+        if len(result['errors']) > 50:
+            self.stderr.write(f"... and {len(result['errors']) - 50} more invalid rows")
+
+        if options['receipts'] and result['complaints']:
+            with open(options['receipts'], 'w', newline='') as out:
+                writer = csv.DictWriter(out, fieldnames=['row', 'tracking_id', 'short_code'])
+                writer.writeheader()
+                writer.writerows(result['complaints'])
+
+        summary = (f"{result['rows']} rows, {result['valid']} valid, {result['created']} complaints created "
+                   f"in {elapsed:.2f}s.")
+        if result['errors'] and not result['created'] and not options['dry_run']:
+            raise CommandError(f"{summary} Nothing imported: fix the rows above or pass --skip-invalid.")
+        self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from complaints import outbox
+
+
+class Command(BaseCommand):
+    help = 'Relays pending outbox events to the Celery broker in batches (runs until stopped unless --once).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain due events once and exit.')
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to sleep when idle.')
+        parser.add_argument('--retention-days', type=int, default=7, help='Keep sent events this long.')
+
+    def handle(self, *args, **options):
+        last_purge = 0.0
+        while True:
+            sent, failed = outbox.relay_batch(batch_size=options['batch_size'])
+            if sent or failed:
+                self.stdout.write(f"Outbox relay: {sent} sent, {failed} failed")
+
+            if time.monotonic() - last_purge > 3600:
+                purged = outbox.purge_sent(options['retention_days'])
+                if purged:
+                    self.stdout.write(f"Outbox relay: purged {purged} delivered events")
+                last_purge = time.monotonic()
+
+            full_batch = sent + failed >= options['batch_size']
+            if options['once'] and not full_batch:
+                break
+            if not full_batch:
+                time.sleep(options['interval'])
@@ -0,0 +1,61 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from complaints.instrumentation import PIDS_KEY, SNAPSHOT_KEY, collect_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Prints the slowest endpoints, Celery tasks and SQL statements recorded by the instrumentation middleware.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=15, help='Rows to show per section.')
+        parser.add_argument('--sort', choices=['avg', 'total', 'max', 'queries'], default='avg',
+                            help='Sort endpoints by average/total/max latency or queries per call.')
+        parser.add_argument('--reset', action='store_true', help='Clear all published snapshots afterwards.')
+
+    def handle(self, *args, **options):
+        merged = collect_snapshots()
+        limit = options['limit']
+
+        sort_keys = {
+            'avg': lambda v: v['seconds'] / v['count'],
+            'total': lambda v: v['seconds'],
+            'max': lambda v: v['max'],
+            'queries': lambda v: v['sql_count'] / v['count'],
+        }
+        rows = sorted(
+            ((key.split('|', 1), v) for key, v in merged['series'].items() if v['count']),
+            key=lambda item: sort_keys[options['sort']](item[1]),
+            reverse=True,
+        )
+
+        for kind, title in (('http', 'Endpoints'), ('task', 'Celery tasks'), ('db', 'Database connects / pool waits')):
+            section = [(name, v) for (k, name), v in rows if k == kind][:limit]
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{title}'))
+            if not section:
+                self.stdout.write('  (no data)')
+                continue
+            self.stdout.write(f"  {'calls':>7} {'avg ms':>9} {'max ms':>9} {'sql/call':>9} "
+                              f"{'sql ms/call':>11} {'ser ms/call':>11} {'errors':>6}  name")
+            for name, v in section:
+                n = v['count']
+                self.stdout.write(
+                    f"  {n:>7} {v['seconds'] / n * 1000:>9.1f} {v['max'] * 1000:>9.1f} "
+                    f"{v['sql_count'] / n:>9.1f} {v['sql_seconds'] / n * 1000:>11.1f} "
+                    f"{v['serialize_seconds'] / n * 1000:>11.1f} {v['errors']:>6}  {name}"
+                )
+
+        self.stdout.write(self.style.MIGRATE_HEADING('\nSQL statements by total time'))
+        queries = sorted(merged['queries'].items(), key=lambda item: item[1]['seconds'], reverse=True)[:limit]
+        if not queries:
+            self.stdout.write('  (no data)')
+        for sql, v in queries:
+            self.stdout.write(
+                f"  {v['count']:>7}x  total {v['seconds'] * 1000:>9.1f}ms  max {v['max'] * 1000:>8.1f}ms  {sql[:160]}"
+            )
+
+        if options['reset']:
+            for pid in cache.get(PIDS_KEY) or []:
+                cache.delete(SNAPSHOT_KEY.format(pid=pid))
+            cache.delete(PIDS_KEY)
+            self.stdout.write(self.style.SUCCESS('\nSnapshots cleared.'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from complaints import profiling
+
+
+class Command(BaseCommand):
+    help = (
+        'Profiles the next N runs of a Celery task on any worker (no redeploy). Results appear under '
+        '"Request profiles" in the admin. For HTTP requests, super admins send the X-Profile: 1 header instead.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('task', help='Task name, e.g. complaints.tasks.process_complaint_ai')
+        parser.add_argument('--count', type=int, default=1)
+
+    def handle(self, *args, **options):
+        profiling.arm(options['task'], options['count'])
+        self.stdout.write(self.style.SUCCESS(f"Profiling the next {options['count']} run(s) of {options['task']}."))
@@ -0,0 +1,103 @@
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# What each process type imports before it can serve its first request/task
+TARGETS = {
+    'web': (
+        "from grievance_portal.wsgi import application\n"
+        "from django.conf import settings\n"
+        "import importlib; importlib.import_module(settings.ROOT_URLCONF)\n"
+    ),
+    'worker': (
+        "import django; django.setup()\n"
+        "from grievance_portal.celery import app\n"
+        "app.loader.import_default_modules()\n"
+    ),
+    'command': "import django; django.setup()\n",
+}
+
+# Modules web processes must never load (they only enqueue AI work)
+WEB_FORBIDDEN = ('google.generativeai', 'google.api_core', 'grpc')
+
+
+def parse_importtime(stderr):
+    """
+    Parses `python -X importtime` output into (name, self_us, cumulative_us) rows.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures process startup (web, worker, command) in a fresh interpreter with `python -X importtime` '
+        'and reports the most expensive packages and modules.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('targets', nargs='*', help=f"Any of {', '.join(TARGETS)}. Default: all.")
+        parser.add_argument('--limit', type=int, default=15, help='Rows to show per section.')
+        parser.add_argument('--strict', action='store_true',
+                            help='Exit with an error if the web target imports AI dependencies.')
+
+    def handle(self, *args, **options):
+        unknown = [target for target in options['targets'] if target not in TARGETS]
+        if unknown:
+            raise CommandError(f"Unknown target(s) {', '.join(unknown)}; choose from {', '.join(TARGETS)}.")
+
+        violations = []
+        for target in options['targets'] or list(TARGETS):
+            rows, seconds = self.run_target(target)
+            self.report(target, rows, seconds, options['limit'])
+            if target == 'web':
+                loaded = sorted(name for name, _, _ in rows if name.startswith(WEB_FORBIDDEN))
+                if loaded:
+                    violations.extend(loaded)
+                    self.stdout.write(self.style.ERROR(f"  web imports AI dependencies: {', '.join(loaded[:5])}"))
+                else:
+                    self.stdout.write(self.style.SUCCESS('  web imports no AI dependencies'))
+
+        if violations and options['strict']:
+            raise CommandError('Web startup imports AI dependencies.')
+
+    def run_target(self, target):
+        code = (
+            "import time; _t = time.perf_counter()\n"
+            + TARGETS[target]
+            + "import sys; print(f'STARTUP {time.perf_counter() - _t:.6f}', file=sys.stderr)\n"
+        )
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'grievance_portal.settings'))
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f'{target} startup failed:\n{result.stderr[-2000:]}')
+        seconds = next(float(line.split()[1]) for line in result.stderr.splitlines() if line.startswith('STARTUP '))
+        return parse_importtime(result.stderr), seconds
+
+    def report(self, target, rows, seconds, limit):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'\n{target}: {seconds * 1000:.0f}ms wall, {len(rows)} modules imported'
+        ))
+
+        packages = defaultdict(int)
+        for name, self_us, _ in rows:
+            packages[name.split('.')[0]] += self_us
+        self.stdout.write('  Packages by import time (self):')
+        for package, us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:limit]:
+            self.stdout.write(f"    {us / 1000:>8.1f}ms  {package}")
+
+        self.stdout.write('  Slowest modules (cumulative):')
+        for name, _, cumulative_us in sorted(rows, key=lambda row: row[2], reverse=True)[:limit]:
+            self.stdout.write(f"    {cumulative_us / 1000:>8.1f}ms  {name}")
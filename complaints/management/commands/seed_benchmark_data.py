@@ -0,0 +1,138 @@
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from complaints import short_codes, sync
+from complaints.models import Ministry, Department, Complaint, ComplaintUpdate, UserProfile
+
+BENCH_PREFIX = 'bench_'
+BENCH_PASSWORD = 'bench-pass-123'
+
+WORDS = (
+    'road water school teacher electricity delay bribe officer license passport hospital '
+    'scholarship exam certificate land tax pension bridge drainage internet fee'
+).split()
+
+
+class Command(BaseCommand):
+    help = 'Seeds a deterministic synthetic dataset (ministries, departments, users, complaints) using bulk_create.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ministries', type=int, default=20)
+        parser.add_argument('--departments', type=int, default=5, help='Departments per ministry.')
+        parser.add_argument('--citizens', type=int, default=500)
+        parser.add_argument('--admins', type=int, default=40)
+        parser.add_argument('--complaints', type=int, default=10000)
+        parser.add_argument('--updates', type=int, default=2, help='Average ComplaintUpdate rows per complaint.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--flush', action='store_true', help='Delete previously seeded benchmark data first.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        batch = options['batch_size']
+        start = time.perf_counter()
+
+        if options['flush']:
+            self.flush()
+
+        with transaction.atomic():
+            ministries = Ministry.objects.bulk_create(
+                [Ministry(name=f"Bench Ministry {i}") for i in range(options['ministries'])],
+                ignore_conflicts=True,
+            )
+            ministries = list(Ministry.objects.filter(name__startswith='Bench Ministry '))
+            Department.objects.bulk_create(
+                [Department(ministry=m, name=f"Bench Department {m.pk}-{j}")
+                 for m in ministries for j in range(options['departments'])],
+                ignore_conflicts=True,
+            )
+            departments = list(Department.objects.filter(ministry__in=ministries))
+            departments_by_ministry = {}
+            for d in departments:
+                departments_by_ministry.setdefault(d.ministry_id, []).append(d)
+
+            # One hash for every seeded account keeps seeding fast.
+            password = make_password(BENCH_PASSWORD)
+            citizens = self.create_users('citizen', options['citizens'], password, batch)
+            admins = self.create_users('admin', options['admins'], password, batch)
+            supers = self.create_users('super', 1, password, batch, is_staff=True)
+
+            UserProfile.objects.bulk_create(
+                [UserProfile(user=u, role='CITIZEN', phone_number='98' + str(u.pk).zfill(8)) for u in citizens]
+                + [UserProfile(user=u, role='ADMIN', ministry=ministries[i % len(ministries)]) for i, u in enumerate(admins)]
+                + [UserProfile(user=u, role='SUPER') for u in supers],
+                ignore_conflicts=True,
+                batch_size=batch,
+            )
+
+        statuses = [s for s, _ in Complaint.STATUS_CHOICES]
+        priorities = [p for p, _ in Complaint.PRIORITY_CHOICES] + [None]
+        ComplaintMinistry = Complaint.ministries.through
+        ComplaintDepartment = Complaint.departments.through
+        remaining = options['complaints']
+
+        while remaining > 0:
+            size = min(batch, remaining)
+            remaining -= size
+            with transaction.atomic():
+                seq = sync.next_seq()  # bulk_create skips the pre_save signal that assigns it
+                complaints = [
+                    Complaint(
+                        title=f"{BENCH_PREFIX}{' '.join(rng.choices(WORDS, k=4))}",
+                        description=' '.join(rng.choices(WORDS, k=rng.randint(20, 80))),
+                        status=rng.choice(statuses),
+                        created_by=rng.choice(citizens),
+                        ai_suggested_priority=rng.choice(priorities),
+                        change_seq=seq,
+                    )
+                    for _ in range(size)
+                ]
+                short_codes.assign(complaints)  # bulk_create skips the pre_save signal
+                Complaint.objects.bulk_create(complaints)
+
+                ministry_links, department_links, updates = [], [], []
+                for c in complaints:
+                    for m in rng.sample(ministries, k=min(len(ministries), rng.choice((1, 1, 1, 2)))):
+                        ministry_links.append(ComplaintMinistry(complaint_id=c.pk, ministry_id=m.pk))
+                        if departments_by_ministry.get(m.pk):
+                            d = rng.choice(departments_by_ministry[m.pk])
+                            department_links.append(ComplaintDepartment(complaint_id=c.pk, department_id=d.pk))
+                    for _ in range(rng.randint(0, options['updates'] * 2)):
+                        updates.append(ComplaintUpdate(
+                            complaint=c, user=rng.choice(admins) if admins else c.created_by,
+                            update_text=' '.join(rng.choices(WORDS, k=12)), change_seq=seq,
+                        ))
+
+                ComplaintMinistry.objects.bulk_create(ministry_links, batch_size=batch)
+                ComplaintDepartment.objects.bulk_create(department_links, batch_size=batch)
+                ComplaintUpdate.objects.bulk_create(updates, batch_size=batch)
+
+            self.stdout.write(f"  ... {options['complaints'] - remaining} complaints")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(ministries)} ministries, {len(departments)} departments, {len(citizens)} citizens, "
+            f"{len(admins)} admins and {options['complaints']} complaints in {time.perf_counter() - start:.1f}s. "
+            f"All accounts use password '{BENCH_PASSWORD}'."
+        ))
+
+    def create_users(self, kind, count, password, batch, is_staff=False):
+        prefix = f"{BENCH_PREFIX}{kind}_"
+        User.objects.bulk_create(
+            [User(username=f"{prefix}{i}", email=f"{prefix}{i}@example.com", password=password,
+                  first_name=kind.title(), last_name=str(i), is_staff=is_staff)
+             for i in range(count)],
+            ignore_conflicts=True,
+            batch_size=batch,
+        )
+        return list(User.objects.filter(username__startswith=prefix).order_by('pk')[:count])
+
+    def flush(self):
+        deleted, _ = Complaint.objects.filter(title__startswith=BENCH_PREFIX).delete()
+        users, _ = User.objects.filter(username__startswith=BENCH_PREFIX).delete()
+        Ministry.objects.filter(name__startswith='Bench Ministry ').delete()
+        self.stdout.write(f"Flushed {deleted} complaint rows and {users} user rows.")
@@ -0,0 +1,111 @@
+import time
+import zlib
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from complaints.classifier import NaiveBayesHead, TriageModel, complaint_text, features
+from complaints.models import ArchivedComplaint, Complaint
+
+
+class Command(BaseCommand):
+    help = (
+        'Trains the local triage classifier (category + priority) from complaints already triaged by the LLM '
+        'and saves it to AI_LOCAL_MODEL_PATH.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Model path (default: settings.AI_LOCAL_MODEL_PATH).')
+        parser.add_argument('--min-examples', type=int, default=20,
+                            help='Categories with fewer training rows are dropped.')
+        parser.add_argument('--limit', type=int, help='Use only the most recent N rows per table.')
+        parser.add_argument('--no-eval', action='store_true', help='Skip the 10%% holdout evaluation.')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        rows = self.load_rows(options['limit'])
+        if not rows:
+            raise CommandError('No triaged complaints to learn from.')
+
+        category_counts = Counter(category for _, _, _, category, _ in rows)
+        keep = {c for c, n in category_counts.items() if n >= options['min_examples']}
+        rows = [row for row in rows if row[3] in keep]
+        if len(keep) < 2:
+            raise CommandError(f'Need at least two categories with {options["min_examples"]}+ examples.')
+        self.stdout.write(f'Training on {len(rows)} complaints, {len(keep)} categories '
+                          f'({len(category_counts) - len(keep)} rare categories dropped).')
+
+        docs = [features(complaint_text(title, description)) for _, title, description, _, _ in rows]
+
+        if not options['no_eval']:
+            # Deterministic 10% holdout, keyed on the tracking id
+            test = [zlib.crc32(str(row[0]).encode()) % 10 == 0 for row in rows]
+            self.evaluate(docs, rows, test)
+
+        model = TriageModel(
+            heads={
+                'category': NaiveBayesHead.train(docs, [row[3] for row in rows]),
+                'priority': self.train_priority(docs, rows),
+            },
+            meta={'rows': len(rows), 'categories': sorted(keep)},
+        )
+        path = options['output'] or settings.AI_LOCAL_MODEL_PATH
+        model.save(path)
+        self.stdout.write(self.style.SUCCESS(f'Saved model to {path} in {time.perf_counter() - start:.1f}s.'))
+
+    def load_rows(self, limit):
+        """
+        (tracking_id, title, description, category, priority) of LLM-triaged complaints.
+        Rows the local model labelled itself are excluded so it never learns from its own output.
+        """
+        rows = []
+        for model in (Complaint, ArchivedComplaint):
+            qs = (
+                model.objects.filter(ai_suggested_category__isnull=False)
+                .exclude(ai_suggested_category='')
+                .exclude(ai_triage_source='local')
+                .order_by('-created_at')
+                .values_list('tracking_id', 'title', 'description', 'ai_suggested_category', 'ai_suggested_priority')
+            )
+            if limit:
+                qs = qs[:limit]
+            rows.extend((tid, title, desc, category.strip(), priority)
+                        for tid, title, desc, category, priority in qs.iterator(chunk_size=2000))
+        return rows
+
+    def train_priority(self, docs, rows):
+        valid = {p for p, _ in Complaint.PRIORITY_CHOICES}
+        pairs = [(doc, row[4]) for doc, row in zip(docs, rows) if row[4] in valid]
+        return NaiveBayesHead.train([d for d, _ in pairs], [p for _, p in pairs])
+
+    def evaluate(self, docs, rows, test):
+        train_docs = [d for d, t in zip(docs, test) if not t]
+        train_rows = [r for r, t in zip(rows, test) if not t]
+        test_docs = [d for d, t in zip(docs, test) if t]
+        test_rows = [r for r, t in zip(rows, test) if t]
+        if not test_docs or len({r[3] for r in train_rows}) < 2:
+            self.stdout.write('  Not enough data for a holdout evaluation.')
+            return
+
+        category = NaiveBayesHead.train(train_docs, [r[3] for r in train_rows])
+        priority = self.train_priority(train_docs, train_rows)
+
+        started = time.perf_counter()
+        predicted = category.predict_many(test_docs)
+        elapsed = time.perf_counter() - started
+        accuracy = sum(p == r[3] for (p, _), r in zip(predicted, test_rows)) / len(test_rows)
+        self.stdout.write(f'  Category accuracy on {len(test_rows)} held-out rows: {accuracy:.1%} '
+                          f'({len(test_rows) / elapsed:,.0f} complaints/s)')
+
+        confident = [(p, r) for (p, conf), r in zip(predicted, test_rows)
+                     if conf >= getattr(settings, 'AI_LOCAL_CONFIDENCE', 0.8)]
+        if confident:
+            hits = sum(p == r[3] for p, r in confident)
+            self.stdout.write(f'  Above the confidence threshold: {len(confident) / len(test_rows):.0%} of rows, '
+                              f'{hits / len(confident):.1%} accurate (the rest would be escalated)')
+
+        labelled = [(d, r[4]) for d, r in zip(test_docs, test_rows) if r[4] in priority.labels]
+        if labelled:
+            hits = sum(p == label for (p, _), (_, label) in zip(priority.predict_many([d for d, _ in labelled]), labelled))
+            self.stdout.write(f'  Priority accuracy: {hits / len(labelled):.1%}')
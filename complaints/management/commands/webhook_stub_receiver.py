@@ -0,0 +1,76 @@
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand, CommandError
+
+from complaints.models import WebhookEndpoint
+from complaints.webhooks import BATCH_HEADER, SIGNATURE_HEADER, verify_signature
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs a local webhook receiver for testing deliveries: verifies signatures, prints each batch '
+        'and can fail or stall on purpose to exercise retries and the dead-letter queue.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--secret', help='Signing secret to verify against.')
+        parser.add_argument('--endpoint', type=int, help='Read the signing secret from this WebhookEndpoint.')
+        parser.add_argument('--fail-rate', type=float, default=0.0, help='Fraction of batches answered with 503.')
+        parser.add_argument('--delay', type=float, default=0.0, help='Seconds to wait before answering.')
+
+    def handle(self, *args, **options):
+        secret = options['secret']
+        if options['endpoint']:
+            endpoint = WebhookEndpoint.objects.filter(pk=options['endpoint']).first()
+            if endpoint is None:
+                raise CommandError(f"WebhookEndpoint {options['endpoint']} not found.")
+            secret = endpoint.secret
+        if not secret:
+            raise CommandError('Pass --secret or --endpoint.')
+
+        command = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive, like a real receiver
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if options['delay']:
+                    time.sleep(options['delay'])
+                if not verify_signature(secret, body, self.headers.get(SIGNATURE_HEADER)):
+                    return self.answer(401, 'bad signature')
+                if random.random() < options['fail_rate']:
+                    return self.answer(503, 'simulated failure')
+
+                events = json.loads(body)['events']
+                command.stdout.write(
+                    f"batch {self.headers.get(BATCH_HEADER)}: {len(events)} events "
+                    f"(#{events[0]['id']}..#{events[-1]['id']}) "
+                    + ', '.join(f"{e['kind']}:{e['complaint'][:8]}" for e in events[:5])
+                    + (' ...' if len(events) > 5 else '')
+                )
+                self.answer(200, 'ok')
+
+            def answer(self, code, text):
+                payload = text.encode()
+                self.send_response(code)
+                self.send_header('Content-Type', 'text/plain')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', options['port']), Handler)
+        self.stdout.write(self.style.SUCCESS(f"Webhook stub receiver on http://127.0.0.1:{options['port']}/"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
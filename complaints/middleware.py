@@ -0,0 +1,153 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # Optional: pip install brotli
+    brotli = None
+
+from . import db_router, instrumentation, profiling
+
+logger = logging.getLogger('complaints.instrumentation')
+
+
+class InstrumentationMiddleware:
+    """
+    Records per-view SQL count, SQL time, serialization time and total latency.
+    Aggregates are exported at /metrics and summarized by `manage.py perf_report`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'METRICS_ENABLED', True) or request.path == '/metrics':
+            return self.get_response(request)
+
+        stats = instrumentation.new_stats()
+        instrumentation.activate(stats)
+        timer = instrumentation.QueryTimer(stats)
+        start = time.perf_counter()
+        error = False
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(timer))
+                response = self.get_response(request)
+            error = response.status_code >= 500
+            return response
+        except Exception:
+            error = True
+            raise
+        finally:
+            instrumentation.deactivate()
+            elapsed = time.perf_counter() - start
+            match = getattr(request, 'resolver_match', None)
+            view = f"{request.method} {match.view_name if match else 'unresolved'}"
+            instrumentation.registry.observe(
+                'http', view, elapsed, error=error,
+                sql_count=stats['sql_count'], sql_seconds=stats['sql_seconds'],
+                serialize_seconds=stats['serialize_seconds'],
+            )
+            instrumentation.registry.observe_queries(stats['queries'])
+
+            slow_ms = getattr(settings, 'SLOW_REQUEST_MS', 1000)
+            if elapsed * 1000 >= slow_ms:
+                logger.warning(f"Slow request {view} {request.path}: {elapsed * 1000:.0f}ms, "
+                               f"{stats['sql_count']} queries ({stats['sql_seconds'] * 1000:.0f}ms SQL, "
+                               f"{stats['connect_seconds'] * 1000:.0f}ms connecting)")
+
+
+class ProfilingMiddleware:
+    """
+    Opt-in per-request profiler: super admins send `X-Profile: 1` (or
+    ?profile=1) with their bearer token, and PROFILING_SAMPLE_RATE samples
+    ordinary traffic (SQL parameters redacted). The profile is stored as a
+    RequestProfile and its id returned in X-Profile-Id.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'PROFILING_ENABLED', True) or profiling.Profiler.active():
+            return self.get_response(request)
+        asked = profiling.requested(request)
+        if not (asked or profiling.sampled(getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0))):
+            return self.get_response(request)
+
+        profiler = profiling.Profiler('http', request.path, keep_params=asked)
+        profiler.start()
+        response = None
+        try:
+            response = self.get_response(request)
+            return response
+        finally:
+            profiler.stop()
+            # DRF authenticates inside the view and copies the user back onto the Django request
+            user = getattr(request, 'user', None)
+            match = getattr(request, 'resolver_match', None)
+            profiler.name = match.view_name if match else 'unresolved'
+            try:
+                saved = profiler.save(user=user, method=request.method, path=request.get_full_path(),
+                                      status_code=response.status_code if response is not None else None,
+                                      error=response is None or response.status_code >= 500)
+                if response is not None:
+                    response['X-Profile-Id'] = str(saved.pk)
+            except Exception as e:
+                logger.error(f"Could not store profile of {request.path}: {e}")
+
+
+class ReplicaStickyMiddleware:
+    """
+    Any successful write (POST/PUT/PATCH/DELETE, API or admin) makes the user
+    sticky to the primary, so their next reads don't hit a lagging replica.
+    Goes after AuthenticationMiddleware; DRF copies its user onto the request.
+    """
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        user = getattr(request, 'user', None)
+        if (request.method not in self.SAFE_METHODS and response.status_code < 400
+                and user is not None and user.is_authenticated):
+            db_router.mark_sticky(user.pk)
+        return response
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Brotli for clients that accept it (API responses only), gzip otherwise.
+    HTML keeps Django's gzip, which pads output against BREACH.
+    """
+    min_length = 200
+
+    def process_response(self, request, response):
+        accepts_br = 'br' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if (brotli is None or not accepts_br or response.streaming or response.has_header('Content-Encoding')
+                or response.get('Content-Type', '').startswith('text/html')):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < self.min_length:
+            return response
+
+        compressed = brotli.compress(response.content, quality=getattr(settings, 'BROTLI_QUALITY', 5))
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        if response.has_header('ETag'):
+            # Weak, since the bytes differ from the uncompressed representation
+            response['ETag'] = 'W/' + response['ETag'].removeprefix('W/')
+        response['Content-Encoding'] = 'br'
+        return response
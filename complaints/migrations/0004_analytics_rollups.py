@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0003_remove_complaint_department_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobWatermark',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('value', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='resolved_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='complaint',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name='DailyComplaintRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('category', models.CharField(blank=True, default='', max_length=255)),
+                ('priority', models.CharField(blank=True, default='', max_length=10)),
+                ('created_count', models.PositiveIntegerField(default=0)),
+                ('pending_count', models.PositiveIntegerField(default=0)),
+                ('in_progress_count', models.PositiveIntegerField(default=0)),
+                ('resolved_count', models.PositiveIntegerField(default=0)),
+                ('rejected_count', models.PositiveIntegerField(default=0)),
+                ('resolution_seconds', models.BigIntegerField(default=0)),
+                ('department', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='complaints.department')),
+                ('ministry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='complaints.ministry')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['ministry', 'day'], name='complaints__ministr_5164bf_idx'), models.Index(fields=['department', 'day'], name='complaints__departm_d08372_idx'), models.Index(fields=['day'], name='complaints__day_4cc103_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:00
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_due_at(apps, schema_editor):
+    """
+    One UPDATE per priority: due_at = created_at + SLA hours for open complaints.
+    """
+    Complaint = apps.get_model('complaints', 'Complaint')
+    hours = getattr(settings, 'SLA_HOURS', {'HIGH': 72, 'MEDIUM': 168, 'LOW': 336, None: 168})
+    open_complaints = Complaint.objects.exclude(status__in=('RESOLVED', 'REJECTED'))
+    for priority in ('HIGH', 'MEDIUM', 'LOW', None):
+        qs = open_complaints.filter(ai_suggested_priority=priority) if priority else \
+            open_complaints.filter(ai_suggested_priority__isnull=True)
+        qs.update(due_at=models.F('created_at') + timedelta(hours=hours.get(priority, hours.get(None, 168))))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0004_analytics_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='due_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='escalated_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(condition=models.Q(('due_at__isnull', False), ('escalated_at__isnull', True)), fields=['due_at'], name='complaint_sla_due_idx'),
+        ),
+        migrations.RunPython(backfill_due_at, migrations.RunPython.noop),
+    ]
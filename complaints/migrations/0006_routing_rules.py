@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0005_complaint_sla'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='routing_suggestions',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.CreateModel(
+            name='RoutingRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('KEYWORD', 'Keyword / phrase'), ('REGEX', 'Regular expression'), ('CATEGORY', 'AI category (exact)')], default='KEYWORD', max_length=10)),
+                ('pattern', models.CharField(max_length=500)),
+                ('weight', models.PositiveSmallIntegerField(default=1)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='routing_rules', to='complaints.department')),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0009_ai_triage_source'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['created_at'], name='complaint_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaintupdate',
+            index=models.Index(fields=['created_at'], name='complaintupdate_created_idx'),
+        ),
+    ]
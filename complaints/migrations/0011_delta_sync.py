@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:22
+
+from django.db import migrations, models
+
+
+def backfill_change_seq(apps, schema_editor):
+    """
+    Gives every existing complaint and update a distinct sequence number
+    (oldest first) so the first full sync pages cleanly.
+    """
+    ChangeSequence = apps.get_model('complaints', 'ChangeSequence')
+    seq = 0
+    for model_name, order in (('Complaint', 'updated_at'), ('ComplaintUpdate', 'created_at')):
+        model = apps.get_model('complaints', model_name)
+        batch = []
+        for pk in model.objects.order_by(order, 'pk').values_list('pk', flat=True).iterator(chunk_size=2000):
+            seq += 1
+            batch.append(model(pk=pk, change_seq=seq))
+            if len(batch) >= 2000:
+                model.objects.bulk_update(batch, ['change_seq'])
+                batch = []
+        model.objects.bulk_update(batch, ['change_seq'])
+    ChangeSequence.objects.update_or_create(name='sync', defaults={'value': seq})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0010_admin_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeSequence',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SyncTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('complaint', 'Complaint'), ('update', 'Complaint Update')], max_length=20)),
+                ('object_id', models.CharField(max_length=64)),
+                ('complaint_id', models.UUIDField()),
+                ('reason', models.CharField(choices=[('deleted', 'Deleted'), ('archived', 'Archived')], default='deleted', max_length=20)),
+                ('created_by_id', models.IntegerField(null=True)),
+                ('ministry_ids', models.JSONField(default=list)),
+                ('department_ids', models.JSONField(default=list)),
+                ('change_seq', models.BigIntegerField(db_index=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='change_seq',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='complaintupdate',
+            name='change_seq',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_change_seq, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:25
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_events(apps, schema_editor):
+    """
+    Seeds the log from current state: a 'created' event per complaint (live
+    and archived), one 'status' event to its current status if it has moved
+    on, and a 'remark' event per update. Intermediate history was never
+    stored, so these events carry backfilled=true.
+    """
+    ComplaintEvent = apps.get_model('complaints', 'ComplaintEvent')
+
+    def flush(batch):
+        ComplaintEvent.objects.bulk_create(batch, batch_size=2000)
+        batch.clear()
+
+    batch = []
+    for model_name in ('Complaint', 'ArchivedComplaint'):
+        rows = apps.get_model('complaints', model_name).objects.order_by('created_at').values_list(
+            'tracking_id', 'status', 'created_by_id', 'created_at', 'updated_at', 'resolved_at')
+        for tid, status, user_id, created_at, updated_at, resolved_at in rows.iterator(chunk_size=2000):
+            batch.append(ComplaintEvent(complaint_id=tid, kind='created', actor_id=user_id, created_at=created_at,
+                                        data={'status': 'PENDING', 'backfilled': True}))
+            if status != 'PENDING':
+                changed_at = max(created_at, resolved_at or updated_at)
+                batch.append(ComplaintEvent(complaint_id=tid, kind='status', created_at=changed_at,
+                                            data={'from': 'PENDING', 'to': status, 'backfilled': True}))
+            if len(batch) >= 2000:
+                flush(batch)
+
+    for model_name in ('ComplaintUpdate', 'ArchivedComplaintUpdate'):
+        rows = apps.get_model('complaints', model_name).objects.order_by('created_at').values_list(
+            'pk', 'complaint_id', 'user_id', 'created_at')
+        for pk, complaint_id, user_id, created_at in rows.iterator(chunk_size=2000):
+            data = {'update': pk, 'backfilled': True} if model_name == 'ComplaintUpdate' else {'backfilled': True}
+            batch.append(ComplaintEvent(complaint_id=complaint_id, kind='remark', actor_id=user_id,
+                                        created_at=created_at, data=data))
+            if len(batch) >= 2000:
+                flush(batch)
+    flush(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0011_delta_sync'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('complaint_id', models.UUIDField()),
+                ('kind', models.CharField(choices=[('created', 'Created'), ('status', 'Status Changed'), ('routed', 'Routed'), ('ai', 'AI Classified'), ('remark', 'Remark Added'), ('escalated', 'Escalated')], max_length=10)),
+                ('actor_id', models.IntegerField(blank=True, null=True)),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['complaint_id', 'id'], name='complaintevent_timeline_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_events, migrations.RunPython.noop),
+    ]
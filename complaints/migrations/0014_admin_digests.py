@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0013_webhooks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='digest_frequency',
+            field=models.CharField(choices=[('OFF', 'Off'), ('HOURLY', 'Hourly'), ('DAILY', 'Daily')], default='DAILY', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='digest_sent_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0015_request_profiles'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedcomplaint',
+            name='short_code',
+            field=models.CharField(blank=True, editable=False, max_length=8, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='short_code',
+            field=models.CharField(blank=True, editable=False, max_length=8, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:43
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0016_complaint_short_codes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MinistryReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField()),
+                ('format', models.CharField(choices=[('xlsx', 'Excel (XLSX)'), ('pdf', 'PDF')], max_length=10)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('READY', 'Ready'), ('FAILED', 'Failed')], default='PENDING', max_length=10)),
+                ('fingerprint', models.CharField(blank=True, default='', editable=False, max_length=64)),
+                ('file', models.FileField(blank=True, editable=False, upload_to='reports/')),
+                ('size', models.PositiveIntegerField(blank=True, editable=False, null=True)),
+                ('row_count', models.PositiveIntegerField(blank=True, editable=False, null=True)),
+                ('requested_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('checked_at', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('generated_at', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('build_ms', models.FloatField(blank=True, editable=False, null=True)),
+                ('error', models.TextField(blank=True, default='', editable=False)),
+                ('ministry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reports', to='complaints.ministry')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('ministry', 'period', 'format'), name='ministryreport_once')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0017_ministry_reports'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='synctombstone',
+            name='reason',
+            field=models.CharField(choices=[('deleted', 'Deleted'), ('archived', 'Archived'), ('scope', 'Left scope')], default='deleted', max_length=20),
+        ),
+    ]
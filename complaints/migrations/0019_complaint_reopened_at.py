@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0018_sync_scope_tombstones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='reopened_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
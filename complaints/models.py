@@ -1,5 +1,7 @@
+import secrets
 import uuid
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from django.contrib.auth.models import User
 from django.db.models.signals import post_save
 from django.dispatch import receiver
@@ -47,6 +49,11 @@ class UserProfile(models.Model):
         ('ADMIN', 'Admin'),
         ('SUPER', 'Super Admin')
     )
+    DIGEST_CHOICES = (
+        ('OFF', 'Off'),
+        ('HOURLY', 'Hourly'),
+        ('DAILY', 'Daily'),
+    )
 
     user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='profile')
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='CITIZEN')
@@ -61,6 +68,10 @@ class UserProfile(models.Model):
     ministry = models.ForeignKey(Ministry, on_delete=models.SET_NULL, null=True, blank=True)
     department = models.ForeignKey(Department, on_delete=models.SET_NULL, null=True, blank=True)
 
+    # New-complaint digest emails for admins (complaints/digests.py); digest_sent_at is the watermark
+    digest_frequency = models.CharField(max_length=10, choices=DIGEST_CHOICES, default='DAILY')
+    digest_sent_at = models.DateTimeField(null=True, blank=True, editable=False)
+
     def __str__(self):
         return f"{self.user.username} - {self.get_role_display()}"
 
@@ -85,9 +96,17 @@ class Complaint(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField()
     tracking_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True, primary_key=True)
+    # Crockford base32 code citizens quote to call centres (complaints.short_codes); NULL until backfilled
+    short_code = models.CharField(max_length=8, unique=True, null=True, blank=True, editable=False)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    resolved_at = models.DateTimeField(null=True, blank=True, editable=False)  # Set when RESOLVED/REJECTED
+
+    # SLA Info (see complaints/sla.py)
+    due_at = models.DateTimeField(null=True, blank=True, editable=False)
+    escalated_at = models.DateTimeField(null=True, blank=True, editable=False)
+    reopened_at = models.DateTimeField(null=True, blank=True, editable=False)  # Restarts the SLA clock
 
     # User Info
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='complaints')
@@ -97,12 +116,36 @@ class Complaint(models.Model):
     ministries = models.ManyToManyField(Ministry, related_name='complaints')
     departments = models.ManyToManyField(Department, related_name='complaints', blank=True)
 
+    # Routing suggestions from complaints.routing: [{"department": id, "ministry": id, "score": n}, ...]
+    routing_suggestions = models.JSONField(default=list, blank=True, editable=False)
+
     # Files
     attachment = models.FileField(upload_to='complaint_attachments/', null=True, blank=True)
 
     # AI Fields
     ai_suggested_category = models.CharField(max_length=255, blank=True, null=True)
     ai_suggested_priority = models.CharField(max_length=10, choices=PRIORITY_CHOICES, blank=True, null=True)
+    # Which provider produced the AI fields ('gemini', 'local'); NULL for rows triaged before it was recorded
+    ai_triage_source = models.CharField(max_length=20, blank=True, null=True, editable=False)
+
+    # Position in the global change sequence (complaints.sync), bumped on every write
+    change_seq = models.BigIntegerField(default=0, db_index=True, editable=False)
+
+    CLOSED_STATUSES = ('RESOLVED', 'REJECTED')
+
+    class Meta:
+        indexes = [
+            # Only open, not-yet-escalated complaints carry a due_at worth scanning
+            models.Index(fields=['due_at'], name='complaint_sla_due_idx',
+                         condition=models.Q(escalated_at__isnull=True, due_at__isnull=False)),
+            # Newest-first listings (API and admin)
+            models.Index(fields=['created_at'], name='complaint_created_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # The pre_save signal takes a change-sequence number, which must commit with the row
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.title} ({self.tracking_id})"
@@ -113,9 +156,398 @@ class ComplaintUpdate(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     update_text = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    change_seq = models.BigIntegerField(default=0, db_index=True, editable=False)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['created_at'], name='complaintupdate_created_idx')]
+
+    def save(self, *args, **kwargs):
+        # Same as Complaint.save: the change-sequence number commits with the row
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"Update on {self.complaint.tracking_id} by {self.user.username}"
+
+
+# --- Archive Models (cold storage, see complaints/archive.py) ---
+
+class ArchivedComplaint(models.Model):
+    """
+    A closed complaint moved out of the hot Complaint table. Mirrors the
+    Complaint fields so it can be served by the same API shape.
+    """
+    tracking_id = models.UUIDField(primary_key=True, editable=False)
+    short_code = models.CharField(max_length=8, unique=True, null=True, blank=True, editable=False)
+    title = models.CharField(max_length=255)
+    description = models.TextField()
+    status = models.CharField(max_length=20, choices=Complaint.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    resolved_at = models.DateTimeField(null=True, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_complaints')
+    ministries = models.ManyToManyField(Ministry, related_name='archived_complaints')
+    departments = models.ManyToManyField(Department, related_name='archived_complaints', blank=True)
+    attachment = models.FileField(upload_to='complaint_attachments/', null=True, blank=True)
+    ai_suggested_category = models.CharField(max_length=255, blank=True, null=True)
+    ai_suggested_priority = models.CharField(max_length=10, choices=Complaint.PRIORITY_CHOICES, blank=True, null=True)
+    ai_triage_source = models.CharField(max_length=20, blank=True, null=True, editable=False)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['created_at'])]
+
+    def __str__(self):
+        return f"[Archived] {self.title} ({self.tracking_id})"
+
+
+class ArchivedComplaintUpdate(models.Model):
+    complaint = models.ForeignKey(ArchivedComplaint, on_delete=models.CASCADE, related_name='updates')
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    update_text = models.TextField()
+    created_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Archived update on {self.complaint_id} by {self.user_id}"
+
+
+# --- Routing Models ---
+
+class RoutingRule(models.Model):
+    """
+    A keyword or regex that routes matching complaints to a department.
+    All active rules are compiled into one automaton by complaints.routing.
+    """
+    KIND_CHOICES = (
+        ('KEYWORD', 'Keyword / phrase'),
+        ('REGEX', 'Regular expression'),
+        ('CATEGORY', 'AI category (exact)'),
+    )
+
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='routing_rules')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default='KEYWORD')
+    pattern = models.CharField(max_length=500)
+    weight = models.PositiveSmallIntegerField(default=1)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def clean(self):
+        from django.core.exceptions import ValidationError
+        from .routing import validate_pattern
+        try:
+            validate_pattern(self.kind, self.pattern)
+        except ValueError as e:
+            raise ValidationError({'pattern': str(e)})
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.pattern} -> {self.department.name}"
+
+
+# --- Outbox Models ---
+
+class OutboxEvent(models.Model):
+    """
+    A side effect (Celery task) recorded in the same transaction as the change
+    that caused it. complaints.outbox relays pending rows to the broker.
+    """
+    STATUS_CHOICES = (
+        ('PENDING', 'Pending'),
+        ('SENT', 'Sent'),
+        ('FAILED', 'Failed'),
+    )
+
+    event_type = models.CharField(max_length=100)
+    task_name = models.CharField(max_length=255)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    idempotency_key = models.CharField(max_length=255, unique=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['available_at'], name='outbox_pending_idx',
+                         condition=models.Q(status='PENDING')),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} [{self.status}] {self.idempotency_key}"
+
+
+# --- Analytics Models ---
+
+class JobWatermark(models.Model):
+    """
+    Remembers how far an incremental background job has processed
+    (e.g. the latest Complaint.updated_at already rolled up).
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    value = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.value}"
+
+
+class DailyComplaintRollup(models.Model):
+    """
+    Pre-aggregated complaint counts per creation day, ministry, department,
+    AI category and priority. Ministry-level rows have department=None.
+    Written only by complaints.analytics; read by /api/analytics/.
+    """
+    day = models.DateField()
+    ministry = models.ForeignKey(Ministry, on_delete=models.CASCADE, related_name='rollups')
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, null=True, blank=True, related_name='rollups')
+    category = models.CharField(max_length=255, blank=True, default='')
+    priority = models.CharField(max_length=10, blank=True, default='')
+
+    created_count = models.PositiveIntegerField(default=0)
+    pending_count = models.PositiveIntegerField(default=0)
+    in_progress_count = models.PositiveIntegerField(default=0)
+    resolved_count = models.PositiveIntegerField(default=0)
+    rejected_count = models.PositiveIntegerField(default=0)
+    resolution_seconds = models.BigIntegerField(default=0)  # Sum over resolved + rejected complaints
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['ministry', 'day']),
+            models.Index(fields=['department', 'day']),
+            models.Index(fields=['day']),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.ministry_id}/{self.department_id} {self.category} {self.priority}"
+
+
+# --- Delta Sync ---
+
+class ChangeSequence(models.Model):
+    """
+    Named monotonic counters. 'sync' numbers every complaint/update write;
+    'sync.purged' is the highest sequence whose tombstones were purged.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+
+class SyncTombstone(models.Model):
+    """
+    Records a deleted (or archived) complaint or update so delta-sync clients
+    can drop it. Scope columns are copied at deletion time; 'scope' entries
+    carry only the ministries/departments a complaint was unlinked from.
+    """
+    KIND_CHOICES = (('complaint', 'Complaint'), ('update', 'Complaint Update'))
+    REASON_CHOICES = (('deleted', 'Deleted'), ('archived', 'Archived'), ('scope', 'Left scope'))
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.CharField(max_length=64)
+    complaint_id = models.UUIDField()
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES, default='deleted')
+    created_by_id = models.IntegerField(null=True)
+    ministry_ids = models.JSONField(default=list)
+    department_ids = models.JSONField(default=list)
+    change_seq = models.BigIntegerField(db_index=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} {self.reason} @ {self.change_seq}"
+
+
+# --- Event Log ---
+
+class ComplaintEvent(models.Model):
+    """
+    Append-only history of a complaint. Rows are never updated or deleted
+    (they outlive archiving, hence no foreign keys); the auto-increment id is
+    the event sequence number. `data` holds a small kind-specific payload.
+    """
+    KIND_CHOICES = (
+        ('created', 'Created'),
+        ('status', 'Status Changed'),
+        ('routed', 'Routed'),
+        ('ai', 'AI Classified'),
+        ('remark', 'Remark Added'),
+        ('escalated', 'Escalated'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    complaint_id = models.UUIDField()
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    actor_id = models.IntegerField(null=True, blank=True)  # User id, None for system events
+    data = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Timeline pages: WHERE complaint_id = ? AND id > ? ORDER BY id
+            models.Index(fields=['complaint_id', 'id'], name='complaintevent_timeline_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Complaint events are append-only.")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.complaint_id} #{self.pk} {self.kind}"
+
+
+# --- Webhooks ---
+
+def generate_webhook_secret():
+    return secrets.token_hex(32)
+
+
+class WebhookEndpoint(models.Model):
+    """
+    A ministry's case-management system subscribed to complaint events.
+    Deliveries are batched, HMAC-signed with `secret` and retried with backoff
+    (complaints.webhooks).
+    """
+    ministry = models.ForeignKey(Ministry, on_delete=models.CASCADE, related_name='webhook_endpoints')
+    url = models.URLField(max_length=500)
+    secret = models.CharField(max_length=128, default=generate_webhook_secret)
+    event_kinds = models.JSONField(default=list, blank=True,
+                                   help_text="Event kinds to send (e.g. [\"created\", \"status\"]); empty = all.")
+    is_active = models.BooleanField(default=True)
+    max_concurrency = models.PositiveSmallIntegerField(default=2, help_text="Batches in flight at once.")
+    batch_size = models.PositiveSmallIntegerField(default=50, help_text="Events per request.")
+    last_success_at = models.DateTimeField(null=True, blank=True, editable=False)
+    last_error = models.TextField(blank=True, default='', editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.ministry} -> {self.url}"
+
+
+class WebhookDelivery(models.Model):
+    """
+    One event queued for one endpoint. DEAD rows are the dead-letter queue:
+    they ran out of attempts and wait for a manual requeue.
+    """
+    STATUS_CHOICES = (
+        ('PENDING', 'Pending'),
+        ('DELIVERING', 'Delivering'),
+        ('SENT', 'Sent'),
+        ('DEAD', 'Dead'),
+    )
+
+    endpoint = models.ForeignKey(WebhookEndpoint, on_delete=models.CASCADE, related_name='deliveries')
+    event_id = models.BigIntegerField()  # ComplaintEvent sequence number
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    batch_id = models.UUIDField(null=True, blank=True)  # Set while a worker holds the row
+    last_error = models.TextField(blank=True, default='')
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = 'webhook deliveries'
+        constraints = [
+            models.UniqueConstraint(fields=['endpoint', 'event_id'], name='webhookdelivery_once'),
+        ]
+        indexes = [
+            models.Index(fields=['endpoint', 'available_at'], name='webhookdelivery_due_idx',
+                         condition=models.Q(status='PENDING')),
+            models.Index(fields=['endpoint', 'available_at'], name='webhookdelivery_inflight_idx',
+                         condition=models.Q(status='DELIVERING')),
+        ]
+
+    def __str__(self):
+        return f"{self.endpoint_id} event #{self.event_id} [{self.status}]"
+
+
+class WebhookDispatchGap(models.Model):
+    """
+    An event id the dispatcher passed while it was still uncommitted (ids are
+    allocated before commit). Re-checked on every run until the event shows
+    up, or dropped after WEBHOOK_GAP_SECONDS (a rolled-back insert).
+    """
+    event_id = models.BigIntegerField(primary_key=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"gap at event #{self.event_id}"
+
+
+# --- Profiling ---
+
+class RequestProfile(models.Model):
+    """
+    A stored cProfile run and SQL trace of one HTTP request or Celery task
+    (complaints.profiling). `stats` is a pstats dump, downloadable from the admin.
+    """
+    KIND_CHOICES = (('http', 'HTTP request'), ('task', 'Celery task'))
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    name = models.CharField(max_length=255)  # View name or task name
+    method = models.CharField(max_length=10, blank=True, default='')
+    path = models.CharField(max_length=500, blank=True, default='')
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    error = models.BooleanField(default=False)
+    duration_ms = models.FloatField()
+    sql_count = models.PositiveIntegerField(default=0)
+    sql_ms = models.FloatField(default=0)
+    queries = models.JSONField(default=list, blank=True)
+    summary = models.TextField(blank=True, default='')
+    stats = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.name} {self.duration_ms:.0f}ms @ {self.created_at:%Y-%m-%d %H:%M}"
+
+
+# --- Reports ---
+
+class MinistryReport(models.Model):
+    """
+    A ministry's monthly report in one format, built by a Celery job
+    (complaints.reports). The file is stored under the fingerprint of the data
+    it was built from, so an unchanged report is never rebuilt.
+    """
+    FORMAT_CHOICES = (('xlsx', 'Excel (XLSX)'), ('pdf', 'PDF'))
+    STATUS_CHOICES = (
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('READY', 'Ready'),
+        ('FAILED', 'Failed'),
+    )
+
+    ministry = models.ForeignKey(Ministry, on_delete=models.CASCADE, related_name='reports')
+    period = models.DateField()  # First day of the reported month
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    fingerprint = models.CharField(max_length=64, blank=True, default='', editable=False)
+    file = models.FileField(upload_to='reports/', blank=True, editable=False)
+    size = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    row_count = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    requested_at = models.DateTimeField(default=timezone.now)
+    checked_at = models.DateTimeField(null=True, blank=True, editable=False)  # Fingerprint last verified
+    generated_at = models.DateTimeField(null=True, blank=True, editable=False)  # File last built
+    build_ms = models.FloatField(null=True, blank=True, editable=False)
+    error = models.TextField(blank=True, default='', editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['ministry', 'period', 'format'], name='ministryreport_once'),
+        ]
 
     def __str__(self):
-        return f"Update on {self.complaint.tracking_id} by {self.user.username}"
\ No newline at end of file
+        return f"{self.ministry} {self.period:%Y-%m} ({self.format}) [{self.status}]"
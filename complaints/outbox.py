@@ -0,0 +1,129 @@
+import logging
+import time
+import uuid
+from datetime import timedelta
+
+from celery import current_app
+from kombu.exceptions import OperationalError as BrokerError
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(event_type, task_name, args=None, kwargs=None, key=None):
+    """
+    Records a Celery task to run once the current transaction commits.
+    Must be called inside the transaction that makes the change; nothing
+    touches the broker here, so broker outages never fail the request.
+    """
+    event = OutboxEvent.objects.create(
+        event_type=event_type,
+        task_name=task_name,
+        args=list(args or []),
+        kwargs=kwargs or {},
+        idempotency_key=key or f"{event_type}:{uuid.uuid4()}",
+    )
+    if getattr(settings, 'OUTBOX_PUBLISH_ON_COMMIT', True):
+        # Best-effort low-latency publish; the relay picks up anything this misses.
+        transaction.on_commit(lambda: _publish_after_commit(event.pk))
+    return event
+
+
+# Monotonic time until which immediate publishing is skipped after a broker failure,
+# so a broker outage costs one slow request per process, not every request.
+_circuit = {'open_until': 0.0}
+
+
+def _publish_after_commit(event_id):
+    if time.monotonic() < _circuit['open_until']:
+        return
+    try:
+        sent, failed = relay_batch(ids=[event_id])
+    except Exception as e:
+        failed = 1
+        logger.warning(f"Immediate outbox publish of {event_id} failed, leaving it for the relay: {e}")
+    if failed:
+        _circuit['open_until'] = time.monotonic() + getattr(settings, 'OUTBOX_CIRCUIT_SECONDS', 30)
+
+
+def _publish(event):
+    app = current_app
+    if app.conf.task_always_eager:
+        if event.task_name not in app.tasks:
+            # Eager mode has no worker to import the task modules: autodiscover them on first use
+            app.loader.import_default_modules()
+        task = app.tasks[event.task_name]
+        # Run once the relay's transaction commits, not while it holds the outbox row locks
+        transaction.on_commit(
+            lambda: task.apply(args=event.args, kwargs=event.kwargs, task_id=event.idempotency_key),
+            robust=True,
+        )
+    else:
+        # The idempotency key doubles as the Celery task id so duplicates are traceable.
+        # No publish retries here: backoff is handled by the outbox itself.
+        app.send_task(event.task_name, args=event.args, kwargs=event.kwargs,
+                      task_id=event.idempotency_key, retry=False)
+
+
+def _backoff(attempts):
+    base = getattr(settings, 'OUTBOX_RETRY_BASE_SECONDS', 5)
+    cap = getattr(settings, 'OUTBOX_RETRY_MAX_SECONDS', 900)
+    return timedelta(seconds=min(cap, base * (2 ** (attempts - 1))))
+
+
+def relay_batch(batch_size=100, ids=None):
+    """
+    Publishes up to `batch_size` due events. Rows are locked with SKIP LOCKED
+    so several relays can run side by side. Delivery is at-least-once.
+    Returns (sent, failed).
+    """
+    now = timezone.now()
+    max_attempts = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 10)
+    sent_ids, failed = [], 0
+
+    with transaction.atomic():
+        qs = OutboxEvent.objects.select_for_update(skip_locked=True).filter(status='PENDING', available_at__lte=now)
+        if ids is not None:
+            qs = qs.filter(pk__in=ids)
+        events = list(qs.order_by('available_at', 'id')[:batch_size])
+
+        for event in events:
+            try:
+                _publish(event)
+            except Exception as e:
+                failed += 1
+                event.attempts += 1
+                event.last_error = str(e)[:2000]
+                if event.attempts >= max_attempts:
+                    event.status = 'FAILED'
+                    logger.error(f"Outbox event {event.idempotency_key} failed permanently: {e}")
+                else:
+                    event.available_at = now + _backoff(event.attempts)
+                event.save(update_fields=['attempts', 'last_error', 'status', 'available_at'])
+                if isinstance(e, (BrokerError, ConnectionError, OSError)):
+                    # Broker unreachable: leave the rest pending for the next cycle
+                    logger.warning(f"Broker unavailable, outbox relay pausing: {e}")
+                    break
+            else:
+                sent_ids.append(event.pk)
+
+        if sent_ids:
+            OutboxEvent.objects.filter(pk__in=sent_ids).update(
+                status='SENT', sent_at=now, attempts=F('attempts') + 1, last_error=''
+            )
+
+    return len(sent_ids), failed
+
+
+def purge_sent(older_than_days=7):
+    """
+    Deletes delivered events past the retention window.
+    """
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    deleted, _ = OutboxEvent.objects.filter(status='SENT', sent_at__lt=cutoff).delete()
+    return deleted
@@ -56,4 +56,13 @@ class IsCitizen(permissions.BasePermission):
     def has_permission(self, request, view):
         if not request.user.is_authenticated or not hasattr(request.user, 'profile'):
             return False
-        return request.user.profile.role == 'CITIZEN'
\ No newline at end of file
+        return request.user.profile.role == 'CITIZEN'
+
+class IsReportMinistryAdmin(IsMinistryAdmin):
+    """
+    Ministry admins may access their own ministry's reports; super admins any.
+    """
+
+    def has_object_permission(self, request, view, obj):
+        profile = request.user.profile
+        return request.user.is_superuser or profile.role == 'SUPER' or obj.ministry_id == profile.ministry_id
@@ -0,0 +1,183 @@
+import cProfile
+import io
+import logging
+import marshal
+import pstats
+import random
+import threading
+import time
+from contextlib import ExitStack
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+
+from .authentication import CachedJWTAuthentication
+
+logger = logging.getLogger(__name__)
+
+ARMED_KEY = 'profiling:armed:{name}'
+REQUEST_HEADER = 'X-Profile'
+QUERY_FLAG = 'profile'
+
+_local = threading.local()
+
+
+class Profiler:
+    """
+    cProfile plus every SQL statement (with its duration) for one request or
+    task. Only one profiler runs per thread: cProfile can't nest, so a task
+    run eagerly inside a profiled request is covered by the request's profile.
+    SQL parameters (password hashes, personal data) are only kept when
+    `keep_params` is set, i.e. for profiles a super admin asked for.
+    """
+
+    def __init__(self, kind, name, keep_params=False):
+        self.kind = kind
+        self.name = name
+        self.keep_params = keep_params
+        self.profile = cProfile.Profile()
+        self.queries = []
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.duration = 0.0
+        self._stack = ExitStack()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.sql_count += 1
+            self.sql_seconds += elapsed
+            if len(self.queries) < getattr(settings, 'PROFILING_MAX_QUERIES', 500):
+                self.queries.append({
+                    'db': context['connection'].alias,
+                    'ms': round(elapsed * 1000, 3),
+                    'sql': sql,
+                    'params': repr(params)[:500] if self.keep_params else f'<{len(params or ())} redacted>',
+                })
+
+    @staticmethod
+    def active():
+        return getattr(_local, 'profiler', None) is not None
+
+    def start(self):
+        _local.profiler = self
+        for conn in connections.all():
+            self._stack.enter_context(conn.execute_wrapper(self))
+        self._started = time.perf_counter()
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+        self.duration = time.perf_counter() - self._started
+        self._stack.close()
+        _local.profiler = None
+
+    def save(self, user=None, method='', path='', status_code=None, error=False):
+        from .models import RequestProfile
+
+        stats = pstats.Stats(self.profile)
+        summary = io.StringIO()
+        stats.stream = summary
+        stats.sort_stats('cumulative').print_stats(getattr(settings, 'PROFILING_SUMMARY_LINES', 40))
+        return RequestProfile.objects.create(
+            kind=self.kind, name=self.name[:255], method=method, path=path[:500],
+            user=user if user is not None and user.is_authenticated else None,
+            status_code=status_code, error=error,
+            duration_ms=round(self.duration * 1000, 2),
+            sql_count=self.sql_count, sql_ms=round(self.sql_seconds * 1000, 2),
+            queries=self.queries, summary=summary.getvalue(),
+            stats=marshal.dumps(stats.stats),  # Same format as pstats dump_stats(): a .prof file
+        )
+
+
+# --- Decisions ---
+
+def is_super_admin(user):
+    if not user or not user.is_authenticated:
+        return False
+    profile = getattr(user, 'profile', None)
+    return user.is_superuser or (profile is not None and profile.role == 'SUPER')
+
+
+def requested(request):
+    """
+    The caller asked for a profile (X-Profile: 1 or ?profile=1) and is a super
+    admin. The bearer token is authenticated here, before the profiler starts,
+    with the same cached authenticator the API uses.
+    """
+    if request.headers.get(REQUEST_HEADER) != '1' and request.GET.get(QUERY_FLAG) != '1':
+        return False
+    try:
+        authenticated = CachedJWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return authenticated is not None and is_super_admin(authenticated[0])
+
+
+def sampled(rate):
+    return bool(rate) and random.random() < rate
+
+
+def arm(name, count):
+    """
+    Profiles the next `count` runs of Celery task `name` in any worker, without a redeploy.
+    """
+    cache.set(ARMED_KEY.format(name=name), count, timeout=getattr(settings, 'PROFILING_ARM_SECONDS', 86400))
+
+
+def take_armed(name):
+    try:
+        remaining = cache.decr(ARMED_KEY.format(name=name))
+    except ValueError:  # Not armed
+        return False
+    if remaining < 0:
+        cache.delete(ARMED_KEY.format(name=name))
+        return False
+    return True
+
+
+# --- Celery tasks ---
+
+_task_profilers = {}
+
+
+def task_started(task_id, task_name):
+    if not getattr(settings, 'PROFILING_ENABLED', True) or Profiler.active():
+        return
+    rate = getattr(settings, 'PROFILING_TASK_SAMPLE_RATES', {}).get(task_name, 0)
+    armed = False
+    if not sampled(rate):
+        armed = take_armed(task_name)
+        if not armed:
+            return
+    # Runs armed by an operator (`manage.py profile_next`) keep their SQL parameters
+    profiler = Profiler('task', task_name, keep_params=armed)
+    _task_profilers[task_id] = profiler
+    profiler.start()
+
+
+def task_finished(task_id, error=False):
+    profiler = _task_profilers.pop(task_id, None)
+    if profiler is None:
+        return
+    profiler.stop()
+    try:
+        saved = profiler.save(error=error)
+        logger.info(f"Profiled task {profiler.name} [{task_id}] as RequestProfile {saved.pk}")
+    except Exception as e:
+        logger.error(f"Could not store profile of task {profiler.name} [{task_id}]: {e}")
+
+
+def purge(older_than_days=None):
+    from .models import RequestProfile
+
+    days = older_than_days or getattr(settings, 'PROFILING_RETENTION_DAYS', 7)
+    deleted, _ = RequestProfile.objects.filter(created_at__lt=timezone.now() - timedelta(days=days)).delete()
+    return deleted
@@ -0,0 +1,45 @@
+import time
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import msgpack
+except ImportError:  # Optional: pip install msgpack
+    msgpack = None
+
+from .instrumentation import record_serialize_time
+
+
+class InstrumentedJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that reports its rendering time to the instrumentation layer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        start = time.perf_counter()
+        try:
+            return super().render(data, accepted_media_type, renderer_context)
+        finally:
+            record_serialize_time(time.perf_counter() - start)
+
+
+class MsgPackRenderer(BaseRenderer):
+    """
+    Renders `Accept: application/msgpack` (or ?format=msgpack) responses.
+    Values JSON can't carry natively (UUIDs, datetimes, decimals) are encoded
+    the same way as in JSON responses.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        start = time.perf_counter()
+        try:
+            return msgpack.packb(data, default=JSONEncoder().default, use_bin_type=True)
+        finally:
+            record_serialize_time(time.perf_counter() - start)
@@ -0,0 +1,437 @@
+import hashlib
+import heapq
+import json
+import logging
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, time as dt_time, timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.text import slugify
+
+from . import outbox, short_codes
+from .models import ArchivedComplaint, Complaint, Department, Ministry, MinistryReport
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout changes: every fingerprint changes, so each report is rebuilt once
+LAYOUT_VERSION = 1
+
+SOURCES = ((Complaint, 'complaint'), (ArchivedComplaint, 'archivedcomplaint'))
+STATUSES = [value for value, _ in Complaint.STATUS_CHOICES]
+IN_FLIGHT = ('PENDING', 'RUNNING')
+
+CONTENT_TYPES = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'pdf': 'application/pdf',
+}
+
+LISTING_FIELDS = ('short_code', 'tracking_id', 'title', 'status', 'ai_suggested_priority', 'ai_suggested_category',
+                  'created_at', 'resolved_at')
+LISTING_HEADER = ('Code', 'Tracking ID', 'Title', 'Status', 'Priority', 'Category', 'Departments', 'Submitted',
+                  'Resolved')
+BREAKDOWN_HEADER = ('Received', 'Pending', 'In progress', 'Resolved', 'Rejected', 'Avg. resolution (h)')
+
+
+# --- Periods ---
+
+def parse_period(value):
+    """
+    First day of the month for "YYYY-MM", or None.
+    """
+    try:
+        return datetime.strptime(str(value), '%Y-%m').date()
+    except ValueError:
+        return None
+
+
+def period_bounds(period):
+    """
+    [start, end) of the month starting on `period`, in local time.
+    """
+    following = (period.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return (timezone.make_aware(datetime.combine(period, dt_time.min)),
+            timezone.make_aware(datetime.combine(following, dt_time.min)))
+
+
+def previous_period(today=None):
+    today = today or timezone.localdate()
+    return (today.replace(day=1) - timedelta(days=1)).replace(day=1)
+
+
+def filename(report):
+    return f"{slugify(report.ministry.name) or f'ministry-{report.ministry_id}'}-{report.period:%Y-%m}.{report.format}"
+
+
+def _created_in(field, start, end):
+    return {f'{field}__created_at__gte': start, f'{field}__created_at__lt': end}
+
+
+# --- Fingerprint ---
+
+def fingerprint(report):
+    """
+    SHA-256 over everything the report is built from, read with a few
+    aggregate queries: the ministry's complaints of the period (count, link ids
+    and change sequences, which every write bumps), their department links,
+    the archived ones and the names printed in the report. An unchanged
+    fingerprint means an identical file.
+    """
+    start, end = period_bounds(report.period)
+    ministry_id = report.ministry_id
+    live = Complaint.ministries.through.objects.filter(ministry_id=ministry_id, **_created_in('complaint', start, end))
+    live_departments = Complaint.departments.through.objects.filter(
+        department__ministry_id=ministry_id, **_created_in('complaint', start, end))
+    archived = ArchivedComplaint.ministries.through.objects.filter(
+        ministry_id=ministry_id, **_created_in('archivedcomplaint', start, end))
+    inputs = [
+        LAYOUT_VERSION, report.format, ministry_id, report.period.isoformat(), settings.TIME_ZONE,
+        Ministry.objects.filter(pk=ministry_id).values_list('name', flat=True).first(),
+        list(Department.objects.filter(ministry_id=ministry_id).order_by('pk').values_list('pk', 'name')),
+        live.aggregate(n=Count('id'), links=Sum('id'), seq=Sum('complaint__change_seq')),
+        live_departments.aggregate(n=Count('id'), links=Sum('id')),
+        archived.aggregate(n=Count('id'), links=Sum('id'), last=Max('archivedcomplaint__archived_at')),
+    ]
+    return hashlib.sha256(json.dumps(inputs, default=str, sort_keys=True).encode()).hexdigest()
+
+
+# --- Data ---
+
+def _breakdown(ministry_id, start, end, relation):
+    """
+    Counts per status and resolution time of the period's live and archived
+    complaints, grouped by priority (relation 'ministries') or by the
+    ministry's departments (relation 'departments'), in the database.
+    """
+    totals = defaultdict(lambda: {'received': 0, 'resolved_n': 0, 'resolution': timedelta(),
+                                  **dict.fromkeys(STATUSES, 0)})
+    for model, field in SOURCES:
+        through = getattr(model, relation).through
+        if relation == 'departments':
+            scope, key = {'department__ministry_id': ministry_id}, F('department_id')
+        else:
+            scope, key = {'ministry_id': ministry_id}, Coalesce(f'{field}__ai_suggested_priority', Value(''))
+        # Some imported rows were closed before their recorded creation; they'd skew the average
+        timed = Q(**{f'{field}__resolved_at__gte': F(f'{field}__created_at')})
+        resolution = ExpressionWrapper(F(f'{field}__resolved_at') - F(f'{field}__created_at'),
+                                       output_field=DurationField())
+        rows = (
+            through.objects.filter(**scope, **_created_in(field, start, end))
+            .annotate(key=key, state=F(f'{field}__status'))
+            .values('key', 'state')
+            .annotate(n=Count('id'), resolved_n=Count('id', filter=timed), resolution=Sum(resolution, filter=timed))
+            .order_by()
+        )
+        for row in rows:
+            entry = totals[row['key']]
+            entry['received'] += row['n']
+            entry[row['state']] += row['n']
+            entry['resolved_n'] += row['resolved_n']
+            entry['resolution'] += row['resolution'] or timedelta()
+    return totals
+
+
+def _breakdown_row(label, entry):
+    hours = (round(entry['resolution'].total_seconds() / 3600 / entry['resolved_n'], 1)
+             if entry['resolved_n'] else None)
+    return (label, entry['received'], *(entry[status] for status in STATUSES), hours)
+
+
+def sections(report, departments):
+    """
+    The summary tables shared by both formats, [(title, header, rows)], and
+    the number of complaints received in the period.
+    """
+    start, end = period_bounds(report.period)
+    by_priority = _breakdown(report.ministry_id, start, end, 'ministries')
+    by_department = _breakdown(report.ministry_id, start, end, 'departments')
+
+    total = {'received': 0, 'resolved_n': 0, 'resolution': timedelta(), **dict.fromkeys(STATUSES, 0)}
+    for entry in by_priority.values():
+        for name in total:
+            total[name] += entry[name]
+
+    priorities = [value for value, _ in Complaint.PRIORITY_CHOICES][::-1] + ['']
+    return [
+        ('Summary', ('', 'Value'), [
+            ('Ministry', report.ministry.name),
+            ('Period', f'{report.period:%B %Y}'),
+            ('Generated', f'{timezone.localtime():%Y-%m-%d %H:%M}'),
+            *zip(BREAKDOWN_HEADER, _breakdown_row('', total)[1:]),
+        ]),
+        ('By priority', ('Priority',) + BREAKDOWN_HEADER, [
+            _breakdown_row(priority or 'Untriaged', by_priority[priority])
+            for priority in priorities if priority in by_priority
+        ]),
+        ('By department', ('Department',) + BREAKDOWN_HEADER, [
+            _breakdown_row(departments[department_id], entry)
+            for department_id, entry in sorted(by_department.items(), key=lambda item: departments[item[0]])
+        ]),
+    ], total['received']
+
+
+def _with_departments(chunk, links, field, departments):
+    names = defaultdict(list)
+    for complaint_id, department_id in links.filter(**{f'{field}_id__in': [row[1] for row in chunk]}).values_list(
+            f'{field}_id', 'department_id'):
+        names[complaint_id].append(departments[department_id])
+    for row in chunk:
+        yield (*row[:6], ', '.join(sorted(names.get(row[1], ()))), *row[6:])
+
+
+def _listing_source(model, field, ministry_id, start, end, departments, chunk_size):
+    rows = (
+        model.ministries.through.objects.filter(ministry_id=ministry_id, **_created_in(field, start, end))
+        .order_by(f'{field}__created_at', f'{field}_id')
+        .values_list(*(f'{field}__{name}' for name in LISTING_FIELDS))
+    )
+    links = model.departments.through.objects.filter(department__ministry_id=ministry_id)
+    chunk = []
+    for row in rows.iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield from _with_departments(chunk, links, field, departments)
+            chunk = []
+    if chunk:
+        yield from _with_departments(chunk, links, field, departments)
+
+
+def listing(report, departments):
+    """
+    The period's live and archived complaints merged in submission order,
+    streamed REPORT_CHUNK_SIZE rows at a time (one extra query per chunk for
+    department names), so memory stays flat however large the month is.
+    """
+    start, end = period_bounds(report.period)
+    chunk_size = getattr(settings, 'REPORT_CHUNK_SIZE', 2000)
+    sources = [_listing_source(model, field, report.ministry_id, start, end, departments, chunk_size)
+               for model, field in SOURCES]
+    return heapq.merge(*sources, key=lambda row: (row[7], str(row[1])))
+
+
+# --- Writers ---
+
+def _local(value):
+    # Excel has no time zones
+    return timezone.localtime(value).replace(tzinfo=None) if value else None
+
+
+def write_xlsx(fh, tables, rows, total):
+    """
+    openpyxl write-only mode: rows go straight to the file instead of a cell tree.
+    """
+    from openpyxl import Workbook  # Only report workers need it
+
+    workbook = Workbook(write_only=True)
+    summary = workbook.create_sheet('Summary')
+    for title, header, table in tables:
+        summary.append((title,))
+        summary.append(header)
+        for row in table:
+            summary.append(row)
+        summary.append(())
+
+    sheet = workbook.create_sheet('Complaints')
+    sheet.append(LISTING_HEADER)
+    for row in rows:
+        sheet.append((short_codes.display(row[0]), str(row[1]), *row[2:7], _local(row[7]), _local(row[8])))
+    workbook.save(fh)
+
+
+class _PdfWriter:
+    """
+    Minimal PDF writer (A4 landscape, the built-in Courier font): each page is
+    written as soon as it fills, so nothing but the page offsets is kept in
+    memory. Characters outside Windows-1252 print as "?" (the XLSX has them).
+    """
+    WIDTH, HEIGHT, MARGIN = 842, 595, 36
+    FONT_SIZE, LEADING = 8, 10
+    COLUMNS = 160  # Courier glyphs are 0.6 em wide
+    LINES = (HEIGHT - 2 * MARGIN) // LEADING
+
+    def __init__(self, fh):
+        self.fh = fh
+        self.offsets = {}
+        self.pages = []
+        self.lines = []
+        self.next_id = 4  # 1: catalog, 2: page tree, 3: font
+        fh.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def _object(self, obj_id, body):
+        self.offsets[obj_id] = self.fh.tell()
+        self.fh.write(b'%d 0 obj\n' % obj_id + body + b'\nendobj\n')
+
+    def line(self, text=''):
+        self.lines.append(text)
+        if len(self.lines) >= self.LINES:
+            self._page()
+
+    def _page(self):
+        content = [b'BT', b'/F1 %d Tf' % self.FONT_SIZE, b'%d TL' % self.LEADING,
+                   b'%d %d Td' % (self.MARGIN, self.HEIGHT - self.MARGIN)]
+        for text in self.lines:
+            escaped = text[:self.COLUMNS].encode('cp1252', 'replace')
+            escaped = escaped.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+            content.append(b"(" + escaped + b") '")
+        content.append(b'ET')
+        stream = b'\n'.join(content)
+        content_id, page_id = self.next_id, self.next_id + 1
+        self.next_id += 2
+        self._object(content_id, b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+        self._object(page_id, b'<< /Type /Page /Parent 2 0 R /Resources << /Font << /F1 3 0 R >> >> '
+                              b'/Contents %d 0 R >>' % content_id)
+        self.pages.append(page_id)
+        self.lines = []
+
+    def close(self):
+        if self.lines or not self.pages:
+            self._page()
+        self._object(3, b'<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>')
+        kids = b' '.join(b'%d 0 R' % page_id for page_id in self.pages)
+        self._object(2, b'<< /Type /Pages /Kids [' + kids + b'] /Count %d /MediaBox [0 0 %d %d] >>' % (
+            len(self.pages), self.WIDTH, self.HEIGHT))
+        self._object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+        xref = self.fh.tell()
+        self.fh.write(b'xref\n0 %d\n0000000000 65535 f \n' % self.next_id)
+        for obj_id in range(1, self.next_id):
+            self.fh.write(b'%010d 00000 n \n' % self.offsets[obj_id])
+        self.fh.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (self.next_id, xref))
+
+
+def _columns(values, widths):
+    return '  '.join(str('' if value is None else value)[:width].ljust(width) for value, width in zip(values, widths)).rstrip()
+
+
+def write_pdf(fh, tables, rows, total):
+    """
+    The summary tables, then up to REPORT_PDF_MAX_ROWS complaints; the XLSX lists them all.
+    """
+    pdf = _PdfWriter(fh)
+    for title, header, table in tables:
+        widths = (40,) + (12,) * (len(header) - 1) if len(header) > 2 else (30, 60)
+        pdf.line(title.upper())
+        pdf.line(_columns(header, widths))
+        pdf.line('-' * sum(widths + (2,) * (len(widths) - 1)))
+        for row in table:
+            pdf.line(_columns(row, widths))
+        pdf.line()
+
+    limit = getattr(settings, 'REPORT_PDF_MAX_ROWS', 2000)
+    widths = (9, 56, 11, 8, 30, 16, 16)
+    pdf.line('COMPLAINTS')
+    pdf.line(_columns(('Code', 'Title', 'Status', 'Priority', 'Departments', 'Submitted', 'Resolved'), widths))
+    pdf.line('-' * (sum(widths) + 2 * (len(widths) - 1)))
+    for count, row in enumerate(rows):
+        if count >= limit:
+            pdf.line(f'... and {total - limit} more (see the XLSX report for the full list)')
+            break
+        pdf.line(_columns((short_codes.display(row[0]), row[2], row[3], row[4], row[6],
+                           f'{_local(row[7]):%Y-%m-%d %H:%M}',
+                           f'{_local(row[8]):%Y-%m-%d %H:%M}' if row[8] else ''), widths))
+    pdf.close()
+
+
+WRITERS = {'xlsx': write_xlsx, 'pdf': write_pdf}
+
+
+# --- Jobs ---
+
+def _generate(report, name):
+    """
+    Builds the file into a temporary file and stores it as `name`. Returns (stored name, complaints listed).
+    """
+    departments = dict(Department.objects.filter(ministry_id=report.ministry_id).values_list('pk', 'name'))
+    tables, total = sections(report, departments)
+    with tempfile.TemporaryFile() as fh:
+        WRITERS[report.format](fh, tables, listing(report, departments), total)
+        fh.seek(0)
+        return default_storage.save(name, File(fh, name=name.rsplit('/', 1)[-1])), total
+
+
+def build(report_id):
+    """
+    Job body: re-checks the report's fingerprint and rebuilds the file only
+    when the data changed. Files are stored as reports/<fingerprint>.<format>,
+    so a file already built from the same data is reused as is.
+    Returns the report, or None if it was deleted.
+    """
+    started = time.perf_counter()
+    with transaction.atomic():
+        report = MinistryReport.objects.select_for_update().filter(pk=report_id).first()
+        if report is None:
+            return None
+        report.status = 'RUNNING'
+        report.save(update_fields=['status'])
+
+    fields = ['status', 'fingerprint', 'file', 'size', 'row_count', 'checked_at', 'generated_at', 'build_ms',
+              'error']
+    try:
+        digest = fingerprint(report)
+        name = f'reports/{digest}.{report.format}'
+        if report.file.name != name or not default_storage.exists(name):
+            previous = report.file.name
+            if default_storage.exists(name):
+                report.file.name = name
+            else:
+                report.file.name, report.row_count = _generate(report, name)
+                report.generated_at = timezone.now()
+            report.size = default_storage.size(report.file.name)
+            if previous and previous != report.file.name and not MinistryReport.objects.filter(
+                    file=previous).exclude(pk=report.pk).exists():
+                default_storage.delete(previous)
+        report.fingerprint = digest
+        report.status = 'READY'
+        report.error = ''
+        report.checked_at = timezone.now()
+    except Exception as e:
+        logger.exception(f"Report {report_id} failed")
+        report.status = 'FAILED'
+        report.error = str(e)[:2000]
+    report.build_ms = round((time.perf_counter() - started) * 1000, 2)
+    report.save(update_fields=fields)
+    return report
+
+
+def request(ministry_id, period, fmt, user=None, force=False):
+    """
+    Request-path entry point; reads no complaint data. A report verified
+    within REPORT_FRESH_SECONDS is returned as is; otherwise one build job is
+    queued through the outbox (published once the transaction commits) unless
+    one is already in flight. Returns (report, queued).
+    """
+    now = timezone.now()
+    report, created = MinistryReport.objects.get_or_create(ministry_id=ministry_id, period=period, format=fmt)
+    fresh = now - timedelta(seconds=getattr(settings, 'REPORT_FRESH_SECONDS', 300))
+    if not force and report.status == 'READY' and report.checked_at and report.checked_at > fresh:
+        return report, False
+
+    lease = now - timedelta(seconds=getattr(settings, 'REPORT_LEASE_SECONDS', 1800))
+    # A new row is PENDING already; only its creator queues the first build
+    claimable = Q() if created else ~Q(status__in=IN_FLIGHT) | Q(requested_at__lt=lease)
+    with transaction.atomic():
+        queued = MinistryReport.objects.filter(claimable, pk=report.pk).update(
+            status='PENDING', requested_at=now, requested_by=user, error='')
+        if queued:
+            outbox.enqueue('report.requested', 'complaints.tasks.generate_ministry_report', args=[report.pk])
+    report.refresh_from_db()
+    return report, bool(queued)
+
+
+def request_monthly(today=None):
+    """
+    Beat entry point: last month's reports for every ministry in
+    REPORT_SCHEDULED_FORMATS. Reports whose data hasn't changed since are only re-fingerprinted.
+    """
+    period = previous_period(today)
+    queued = 0
+    for ministry_id in Ministry.objects.values_list('pk', flat=True):
+        for fmt in getattr(settings, 'REPORT_SCHEDULED_FORMATS', ('xlsx', 'pdf')):
+            queued += request(ministry_id, period, fmt)[1]
+    return queued
@@ -0,0 +1,188 @@
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+RULES_VERSION_KEY = 'routing:rules_version'
+
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def _phrase_key(pattern):
+    return tuple(w.lower() for w in _WORD_RE.findall(pattern))
+
+
+def validate_pattern(kind, pattern):
+    """
+    Raises ValueError if a rule pattern cannot be compiled into the automaton.
+    """
+    if not pattern.strip():
+        raise ValueError("Pattern cannot be empty.")
+    if kind == 'KEYWORD' and not _phrase_key(pattern):
+        raise ValueError("Keyword must contain at least one word character.")
+    if kind == 'REGEX':
+        try:
+            re.compile(pattern, re.IGNORECASE)  # Compiled the way the automaton compiles it
+        except re.error as e:
+            raise ValueError(f"Invalid regular expression: {e}")
+
+
+class RoutingAutomaton:
+    """
+    Rules compiled once per rules version:
+      * keywords/phrases -> a hash of word n-grams, matched in one pass over the
+        complaint's tokens (a word-level Aho-Corasick equivalent);
+      * regexes -> one compiled pattern per rule, each searched on its own so
+        overlapping rules ("school" and "school fee") all match and one rule's
+        inline flags or backreferences can't break the others;
+      * AI categories -> an exact-match dict.
+    """
+
+    def __init__(self, rules):
+        self.phrases = defaultdict(list)     # ('passport', 'office') -> [target, ...]
+        self.max_phrase = 0
+        self.regexes = []                    # [(compiled pattern, target), ...]
+        self.categories = defaultdict(list)  # lowercased AI category -> [target, ...]
+        for rule in rules:
+            target = (rule['id'], rule['department_id'], rule['department__ministry_id'], rule['weight'])
+            try:
+                validate_pattern(rule['kind'], rule['pattern'])
+            except ValueError as e:
+                logger.warning(f"Skipping routing rule {rule['id']}: {e}")
+                continue
+            if rule['kind'] == 'CATEGORY':
+                self.categories[rule['pattern'].strip().lower()].append(target)
+            elif rule['kind'] == 'REGEX':
+                self.regexes.append((re.compile(rule['pattern'], re.IGNORECASE), target))
+            else:
+                key = _phrase_key(rule['pattern'])
+                if key:
+                    self.phrases[key].append(target)
+                    self.max_phrase = max(self.max_phrase, len(key))
+
+    def _matched_targets(self, text, ai_category):
+        if self.phrases and text:
+            tokens = [t.lower() for t in _WORD_RE.findall(text)]
+            phrases = self.phrases
+            for i in range(len(tokens)):
+                for n in range(1, min(self.max_phrase, len(tokens) - i) + 1):
+                    hit = phrases.get(tuple(tokens[i:i + n]))
+                    if hit:
+                        yield from hit
+        if text:
+            for regex, target in self.regexes:
+                if regex.search(text):
+                    yield target
+        if ai_category:
+            yield from self.categories.get(ai_category.strip().lower(), ())
+
+    def match(self, text, ai_category=None):
+        """
+        Returns [{'department', 'ministry', 'score'}] sorted by descending score.
+        Each rule counts once, however often it matches.
+        """
+        seen = set()
+        scores = defaultdict(int)
+        ministries = {}
+        for rule_id, department_id, ministry_id, weight in self._matched_targets(text, ai_category):
+            if rule_id in seen:
+                continue
+            seen.add(rule_id)
+            scores[department_id] += weight
+            ministries[department_id] = ministry_id
+
+        return [
+            {'department': d, 'ministry': ministries[d], 'score': score}
+            for d, score in sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        ]
+
+
+# --- Process-wide cached automaton ---
+
+_lock = threading.Lock()
+_state = {'automaton': None, 'version': None, 'checked': 0.0}
+
+
+def bump_rules_version():
+    """
+    Called from signals whenever a RoutingRule changes; every process
+    rebuilds its automaton on the next version check.
+    """
+    try:
+        cache.incr(RULES_VERSION_KEY)
+    except ValueError:
+        cache.set(RULES_VERSION_KEY, int(time.time()), timeout=None)
+
+
+def get_automaton():
+    """
+    Returns the compiled automaton, rebuilding it only when the rules version
+    changes. The shared version is checked at most every ROUTING_VERSION_CHECK_SECONDS.
+    """
+    now = time.monotonic()
+    interval = getattr(settings, 'ROUTING_VERSION_CHECK_SECONDS', 30)
+    if _state['automaton'] is not None and now - _state['checked'] < interval:
+        return _state['automaton']
+
+    with _lock:
+        version = cache.get_or_set(RULES_VERSION_KEY, 1, timeout=None)
+        if _state['automaton'] is None or version != _state['version']:
+            from .models import RoutingRule
+            rules = RoutingRule.objects.filter(is_active=True).values(
+                'id', 'kind', 'pattern', 'weight', 'department_id', 'department__ministry_id'
+            )
+            _state['automaton'] = RoutingAutomaton(list(rules))
+            _state['version'] = version
+            logger.info(f"Routing automaton rebuilt (version {version})")
+        _state['checked'] = now
+    return _state['automaton']
+
+
+def suggest_departments(title, description, ai_category=None, ministry_ids=None, limit=5):
+    """
+    Suggests departments for a complaint. When `ministry_ids` is given only
+    departments of those ministries are returned.
+    """
+    suggestions = get_automaton().match(f"{title}\n{description}", ai_category=ai_category)
+    if ministry_ids is not None:
+        allowed = set(int(m) for m in ministry_ids)
+        suggestions = [s for s in suggestions if s['ministry'] in allowed]
+    return suggestions[:limit]
+
+
+def route_complaint(complaint, ai_category=None):
+    """
+    Stores routing suggestions on the complaint and, if it has no departments yet,
+    assigns the suggestions scoring at least ROUTING_AUTO_ASSIGN_SCORE within
+    the complaint's ministries. Returns the list of assigned department ids.
+    """
+    ministry_ids = [m.pk for m in complaint.ministries.all()]
+    suggestions = suggest_departments(complaint.title, complaint.description,
+                                      ai_category=ai_category or complaint.ai_suggested_category)
+    complaint.routing_suggestions = suggestions
+
+    from .events import record
+    from .sync import next_seq
+
+    with transaction.atomic():
+        complaint.change_seq = next_seq()
+        type(complaint).objects.filter(pk=complaint.pk).update(
+            routing_suggestions=suggestions, change_seq=complaint.change_seq
+        )
+
+        threshold = getattr(settings, 'ROUTING_AUTO_ASSIGN_SCORE', 2)
+        if not threshold or complaint.departments.exists():
+            return []
+        assigned = [s['department'] for s in suggestions if s['score'] >= threshold and s['ministry'] in ministry_ids]
+        if assigned:
+            complaint.departments.add(*assigned)
+            record(complaint.pk, 'routed', {'departments': assigned})
+    return assigned
@@ -2,7 +2,14 @@ from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
 from django.db import transaction
-from .models import Complaint, Ministry, Department, ComplaintUpdate, UserProfile
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from .models import (
+    Complaint, Ministry, Department, ComplaintUpdate, UserProfile,
+    ArchivedComplaint, ArchivedComplaintUpdate, MinistryReport,
+)
+from .reports import parse_period
 
 
 # --- User & Registration Serializers ---
@@ -15,8 +22,8 @@ class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserProfile
         fields = ['user', 'role', 'phone_number', 'ministry', 'department', 'government_id_document', 'first_name',
-                  'last_name', 'email']
-        read_only_fields = ['user', 'role', 'ministry', 'department', 'government_id_document']
+                  'last_name', 'email', 'digest_frequency', 'digest_sent_at']
+        read_only_fields = ['user', 'role', 'ministry', 'department', 'government_id_document', 'digest_sent_at']
 
     def update(self, instance, validated_data):
         user_data = validated_data.pop('user', {})
@@ -70,6 +77,22 @@ class RegisterSerializer(serializers.ModelSerializer):
         return user
 
 
+class PortalTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Embeds role and jurisdiction claims in the token so clients can route
+    the user without an extra /profile/ round-trip.
+    """
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        profile = getattr(user, 'profile', None)
+        token['role'] = 'SUPER' if user.is_superuser else (profile.role if profile else None)
+        token['ministry_id'] = profile.ministry_id if profile else None
+        token['department_id'] = profile.department_id if profile else None
+        return token
+
+
 class BulkAdminUploadSerializer(serializers.Serializer):
     file = serializers.FileField()
 
@@ -126,16 +149,148 @@ class ComplaintSerializer(serializers.ModelSerializer):
     class Meta:
         model = Complaint
         fields = [
-            'tracking_id', 'title', 'description', 'status', 'created_at', 'updated_at',
+            'tracking_id', 'short_code', 'title', 'description', 'status', 'created_at', 'updated_at',
             'created_by',
             'ministries', 'departments', 'ministry_ids', 'department_ids',
             'attachment', 'updates', 'ai_suggested_category', 'ai_suggested_priority',
+            'routing_suggestions',
         ]
-        read_only_fields = ('tracking_id', 'created_at', 'updated_at', 'created_by',
-                            'updates', 'ai_suggested_category', 'ai_suggested_priority')
+        read_only_fields = ('tracking_id', 'short_code', 'created_at', 'updated_at', 'created_by',
+                            'updates', 'ai_suggested_category', 'ai_suggested_priority', 'routing_suggestions')
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         request = self.context.get('request')
         if request and hasattr(request.user, 'profile') and request.user.profile.role == 'CITIZEN':
-            self.fields['status'].read_only = True
\ No newline at end of file
+            self.fields['status'].read_only = True
+
+
+class CompactComplaintSerializer(ComplaintSerializer):
+    """
+    ComplaintSerializer with ministries, departments and created_by as IDs.
+    The referenced objects are sent once per response by build_included().
+    """
+    created_by = serializers.PrimaryKeyRelatedField(read_only=True)
+    ministries = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+    departments = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+
+
+class SyncComplaintSerializer(CompactComplaintSerializer):
+    """
+    Compact complaint for /api/sync/. Updates travel in their own stream.
+    """
+
+    class Meta(CompactComplaintSerializer.Meta):
+        fields = [f for f in ComplaintSerializer.Meta.fields if f not in ('updates', 'ministry_ids', 'department_ids')]
+
+
+class SyncComplaintUpdateSerializer(serializers.ModelSerializer):
+    user = serializers.StringRelatedField(read_only=True)
+
+    class Meta:
+        model = ComplaintUpdate
+        fields = ['id', 'complaint', 'user', 'update_text', 'created_at']
+        read_only_fields = fields
+
+
+def build_included(complaints):
+    """
+    Side-loads the ministries, departments and users referenced by a page of
+    complaints (already prefetched) as id -> object maps.
+    """
+    ministries, departments, users = {}, {}, {}
+    for complaint in complaints:
+        for m in complaint.ministries.all():
+            ministries.setdefault(m.pk, m)
+        for d in complaint.departments.all():
+            departments.setdefault(d.pk, d)
+        users.setdefault(complaint.created_by_id, complaint.created_by)
+    return {
+        'ministries': {pk: MinistrySerializer(m).data for pk, m in ministries.items()},
+        'departments': {pk: DepartmentSerializer(d).data for pk, d in departments.items()},
+        'users': {pk: UserSerializer(u).data for pk, u in users.items()},
+    }
+
+
+class ComplaintBulkUpdateSerializer(serializers.Serializer):
+    tracking_ids = serializers.ListField(
+        child=serializers.UUIDField(), allow_empty=False, max_length=5000
+    )
+    status = serializers.ChoiceField(choices=Complaint.STATUS_CHOICES)
+    remark = serializers.CharField(required=False, allow_blank=True)
+
+
+
+class RoutingSuggestSerializer(serializers.Serializer):
+    title = serializers.CharField(max_length=255)
+    description = serializers.CharField(required=False, allow_blank=True)
+    ministry_ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+
+
+
+class ArchivedComplaintUpdateSerializer(serializers.ModelSerializer):
+    user = serializers.StringRelatedField(read_only=True)
+
+    class Meta:
+        model = ArchivedComplaintUpdate
+        fields = ['id', 'user', 'update_text', 'created_at']
+
+
+class ArchivedComplaintSerializer(serializers.ModelSerializer):
+    """
+    Read-only view of an archived complaint in the same shape as ComplaintSerializer.
+    """
+    created_by = UserSerializer(read_only=True)
+    updates = ArchivedComplaintUpdateSerializer(many=True, read_only=True)
+    ministries = MinistrySerializer(many=True, read_only=True)
+    departments = DepartmentSerializer(many=True, read_only=True)
+    archived = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ArchivedComplaint
+        fields = [
+            'tracking_id', 'short_code', 'title', 'description', 'status', 'created_at', 'updated_at',
+            'created_by', 'ministries', 'departments', 'attachment', 'updates',
+            'ai_suggested_category', 'ai_suggested_priority', 'archived',
+        ]
+        read_only_fields = fields
+
+    def get_archived(self, obj):
+        return True
+
+
+# --- Reports ---
+
+class MinistryReportSerializer(serializers.ModelSerializer):
+    ministry_name = serializers.CharField(source='ministry.name', read_only=True)
+    period = serializers.DateField(format='%Y-%m', read_only=True)
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = MinistryReport
+        fields = [
+            'id', 'ministry', 'ministry_name', 'period', 'format', 'status', 'fingerprint', 'size', 'row_count',
+            'requested_at', 'checked_at', 'generated_at', 'error', 'download_url',
+        ]
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        if not obj.file:
+            return None
+        url = reverse('ministry-report-download', args=[obj.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+
+class MinistryReportRequestSerializer(serializers.Serializer):
+    ministry = serializers.PrimaryKeyRelatedField(queryset=Ministry.objects.all(), required=False)
+    period = serializers.CharField(help_text='Month as YYYY-MM.')
+    format = serializers.ChoiceField(choices=MinistryReport.FORMAT_CHOICES, default='xlsx')
+
+    def validate_period(self, value):
+        period = parse_period(value)
+        if period is None:
+            raise serializers.ValidationError('Use the YYYY-MM format.')
+        if period > timezone.localdate().replace(day=1):
+            raise serializers.ValidationError('The period cannot be in the future.')
+        return period
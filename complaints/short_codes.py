@@ -0,0 +1,137 @@
+import secrets
+import uuid
+
+from django.db import transaction
+
+# Crockford base32: digits and capitals without I, L, O and U, so codes read out
+# over the phone can't be confused. 8 characters = 32**8 (~10**12) codes.
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+LENGTH = 8
+
+# Look-alikes a citizen may type for the letters left out of the alphabet
+_LOOK_ALIKES = str.maketrans({'I': '1', 'L': '1', 'O': '0'})
+
+
+def generate():
+    return ''.join(secrets.choice(ALPHABET) for _ in range(LENGTH))
+
+
+def normalize(value):
+    """
+    Canonical short code for user input ("k3m9-qx7t", "K3M9 QX7T", O for 0...),
+    or None when it can't be one.
+    """
+    code = str(value or '').strip().upper().replace('-', '').replace(' ', '').translate(_LOOK_ALIKES)
+    if len(code) != LENGTH or any(c not in ALPHABET for c in code):
+        return None
+    return code
+
+
+def display(code):
+    """
+    "K3M9-QX7T": the form shown in notifications and on the portal.
+    """
+    return f'{code[:4]}-{code[4:]}' if code else ''
+
+
+def reference(complaint):
+    """
+    What a citizen should quote for `complaint`: its short code, or the tracking
+    ID prefix for rows not backfilled yet.
+    """
+    return display(complaint.short_code) if complaint.short_code else str(complaint.tracking_id)[:8]
+
+
+def _taken(codes):
+    from .models import ArchivedComplaint, Complaint
+
+    taken = set()
+    for model in (Complaint, ArchivedComplaint):
+        taken.update(model.objects.filter(short_code__in=codes).values_list('short_code', flat=True))
+    return taken
+
+
+def unique_codes(count):
+    """
+    `count` fresh codes, checked against live and archived complaints in one
+    query per table per round. The unique constraint still guards the race
+    between the check and the insert.
+    """
+    codes = set()
+    while len(codes) < count:
+        candidates = {generate() for _ in range(count - len(codes))} - codes
+        codes |= candidates - _taken(candidates)
+    return list(codes)
+
+
+def assign(complaints):
+    """
+    Gives every complaint in `complaints` without a short code a fresh one (for bulk_create paths).
+    """
+    missing = [c for c in complaints if not c.short_code]
+    for complaint, code in zip(missing, unique_codes(len(missing))):
+        complaint.short_code = code
+    return len(missing)
+
+
+# --- Lookups ---
+
+def lookup(value):
+    """
+    Filter kwargs matching a full tracking ID or a short code, or None when
+    `value` is neither. Both are unique-index hits.
+    """
+    try:
+        return {'tracking_id': uuid.UUID(str(value))}
+    except ValueError:
+        pass
+    code = normalize(value)
+    return {'short_code': code} if code else None
+
+
+def uuid_prefix_range(term):
+    """
+    (low, high) UUIDs bounding a hex prefix of at least 6 digits, for an index
+    range scan instead of a LIKE over the whole table. None when `term` isn't UUID-like.
+    """
+    hex_digits = term.replace('-', '').lower()
+    if not 6 <= len(hex_digits) <= 32 or any(c not in '0123456789abcdef' for c in hex_digits):
+        return None
+    return uuid.UUID(hex_digits.ljust(32, '0')), uuid.UUID(hex_digits.ljust(32, 'f'))
+
+
+# --- Backfill ---
+
+def backfill(batch_size=2000, stdout=None):
+    """
+    Assigns short codes to complaints created before they existed, one
+    transaction per batch so the tables are never locked for long. Backfilled
+    live complaints move to the head of the sync feed so clients pick up the code.
+    Returns the number of complaints updated.
+    """
+    from . import sync
+    from .models import ArchivedComplaint, Complaint
+
+    total = 0
+    for model in (Complaint, ArchivedComplaint):
+        done = 0
+        while True:
+            with transaction.atomic():
+                pks = list(model.objects.filter(short_code__isnull=True).order_by()
+                           .values_list('pk', flat=True)[:batch_size])
+                if not pks:
+                    break
+                rows = [model(pk=pk) for pk in pks]
+                assign(rows)
+                fields = ['short_code']
+                if model is Complaint:
+                    seq = sync.next_seq()
+                    for row in rows:
+                        row.change_seq = seq
+                    fields.append('change_seq')
+                model.objects.bulk_update(rows, fields, batch_size=500)
+            done += len(rows)
+            if stdout:
+                stdout.write(f'{model.__name__}: {done} short codes assigned')
+        total += done
+    return total
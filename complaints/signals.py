@@ -1,8 +1,17 @@
-from django.db.models.signals import post_save, pre_save
+from celery.signals import task_prerun, task_postrun
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_save, pre_save, post_delete, pre_delete
 from django.dispatch import receiver
-from .models import Complaint, ComplaintUpdate
-from .tasks import process_complaint_ai
-from .utils import send_sms_notification, send_email_notification
+from django.utils import timezone
+from . import events, instrumentation, outbox, profiling, short_codes, sync
+from .authentication import invalidate_cached_user
+from .models import Complaint, ComplaintUpdate, UserProfile, RoutingRule
+from .routing import bump_rules_version
+from .sla import compute_due_at
+from .utils import (
+    send_sms_notification, send_email_notification,
+    build_status_change_message, build_new_remark_message,
+)
 
 
 @receiver(post_save, sender=Complaint)
@@ -12,7 +21,11 @@ def trigger_ai_processing(sender, instance, created, **kwargs):
     """
     if created:
         print(f"New complaint {instance.tracking_id} detected. Sending to AI task queue.")
-        process_complaint_ai.delay(instance.tracking_id)
+        # Written to the outbox in the same transaction; published once it commits
+        outbox.enqueue(
+            'complaint.created', 'complaints.tasks.process_complaint_ai',
+            args=[str(instance.tracking_id)], key=f"ai:{instance.tracking_id}",
+        )
 
 
 @receiver(pre_save, sender=Complaint)
@@ -29,6 +42,29 @@ def store_old_status(sender, instance, **kwargs):
     else:
         instance._old_status = None
 
+    # Keep resolved_at in sync for resolution-time analytics
+    if instance.status in Complaint.CLOSED_STATUSES:
+        if instance._old_status not in Complaint.CLOSED_STATUSES or instance.resolved_at is None:
+            instance.resolved_at = timezone.now()
+    else:
+        instance.resolved_at = None
+        if instance._old_status in Complaint.CLOSED_STATUSES:
+            # Reopened: a fresh deadline from now, and back into the SLA scan
+            instance.reopened_at = timezone.now()
+            instance.escalated_at = None
+
+    # SLA deadline follows the (AI-suggested) priority
+    instance.due_at = compute_due_at(instance)
+
+
+@receiver(pre_save, sender=Complaint)
+def assign_short_code(sender, instance, **kwargs):
+    """
+    New complaints get the short code citizens quote to call centres.
+    """
+    if not instance.short_code:
+        short_codes.assign([instance])
+
 
 @receiver(post_save, sender=Complaint)
 def notify_citizen_on_status_change(sender, instance, created, **kwargs):
@@ -45,30 +81,11 @@ def notify_citizen_on_status_change(sender, instance, created, **kwargs):
         latest_update = instance.updates.order_by('-created_at').first()
         admin_remark = latest_update.update_text if latest_update else "Status updated by administration."
 
-        # Prepare Message
-        status_display = instance.get_status_display()
-
-        email_subject = f"Update on your Grievance (ID: {str(instance.tracking_id)[:8]})"
-
-        message_body = f"""
-Dear {citizen_user.first_name},
-
-The status of your grievance regarding "{instance.title}" has been updated.
-
-New Status: {status_display}
-Admin Remarks: {admin_remark}
-
-You can login to the portal for more details.
-
-Thank you,
-Gunaso Portal Team
-Government of Nepal
-        """
+        email_subject, message_body, sms_text = build_status_change_message(instance, citizen_user, admin_remark)
 
         # 1. Send SMS (Placeholder)
         if citizen_profile and citizen_profile.phone_number:
-            send_sms_notification(citizen_profile.phone_number,
-                                  f"Gunaso Portal: Your grievance status is now {status_display}. Remark: {admin_remark}")
+            send_sms_notification(citizen_profile.phone_number, sms_text)
 
         # 2. Send Real Email
         if citizen_user.email:
@@ -92,22 +109,139 @@ def notify_citizen_on_new_remark(sender, instance, created, **kwargs):
 
         citizen_profile = getattr(citizen_user, 'profile', None)
 
-        email_subject = f"New Message on your Grievance (ID: {str(complaint.tracking_id)[:8]})"
+        email_subject, message_body = build_new_remark_message(complaint, citizen_user, instance.update_text)
 
-        message_body = f"""
-Dear {citizen_user.first_name},
+        if citizen_user.email:
+            send_email_notification(email_subject, message_body, [citizen_user.email])
 
-A new remark has been added to your grievance "{complaint.title}".
 
-Official Remark:
-{instance.update_text}
+# --- Event log ---
 
-Log in to the portal to view full history.
+@receiver(post_save, sender=Complaint)
+def record_complaint_events(sender, instance, created, **kwargs):
+    """
+    Appends 'created' / 'status' events in the saving transaction.
+    """
+    if created:
+        events.record(instance.pk, 'created', {'status': instance.status}, actor_id=instance.created_by_id,
+                      at=instance.created_at)
+    elif getattr(instance, '_old_status', None) not in (None, instance.status):
+        events.record(instance.pk, 'status', {'from': instance._old_status, 'to': instance.status})
 
-Thank you,
-Gunaso Portal Team
-Ministry of Education,Science and Technology
-        """
 
-        if citizen_user.email:
-            send_email_notification(email_subject, message_body, [citizen_user.email])
\ No newline at end of file
+@receiver(post_save, sender=ComplaintUpdate)
+def record_remark_event(sender, instance, created, **kwargs):
+    if created:
+        events.record(instance.complaint_id, 'remark', {'update': instance.pk}, actor_id=instance.user_id,
+                      at=instance.created_at)
+
+
+# --- Delta sync ---
+
+@receiver(pre_save, sender=Complaint)
+@receiver(pre_save, sender=ComplaintUpdate)
+def assign_change_seq(sender, instance, **kwargs):
+    """
+    Every saved complaint/update moves to the head of the sync feed.
+    """
+    instance.change_seq = sync.next_seq()
+
+
+@receiver(pre_delete, sender=Complaint)
+def capture_sync_scope(sender, instance, **kwargs):
+    # M2M links are gone by post_delete, so the jurisdiction is read here
+    if not sync.tombstones_suppressed():
+        instance._sync_scope = sync.complaint_scope(instance)
+
+
+@receiver(post_delete, sender=Complaint)
+def record_complaint_tombstone(sender, instance, **kwargs):
+    if not sync.tombstones_suppressed() and hasattr(instance, '_sync_scope'):
+        sync.record_tombstones('complaint', [(instance.pk, instance.pk, instance._sync_scope)])
+
+
+@receiver(post_delete, sender=ComplaintUpdate)
+def record_update_tombstone(sender, instance, origin=None, **kwargs):
+    # Updates removed along with their complaint are covered by the complaint's tombstone
+    origin_model = getattr(origin, 'model', type(origin))
+    if sync.tombstones_suppressed() or origin_model is Complaint:
+        return
+    complaint = Complaint.objects.filter(pk=instance.complaint_id).first()
+    scope = sync.complaint_scope(complaint) if complaint else {}
+    sync.record_tombstones('update', [(instance.pk, instance.complaint_id, scope)])
+
+
+@receiver(m2m_changed, sender=Complaint.ministries.through)
+@receiver(m2m_changed, sender=Complaint.departments.through)
+def record_scope_exit_tombstones(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Unlinking a ministry or department takes the complaint out of its admins'
+    scope: they get a 'scope' tombstone. Linking bumps the complaint's
+    sequence so admins gaining it pick it up on their next sync.
+    """
+    target = 'ministry_id' if sender is Complaint.ministries.through else 'department_id'
+    field = 'ministry_ids' if target == 'ministry_id' else 'department_ids'
+    links = sender.objects.filter(**{'complaint_id' if not reverse else target: instance.pk})
+
+    if action == 'pre_clear':
+        instance._sync_cleared = list(links.values_list('complaint_id', target))
+        return
+    if action == 'post_clear':
+        pairs = getattr(instance, '_sync_cleared', [])
+    elif action in ('post_remove', 'post_add'):
+        pairs = [(pk, instance.pk) if reverse else (instance.pk, pk) for pk in pk_set or ()]
+    else:
+        return
+    if not pairs:
+        return
+
+    if action == 'post_add':
+        Complaint.objects.filter(pk__in={complaint_id for complaint_id, _ in pairs}).update(change_seq=sync.next_seq())
+        return
+    unlinked = {}
+    for complaint_id, target_id in pairs:
+        unlinked.setdefault(complaint_id, set()).add(target_id)
+    sync.record_scope_exits(field, unlinked)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_auth_cache(sender, instance, **kwargs):
+    """
+    Drop the cached user/profile used by CachedJWTAuthentication
+    whenever the account changes (active flag, password, superuser...).
+    """
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_profile_auth_cache(sender, instance, **kwargs):
+    """
+    Role or jurisdiction (ministry/department) changes must take effect
+    on the very next request.
+    """
+    invalidate_cached_user(instance.user_id)
+
+
+@receiver(post_save, sender=RoutingRule)
+@receiver(post_delete, sender=RoutingRule)
+def rebuild_routing_automaton(sender, instance, **kwargs):
+    """
+    Rule changes invalidate the compiled routing automaton in every process.
+    """
+    bump_rules_version()
+
+
+# --- Celery task instrumentation ---
+
+@task_prerun.connect
+def start_task_timer(task_id=None, task=None, **kwargs):
+    instrumentation.task_started(task_id)
+    profiling.task_started(task_id, task.name)
+
+
+@task_postrun.connect
+def stop_task_timer(task_id=None, task=None, state=None, **kwargs):
+    profiling.task_finished(task_id, error=state not in ('SUCCESS', None))
+    instrumentation.task_finished(task_id, task.name, error=state not in ('SUCCESS', None))
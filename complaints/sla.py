@@ -0,0 +1,128 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import events, short_codes
+from .models import Complaint, UserProfile
+from .utils import send_bulk_email_notifications
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLA_HOURS = {'HIGH': 72, 'MEDIUM': 168, 'LOW': 336, None: 168}
+
+
+def sla_hours(priority):
+    """
+    Resolution deadline in hours for an AI-suggested priority (None = not yet triaged).
+    """
+    hours = getattr(settings, 'SLA_HOURS', DEFAULT_SLA_HOURS)
+    return hours.get(priority, hours.get(None, 168))
+
+
+def compute_due_at(complaint):
+    """
+    Deadline for an open complaint, or None once it is closed. Escalated
+    complaints keep their deadline but are excluded by the partial index.
+    The clock runs from the last reopening, if any, else from creation.
+    """
+    if complaint.status in Complaint.CLOSED_STATUSES:
+        return None
+    if complaint.escalated_at:
+        return complaint.due_at
+    started = complaint.reopened_at or complaint.created_at or timezone.now()
+    return started + timedelta(hours=sla_hours(complaint.ai_suggested_priority))
+
+
+def _claim_batch(now, batch_size):
+    """
+    Marks up to `batch_size` newly breached complaints as escalated and
+    returns them. Walks the partial due_at index only; SKIP LOCKED lets
+    several workers run this concurrently on Postgres.
+    """
+    with transaction.atomic():
+        ids = list(
+            Complaint.objects
+            .select_for_update(skip_locked=True)
+            .filter(escalated_at__isnull=True, due_at__isnull=False, due_at__lte=now)
+            .order_by('due_at')
+            .values_list('tracking_id', flat=True)[:batch_size]
+        )
+        if ids:
+            Complaint.objects.filter(tracking_id__in=ids).update(escalated_at=now)
+            events.record_many('escalated', [(tid, None) for tid in ids], at=now)
+    return ids
+
+
+def escalate_overdue(batch_size=500, max_batches=20):
+    """
+    Escalates complaints whose due_at has passed, in bounded batches, and sends
+    one summary email per recipient for the whole run.
+    """
+    now = timezone.now()
+    escalated = []
+    for _ in range(max_batches):
+        ids = _claim_batch(now, batch_size)
+        escalated.extend(ids)
+        if len(ids) < batch_size:
+            break
+
+    if escalated:
+        notify_escalations(escalated)
+    logger.info(f"SLA escalation: {len(escalated)} complaints escalated")
+    return len(escalated)
+
+
+def notify_escalations(tracking_ids):
+    """
+    Groups escalated complaints by ministry and notifies ministry-level admins
+    (falling back to super admins) with a single digest each.
+    """
+    through = Complaint.ministries.through
+    by_ministry = defaultdict(list)
+    for complaint_id, ministry_id in through.objects.filter(complaint_id__in=tracking_ids).values_list(
+            'complaint_id', 'ministry_id'):
+        by_ministry[ministry_id].append(complaint_id)
+
+    complaints = {
+        c.tracking_id: c for c in Complaint.objects.filter(tracking_id__in=tracking_ids).only(
+            'tracking_id', 'short_code', 'title', 'status', 'due_at', 'ai_suggested_priority')
+    }
+
+    # Ministry-level admins (no department) for every affected ministry in one query
+    recipients = defaultdict(set)
+    admins = UserProfile.objects.filter(
+        role='ADMIN', ministry_id__in=list(by_ministry), department__isnull=True
+    ).select_related('user')
+    admins_by_ministry = defaultdict(list)
+    for profile in admins:
+        admins_by_ministry[profile.ministry_id].append(profile.user.email)
+    supers = [p.user.email for p in UserProfile.objects.filter(role='SUPER').select_related('user')]
+
+    unassigned = set(tracking_ids) - {cid for ids in by_ministry.values() for cid in ids}
+    for ministry_id, ids in by_ministry.items():
+        for email in admins_by_ministry.get(ministry_id) or supers:
+            recipients[email].update(ids)
+    for email in supers:
+        recipients[email].update(unassigned)
+
+    messages = []
+    for email, ids in recipients.items():
+        if not email or not ids:
+            continue
+        lines = [
+            f"- {short_codes.reference(complaints[cid])} [{complaints[cid].ai_suggested_priority or 'UNTRIAGED'}] "
+            f"{complaints[cid].title} (due {timezone.localtime(complaints[cid].due_at):%Y-%m-%d %H:%M})"
+            for cid in sorted(ids, key=lambda c: complaints[c].due_at) if cid in complaints
+        ]
+        body = (
+            f"The following {len(lines)} grievance(s) have passed their resolution deadline "
+            f"and were escalated:\n\n" + "\n".join(lines) +
+            "\n\nPlease log in to the Gunaso Portal to act on them.\n\nGunaso Portal Team"
+        )
+        messages.append((f"[Gunaso Portal] {len(lines)} overdue grievance(s) escalated", body, [email]))
+
+    return send_bulk_email_notifications(messages)
@@ -0,0 +1,205 @@
+import base64
+import binascii
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from .models import ChangeSequence, Complaint, ComplaintUpdate, SyncTombstone
+
+logger = logging.getLogger(__name__)
+
+SEQUENCE = 'sync'
+PURGED = 'sync.purged'
+TOKEN_VERSION = 'v1'
+
+_suppress_tombstones = ContextVar('suppress_tombstones', default=False)
+
+
+# --- Sequence ---
+
+def next_seq():
+    """
+    Allocates the next change sequence number. Call it inside the transaction
+    that writes the row: the counter row then stays locked until commit, so
+    sequence order is commit order and a reader never skips an in-flight write.
+    The price is that writers serialize on that row from this call to commit:
+    take it as late in the transaction as possible, after any bulk work.
+    Outside a transaction the number would commit before the row, so that is
+    refused.
+    """
+    if not transaction.get_connection(router.db_for_write(ChangeSequence)).in_atomic_block:
+        raise RuntimeError('next_seq() must be called inside the transaction that writes the row.')
+    if not ChangeSequence.objects.filter(name=SEQUENCE).update(value=F('value') + 1):
+        ChangeSequence.objects.get_or_create(name=SEQUENCE)
+        ChangeSequence.objects.filter(name=SEQUENCE).update(value=F('value') + 1)
+    return ChangeSequence.objects.values_list('value', flat=True).get(name=SEQUENCE)
+
+
+def current_seq(name=SEQUENCE):
+    return ChangeSequence.objects.filter(name=name).values_list('value', flat=True).first() or 0
+
+
+def encode_token(seq):
+    return base64.urlsafe_b64encode(f'{TOKEN_VERSION}:{seq}'.encode()).decode().rstrip('=')
+
+
+def decode_token(token):
+    """
+    Returns the sequence number in an opaque sync token (0 for none).
+    Raises ValueError for anything this server didn't issue.
+    """
+    if not token:
+        return 0
+    try:
+        version, seq = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode().split(':')
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError('Malformed sync token.')
+    if version != TOKEN_VERSION or not seq.isdigit():
+        raise ValueError('Unsupported sync token.')
+    return int(seq)
+
+
+# --- Tombstones ---
+
+@contextmanager
+def suppress_tombstones():
+    """
+    Deletions inside the block write no tombstones (the caller records its own).
+    """
+    token = _suppress_tombstones.set(True)
+    try:
+        yield
+    finally:
+        _suppress_tombstones.reset(token)
+
+
+def tombstones_suppressed():
+    return _suppress_tombstones.get()
+
+
+def complaint_scope(complaint):
+    return {
+        'created_by_id': complaint.created_by_id,
+        'ministry_ids': list(complaint.ministries.values_list('pk', flat=True)),
+        'department_ids': list(complaint.departments.values_list('pk', flat=True)),
+    }
+
+
+def record_tombstones(kind, entries, reason='deleted'):
+    """
+    entries: iterable of (object_id, complaint_id, scope dict). All share one sequence number.
+    """
+    entries = list(entries)
+    if not entries:
+        return
+    seq = next_seq()
+    SyncTombstone.objects.bulk_create([
+        SyncTombstone(kind=kind, object_id=str(object_id), complaint_id=complaint_id, reason=reason,
+                      change_seq=seq, **scope)
+        for object_id, complaint_id, scope in entries
+    ], batch_size=1000)
+
+
+def record_scope_exits(field, unlinked):
+    """
+    unlinked: {complaint_id: ids removed from the complaint's `field`
+    ('ministry_ids' or 'department_ids')}. Admins of those ministries or
+    departments no longer see the complaint and are told to drop it.
+    """
+    record_tombstones('complaint', [
+        (pk, pk, {field: sorted(ids)}) for pk, ids in unlinked.items() if ids
+    ], reason='scope')
+
+
+def purge_tombstones(older_than_days=None):
+    """
+    Deletes old tombstones. Clients whose token predates the purge are told to reset.
+    """
+    days = older_than_days or getattr(settings, 'SYNC_TOMBSTONE_DAYS', 30)
+    old = SyncTombstone.objects.filter(deleted_at__lt=timezone.now() - timedelta(days=days))
+    with transaction.atomic():
+        highest = old.aggregate(seq=Max('change_seq'))['seq']
+        if highest is None:
+            return 0
+        deleted, _ = old.filter(change_seq__lte=highest).delete()
+        ChangeSequence.objects.update_or_create(name=PURGED, defaults={'value': highest})
+    return deleted
+
+
+# --- Feed ---
+
+def _tombstone_visible(tombstone, user, profile):
+    if profile is None or profile.role == 'CITIZEN':
+        return tombstone.created_by_id == user.pk
+    if profile.department_id:
+        return profile.department_id in tombstone.department_ids
+    if profile.ministry_id:
+        return profile.ministry_id in tombstone.ministry_ids
+    return False
+
+
+def changes(scoped_complaints, user, since, limit):
+    """
+    Everything in `scoped_complaints` (already restricted to what `user` may
+    see) changed after sequence `since`: up to about `limit` rows per stream,
+    cut at a sequence boundary so the next page resumes exactly.
+    """
+    head = current_seq()
+    reset = bool(since) and since < current_seq(PURGED)
+    if reset:
+        since = 0
+
+    visible = scoped_complaints.order_by().values('pk')
+    streams = {
+        'complaints': Complaint.objects.filter(pk__in=visible),
+        'updates': ComplaintUpdate.objects.filter(complaint_id__in=visible),
+        'tombstones': SyncTombstone.objects.all(),
+    }
+    if since >= head:
+        return {'head': head, 'cutoff': head, 'reset': reset, 'complaints': [], 'updates': [], 'tombstones': []}
+
+    # Cut before the first sequence number that would overflow any stream
+    cutoff = head
+    for queryset in streams.values():
+        overflow = list(
+            queryset.filter(change_seq__gt=since, change_seq__lte=head)
+            .order_by('change_seq').values_list('change_seq', flat=True)[limit:limit + 1]
+        )
+        if overflow:
+            # A single bulk write larger than `limit` shares one number and is sent whole
+            cutoff = min(cutoff, max(overflow[0] - 1, since + 1))
+
+    window = {'change_seq__gt': since, 'change_seq__lte': cutoff}
+    complaints = list(
+        streams['complaints'].filter(**window).order_by('change_seq')
+        .select_related('created_by').prefetch_related('ministries', 'departments')
+    )
+    updates = list(streams['updates'].filter(**window).order_by('change_seq').select_related('user'))
+
+    tombstones = streams['tombstones'].filter(**window).order_by('change_seq')
+    profile = getattr(user, 'profile', None)
+    if not (user.is_superuser or (profile and profile.role == 'SUPER')):
+        if profile is None or profile.role == 'CITIZEN':
+            tombstones = tombstones.filter(created_by_id=user.pk)
+        else:
+            tombstones = [t for t in tombstones if _tombstone_visible(t, user, profile)]
+    # A complaint that left a scope may be back in it (or never left the caller's)
+    exited = {t.complaint_id for t in tombstones if t.reason == 'scope'}
+    if exited:
+        still_visible = set(scoped_complaints.filter(pk__in=exited).values_list('pk', flat=True))
+        tombstones = [t for t in tombstones if not (t.reason == 'scope' and t.complaint_id in still_visible)]
+
+    return {
+        'head': head,
+        'cutoff': cutoff,
+        'reset': reset,
+        'complaints': complaints,
+        'updates': updates,
+        'tombstones': list(tombstones),
+    }
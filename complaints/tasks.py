@@ -1,96 +1,311 @@
-import os
+import logging
+
 from celery import shared_task
-from .models import Complaint
-from google.api_core.client_options import ClientOptions
-from google.api_core.retry import Retry, if_transient_error  # <-- Import the function directly
-from google.generativeai import GenerativeModel, configure
-import google.api_core.exceptions
-
-# Configure the Gemini API client
-api_key = os.environ.get("GEMINI_API_KEY")
-
-if api_key:
-    configure(
-        api_key=api_key,
-        client_options=ClientOptions(
-            api_endpoint=os.environ.get("GEMINI_ENDPOINT", "generativelanguage.googleapis.com"),
-        ),
-        transport="rest"
-    )
-    # Configure default retry settings for API calls
-    default_retry = Retry(
-        initial=1.0,
-        maximum=60.0,
-        multiplier=2.0,
-        deadline=300.0,
-        predicate=if_transient_error  # <-- Use the imported function directly
-    )
-else:
-    print("WARNING: GEMINI_API_KEY environment variable not set. AI tasks will fail.")
-    default_retry = None
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import archive, events, outbox, profiling, reports, webhooks
+from .ai import ProviderUnavailable, get_provider
+from .analytics import update_rollups
+from .digests import send_digests
+from .models import Complaint, OutboxEvent
+from .routing import get_automaton, route_complaint
+from .sla import compute_due_at, escalate_overdue
+from .sync import next_seq, purge_tombstones
+from .utils import (
+    build_status_change_message, build_new_remark_message,
+    send_bulk_email_notifications, send_sms_notification,
+)
+
+logger = logging.getLogger(__name__)
 
 
-@shared_task(bind=True, default_retry_delay=60)
+@shared_task(
+    bind=True,
+    default_retry_delay=60,
+    max_retries=5,
+    rate_limit=settings.AI_TASK_RATE_LIMIT,
+    soft_time_limit=settings.AI_TASK_SOFT_TIME_LIMIT,
+    time_limit=settings.AI_TASK_TIME_LIMIT,
+)
 def process_complaint_ai(self, complaint_id):
     """
-    Asynchronous task to process a complaint with the Gemini AI.
+    Asynchronous task to triage a complaint with the configured AI provider (settings.AI_PROVIDER).
     'complaint_id' is now the tracking_id (a UUID).
     """
-    if not api_key:
-        print(f"AI processing skipped for {complaint_id}: API key not configured.")
+    provider = get_provider()
+    if not provider.is_available():
+        logger.warning(f"AI processing skipped for {complaint_id}: {provider.name} provider not configured.")
         return
 
     try:
         complaint = Complaint.objects.get(tracking_id=complaint_id)
     except Complaint.DoesNotExist:
-        print(f"Complaint {complaint_id} not found. Task aborting.")
+        logger.warning(f"Complaint {complaint_id} not found. Task aborting.")
         return
 
-    # Define the system prompt for the AI
-    system_prompt = """
-    You are a grievance analysis bot for a national government portal.
-    Analyze the following complaint text.
-    Respond ONLY with a valid JSON object (no markdown, no other text).
-    The JSON object must have exactly two keys:
-    1. "category": A concise category for the complaint (e.g., "Corruption / Bribe", "Service Delay", "Officer Misconduct", "Policy Issue", "Infrastructure Problem", "Public Safety", "Other").
-    2. "priority": Your suggested priority ("LOW", "MEDIUM", or "HIGH").
+    try:
+        data = provider.classify(complaint.title, complaint.description)
+    except ProviderUnavailable as e:
+        logger.warning(f"AI processing skipped for {complaint_id}: {e}")
+        return
+    except Exception as e:
+        logger.error(f"Error processing complaint {complaint_id}: {e}")
+        # Retry the task if it's a transient error
+        raise self.retry(exc=e)
+
+    with transaction.atomic():
+        # Update the complaint model with AI data
+        complaint.ai_suggested_category = data['category']
+        complaint.ai_suggested_priority = data['priority']
+        complaint.ai_triage_source = data.get('source', provider.name)
+        complaint.save()
+        events.record(complaint.pk, 'ai', {'category': complaint.ai_suggested_category,
+                                           'priority': complaint.ai_suggested_priority,
+                                           'source': complaint.ai_triage_source})
+
+        # Re-route with the AI category (only assigns if no department is set yet)
+        route_complaint(complaint, ai_category=complaint.ai_suggested_category)
+
+    logger.info(f"Successfully processed complaint {complaint_id}. Priority: {complaint.ai_suggested_priority}")
+
+
+@shared_task(soft_time_limit=540, time_limit=600)
+def triage_untriaged_complaints(tracking_ids=None, batch_size=None):
+    """
+    Batch first-pass triage with the local classifier (all untriaged complaints,
+    or just `tracking_ids`). Confident predictions are written in bulk; the rest
+    get a process_complaint_ai job so the LLM can look at them.
     """
+    local = get_provider('complaints.ai.LocalProvider')
+    if not local.is_available():
+        if tracking_ids:
+            # Explicit batches (bulk intake) still get triaged, one LLM job each. Delivery is at
+            # least once: skip complaints already triaged or queued by an earlier run.
+            untriaged = [str(tid) for tid in Complaint.objects.filter(
+                tracking_id__in=tracking_ids, ai_suggested_category__isnull=True
+            ).values_list('tracking_id', flat=True)]
+            queued = set(OutboxEvent.objects.filter(
+                idempotency_key__in=[f"ai:{tid}" for tid in untriaged]
+            ).values_list('idempotency_key', flat=True))
+            todo = [tid for tid in untriaged if f"ai:{tid}" not in queued]
+            with transaction.atomic():
+                for tid in todo:
+                    outbox.enqueue('complaint.created', 'complaints.tasks.process_complaint_ai',
+                                   args=[tid], key=f"ai:{tid}")
+            logger.info(f"No local triage model: {len(todo)} complaints sent to the AI task queue.")
+            return
+        logger.warning("Batch triage skipped: no local triage model.")
+        return
+    escalate = get_provider('complaints.ai.TieredProvider')
+    batch_size = batch_size or getattr(settings, 'AI_TRIAGE_BATCH_SIZE', 1000)
+
+    queryset = Complaint.objects.filter(ai_suggested_category__isnull=True)
+    if tracking_ids is not None:
+        queryset = queryset.filter(tracking_id__in=tracking_ids)
+    # Status and SLA fields too: the deadline follows the new priority
+    fields = ('tracking_id', 'title', 'description', 'status', 'created_at', 'reopened_at', 'escalated_at', 'due_at')
+    can_escalate = escalate.remote.is_available()
+
+    classified, escalated = 0, 0
+    last = None
+    while True:
+        # One batch in memory at a time, by keyset on (created_at, tracking_id)
+        batch = queryset
+        if last is not None:
+            batch = batch.filter(Q(created_at__gt=last[0]) | Q(created_at=last[0], tracking_id__gt=last[1]))
+        chunk = list(batch.order_by('created_at', 'tracking_id').values_list(*fields)[:batch_size])
+        if not chunk:
+            break
+        last = (chunk[-1][4], chunk[-1][0])
+        results = local.classify_many([(row[1], row[2]) for row in chunk])
 
-    # Format the user's complaint text
-    user_prompt = f"""
-    Title: {complaint.title}
-    Details: {complaint.description}
+        confident, unsure = [], []
+        for (tid, _, _, status, created_at, reopened_at, escalated_at, due_at), result in zip(chunk, results):
+            if can_escalate and escalate.needs_escalation(result):
+                unsure.append(tid)
+            else:
+                complaint = Complaint(tracking_id=tid, ai_suggested_category=result['category'],
+                                      ai_suggested_priority=result['priority'], ai_triage_source=local.name,
+                                      status=status, created_at=created_at, reopened_at=reopened_at,
+                                      escalated_at=escalated_at, due_at=due_at)
+                complaint.due_at = compute_due_at(complaint)
+                confident.append(complaint)
+
+        with transaction.atomic():
+            now = timezone.now()
+            for complaint in confident:
+                complaint.updated_at = now
+            Complaint.objects.bulk_update(
+                confident, ['ai_suggested_category', 'ai_suggested_priority', 'ai_triage_source', 'due_at',
+                            'updated_at'],
+                batch_size=500
+            )
+            events.record_many('ai', [
+                (c.pk, {'category': c.ai_suggested_category, 'priority': c.ai_suggested_priority,
+                        'source': c.ai_triage_source})
+                for c in confident
+            ])
+            for tid in unsure:
+                outbox.enqueue('complaint.triage_escalated', 'complaints.tasks.process_complaint_ai',
+                               args=[str(tid)])
+            # Taken last so the bulk_update above doesn't hold the change-sequence row
+            Complaint.objects.filter(pk__in=[c.pk for c in confident]).update(change_seq=next_seq())
+
+        # Category routing rules only matter for categories that have one
+        categories = get_automaton().categories
+        for complaint in confident:
+            if complaint.ai_suggested_category.lower() in categories:
+                complaint = Complaint.objects.prefetch_related('ministries').get(pk=complaint.pk)
+                route_complaint(complaint)
+
+        classified += len(confident)
+        escalated += len(unsure)
+
+    logger.info(f"Batch triage: {classified} classified locally, {escalated} escalated to the LLM.")
+
+
+@shared_task(soft_time_limit=300, time_limit=360)
+def send_bulk_update_notifications(changed_ids, remarked_ids, remark=None):
+    """
+    One batched notification job for a bulk status change / remark.
+    'changed_ids' had their status changed; 'remarked_ids' only got a remark.
     """
+    admin_remark = remark or "Status updated by administration."
+    changed = set(str(i) for i in changed_ids)
+    complaints = Complaint.objects.filter(
+        tracking_id__in=list(changed) + list(remarked_ids)
+    ).select_related('created_by', 'created_by__profile')
 
-    try:
-        model = GenerativeModel(
-            model_name="gemini-2.5-flash-preview-09-2025",
-            system_instruction=system_prompt,
-            generation_config={"response_mime_type": "application/json"}
-        )
-
-        # Generate content with retry
-        # Note: Some older versions of the SDK might not accept 'retry' in request_options
-        # If this fails, we can remove request_options entirely.
-        response = model.generate_content(
-            user_prompt,
-            request_options={'retry': default_retry} if default_retry else None
-        )
-
-        # Extract and parse the JSON response
-        ai_data = response.candidates[0].content.parts[0].text
-
-        import json
-        data = json.loads(ai_data)
+    emails = []
+    for complaint in complaints.iterator(chunk_size=500):
+        citizen_user = complaint.created_by
+        citizen_profile = getattr(citizen_user, 'profile', None)
 
-        # Update the complaint model with AI data
-        complaint.ai_suggested_category = data.get('category', 'Uncategorized')
-        complaint.ai_suggested_priority = data.get('priority', 'MEDIUM').upper()
-        complaint.save()
+        if str(complaint.tracking_id) in changed:
+            subject, body, sms_text = build_status_change_message(complaint, citizen_user, admin_remark)
+            if citizen_profile and citizen_profile.phone_number:
+                send_sms_notification(citizen_profile.phone_number, sms_text)
+        else:
+            subject, body = build_new_remark_message(complaint, citizen_user, remark)
 
-        print(f"Successfully processed complaint {complaint_id}. Priority: {complaint.ai_suggested_priority}")
+        if citizen_user.email:
+            emails.append((subject, body, [citizen_user.email]))
 
-    except Exception as e:
-        print(f"Error processing complaint {complaint_id}: {e}")
-        # Retry the task if it's a transient error
-        raise self.retry(exc=e)
\ No newline at end of file
+    sent = send_bulk_email_notifications(emails)
+    logger.info(f"Bulk update notifications: {sent} emails for {len(changed)} status changes, "
+                f"{len(remarked_ids)} remarks.")
+
+
+@shared_task(soft_time_limit=240, time_limit=300)
+def send_admin_digests():
+    """
+    Periodic (Celery beat) new-complaint digests for admins whose hourly/daily period has elapsed.
+    """
+    sent = send_digests()
+    if sent:
+        logger.info(f"Sent {sent} admin digests.")
+
+
+@shared_task(soft_time_limit=540, time_limit=600)
+def update_analytics_rollups():
+    """
+    Periodic (Celery beat) incremental refresh of DailyComplaintRollup.
+    """
+    days, rows = update_rollups()
+    logger.info(f"Analytics rollups refreshed for {days} days ({rows} rows).")
+
+
+@shared_task(soft_time_limit=50, time_limit=60)
+def escalate_overdue_complaints():
+    """
+    Periodic (Celery beat) SLA check: escalates newly breached complaints
+    in bounded batches using the partial due_at index.
+    """
+    count = escalate_overdue(
+        batch_size=getattr(settings, 'SLA_BATCH_SIZE', 500),
+        max_batches=getattr(settings, 'SLA_MAX_BATCHES', 20),
+    )
+    if count:
+        logger.info(f"SLA: escalated {count} overdue complaints.")
+
+
+@shared_task(soft_time_limit=3300, time_limit=3600)
+def archive_old_complaints():
+    """
+    Periodic (Celery beat) move of old RESOLVED/REJECTED complaints to the archive tables.
+    """
+    moved = archive.archive_old_complaints()
+    logger.info(f"Archived {moved} complaints.")
+
+
+@shared_task(soft_time_limit=540, time_limit=600)
+def purge_sync_tombstones():
+    """
+    Periodic (Celery beat) cleanup of delta-sync tombstones older than SYNC_TOMBSTONE_DAYS.
+    """
+    deleted = purge_tombstones()
+    logger.info(f"Purged {deleted} sync tombstones.")
+
+
+@shared_task(soft_time_limit=50, time_limit=60)
+def dispatch_webhooks():
+    """
+    Periodic (Celery beat) fan-out of new complaint events to webhook endpoints,
+    then one deliver_webhook_batches job per free concurrency slot.
+    """
+    queued = webhooks.dispatch()
+    for endpoint_id, slots in webhooks.free_slots().items():
+        for _ in range(slots):
+            deliver_webhook_batches.delay(endpoint_id)
+    if queued:
+        logger.info(f"Webhooks: queued {queued} deliveries.")
+
+
+@shared_task(soft_time_limit=240, time_limit=300)
+def deliver_webhook_batches(endpoint_id):
+    """
+    Sends due batches to one endpoint (bounded by its max_concurrency).
+    """
+    sent, failed = webhooks.deliver(endpoint_id, max_batches=getattr(settings, 'WEBHOOK_MAX_BATCHES_PER_TASK', 20))
+    if sent or failed:
+        logger.info(f"Webhooks: endpoint {endpoint_id} sent {sent} events, {failed} failed.")
+
+
+@shared_task(soft_time_limit=540, time_limit=600)
+def purge_webhook_deliveries():
+    """
+    Periodic (Celery beat) cleanup of delivered webhooks older than WEBHOOK_RETENTION_DAYS.
+    """
+    deleted = webhooks.purge_sent()
+    logger.info(f"Purged {deleted} delivered webhooks.")
+
+
+@shared_task(soft_time_limit=540, time_limit=600)
+def purge_request_profiles():
+    """
+    Periodic (Celery beat) cleanup of stored profiles older than PROFILING_RETENTION_DAYS.
+    """
+    deleted = profiling.purge()
+    logger.info(f"Purged {deleted} request profiles.")
+
+
+@shared_task(soft_time_limit=1740, time_limit=1800)
+def generate_ministry_report(report_id):
+    """
+    Builds (or, when its data is unchanged, just re-verifies) one MinistryReport.
+    """
+    report = reports.build(report_id)
+    if report is not None:
+        logger.info(f"Report {report}: {report.build_ms:.0f}ms.")
+
+
+@shared_task(soft_time_limit=240, time_limit=300)
+def request_monthly_reports():
+    """
+    Periodic (Celery beat) request of last month's report for every ministry.
+    """
+    queued = reports.request_monthly()
+    logger.info(f"Queued {queued} ministry reports.")
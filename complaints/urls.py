@@ -8,10 +8,14 @@ router.register(r'complaints', views.ComplaintViewSet, basename='complaint')
 router.register(r'ministries', views.MinistryViewSet, basename='ministry')
 router.register(r'departments', views.DepartmentViewSet, basename='department')
 router.register(r'complaint-updates', views.ComplaintUpdateViewSet, basename='complaintupdate')
+router.register(r'reports', views.MinistryReportViewSet, basename='ministry-report')
 
 # The API URLs are now determined automatically by the router.
 # Additionally, we include the login URLs for the browsable API.
 urlpatterns = [
+    # Bulk intake of offline complaints (before the router so it isn't read as a complaint id)
+    path('complaints/intake/', views.ComplaintIntakeView.as_view(), name='complaint-intake'),
+
     # All URLs from the router (e.g., /api/complaints/, /api/ministries/)
     path('', include(router.urls)),
 
@@ -23,4 +27,13 @@ urlpatterns = [
 
     # Bulk Admin Creation URL
     path('bulk-admin-create/', views.BulkAdminCreateView.as_view(), name='bulk-admin-create'),
+
+    # Department suggestions for the submission form
+    path('routing/suggest/', views.RoutingSuggestView.as_view(), name='routing-suggest'),
+
+    # Ministry trend analytics (reads rollups only)
+    path('analytics/', views.AnalyticsView.as_view(), name='analytics'),
+
+    # Delta sync for dashboards and mobile clients
+    path('sync/', views.SyncView.as_view(), name='sync'),
 ]
\ No newline at end of file
@@ -1,7 +1,9 @@
 import logging
-from django.core.mail import send_mail
+from django.core.mail import send_mail, get_connection, EmailMessage
 from django.conf import settings
 
+from . import short_codes
+
 logger = logging.getLogger(__name__)
 
 
@@ -51,4 +53,106 @@ def send_email_notification(subject, message, recipient_list):
         print(f"\n[EMAIL SENT] To: {recipient_list} | Subject: {subject}\n")
         logger.info(f"Email sent to {recipient_list}: {subject}")
     except Exception as e:
-        logger.error(f"Failed to send email to {recipient_list}: {str(e)}")
\ No newline at end of file
+        logger.error(f"Failed to send email to {recipient_list}: {str(e)}")
+
+
+# --- Message Builders (shared by signals and batched tasks) ---
+
+def build_status_change_message(complaint, citizen_user, admin_remark):
+    """
+    Returns (email_subject, email_body, sms_text) for a status change.
+    """
+    status_display = complaint.get_status_display()
+
+    email_subject = f"Update on your Grievance (ID: {short_codes.reference(complaint)})"
+
+    message_body = f"""
+Dear {citizen_user.first_name},
+
+The status of your grievance regarding "{complaint.title}" has been updated.
+
+New Status: {status_display}
+Admin Remarks: {admin_remark}
+
+You can login to the portal for more details.
+
+Thank you,
+Gunaso Portal Team
+Government of Nepal
+        """
+
+    sms_text = f"Gunaso Portal: Your grievance {short_codes.reference(complaint)} is now {status_display}. Remark: {admin_remark}"
+    return email_subject, message_body, sms_text
+
+
+def build_new_remark_message(complaint, citizen_user, remark_text):
+    """
+    Returns (email_subject, email_body) for a new official remark.
+    """
+    email_subject = f"New Message on your Grievance (ID: {short_codes.reference(complaint)})"
+
+    message_body = f"""
+Dear {citizen_user.first_name},
+
+A new remark has been added to your grievance "{complaint.title}".
+
+Official Remark:
+{remark_text}
+
+Log in to the portal to view full history.
+
+Thank you,
+Gunaso Portal Team
+Ministry of Education,Science and Technology
+        """
+    return email_subject, message_body
+
+
+def send_bulk_email_notifications(messages):
+    """
+    Sends many (subject, body, recipient_list) emails over a single
+    SMTP connection instead of opening one per message.
+    """
+    emails = [
+        EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, recipients)
+        for subject, body, recipients in messages if recipients
+    ]
+    if not emails:
+        return 0
+
+    try:
+        connection = get_connection(fail_silently=False)
+        sent = connection.send_messages(emails)
+        logger.info(f"Sent {sent} batched emails")
+        return sent
+    except Exception as e:
+        logger.error(f"Failed to send {len(emails)} batched emails: {str(e)}")
+        return 0
+
+
+def send_email_notifications_each(messages):
+    """
+    Sends (subject, body, recipient_list) emails one by one over a single
+    SMTP connection and returns the indexes of the messages that went out,
+    so callers can retry only the ones that failed.
+    """
+    sent = []
+    try:
+        connection = get_connection(fail_silently=False)
+        connection.open()
+    except Exception as e:
+        logger.error(f"Failed to open a mail connection for {len(messages)} emails: {str(e)}")
+        return sent
+    try:
+        for i, (subject, body, recipients) in enumerate(messages):
+            if not recipients:
+                continue
+            try:
+                if connection.send_messages([EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, recipients)]):
+                    sent.append(i)
+            except Exception as e:
+                logger.error(f"Failed to send email to {recipients}: {str(e)}")
+    finally:
+        connection.close()
+    logger.info(f"Sent {len(sent)} of {len(messages)} emails")
+    return sent
@@ -2,22 +2,67 @@ from django.contrib.auth.models import User
 from rest_framework import viewsets, permissions, generics, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
 from rest_framework.views import APIView
+from django.conf import settings
 from django.db import transaction
-import openpyxl
-
-from .models import Ministry, Department, Complaint, ComplaintUpdate, UserProfile
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from collections import defaultdict
+from datetime import timedelta
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden
+from django.shortcuts import get_object_or_404
+
+from .models import (
+    Ministry, Department, Complaint, ComplaintUpdate, UserProfile,
+    DailyComplaintRollup, ArchivedComplaint, MinistryReport,
+)
 from .serializers import (
     MinistrySerializer,
     DepartmentSerializer,
     ComplaintSerializer,
+    CompactComplaintSerializer,
     ComplaintUpdateSerializer,
     RegisterSerializer,
     UserProfileSerializer,
-    BulkAdminUploadSerializer
+    BulkAdminUploadSerializer,
+    ComplaintBulkUpdateSerializer,
+    RoutingSuggestSerializer,
+    ArchivedComplaintSerializer,
+    SyncComplaintSerializer,
+    SyncComplaintUpdateSerializer,
+    MinistryReportSerializer,
+    MinistryReportRequestSerializer,
+    build_included,
 )
-from .permissions import IsOwnerOrAdmin, IsMinistryAdmin, IsCitizen
+from .permissions import IsOwnerOrAdmin, IsMinistryAdmin, IsCitizen, IsReportMinistryAdmin
+from . import analytics, events, intake, outbox, db_router, reports, short_codes, sync
+from .instrumentation import collect_snapshots, render_prometheus
+from .routing import route_complaint, suggest_departments
+from .sla import sla_hours
+
+
+# --- Read Replica Support ---
+
+class ReplicaReadMixin:
+    """
+    Serves safe (GET/HEAD/OPTIONS) requests from a read replica, unless the user
+    wrote something in the last REPLICA_STICKY_SECONDS (see
+    complaints.middleware.ReplicaStickyMiddleware).
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        user_id = request.user.pk if request.user.is_authenticated else None
+        if request.method in permissions.SAFE_METHODS and not (user_id and db_router.is_sticky(user_id)):
+            self._replica_token = db_router.pin_replica()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            db_router.unpin_replica(token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
 
 
 # --- Auth Views ---
@@ -28,13 +73,14 @@ class RegisterView(generics.CreateAPIView):
     serializer_class = RegisterSerializer
 
 
-class UserProfileView(generics.RetrieveUpdateAPIView):
+class UserProfileView(ReplicaReadMixin, generics.RetrieveUpdateAPIView):
     queryset = UserProfile.objects.all()
     serializer_class = UserProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
-        return self.request.user.profile
+        # request.user is a cached snapshot; edits must start from the stored row
+        return get_object_or_404(self.get_queryset().select_related('user'), user_id=self.request.user.pk)
 
 
 class BulkAdminCreateView(APIView):
@@ -45,6 +91,8 @@ class BulkAdminCreateView(APIView):
         serializer = BulkAdminUploadSerializer(data=request.data)
         if serializer.is_valid():
             file = request.FILES['file']
+            import openpyxl  # Only admin uploads need it; keeps web worker startup lean
+
             try:
                 workbook = openpyxl.load_workbook(file)
                 sheet = workbook.active
@@ -90,15 +138,72 @@ class BulkAdminCreateView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class ComplaintIntakeView(APIView):
+    """
+    POST /api/complaints/intake/: back-office entry of complaints collected
+    offline (hotline, paper forms). Takes a CSV/XLSX/JSON `file` upload or a
+    JSON body ({"complaints": [...]}) with title, description, ministries,
+    departments and optionally the citizen's username or phone per row.
+    Options (query string or form fields): channel, format, dry_run, skip_invalid.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsMinistryAdmin]
+    parser_classes = (JSONParser, MultiPartParser, FormParser)
+
+    def option(self, request, name, default=None):
+        value = request.query_params.get(name)
+        if value is None and 'file' in request.FILES:
+            value = request.data.get(name)
+        return default if value is None else value
+
+    def post(self, request, *args, **kwargs):
+        flag = lambda name: str(self.option(request, name, '')).lower() in ('1', 'true', 'yes')
+        try:
+            if 'file' in request.FILES:
+                rows = intake.read_rows(request.FILES['file'], fmt=self.option(request, 'format'))
+            else:
+                rows = intake.records_rows(request.data)
+            result = intake.import_rows(
+                rows, request.user, channel=self.option(request, 'channel', 'other'),
+                dry_run=flag('dry_run'), skip_invalid=flag('skip_invalid'),
+            )
+        except intake.IntakeError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if result['created']:
+            code = status.HTTP_201_CREATED
+        elif result['errors'] and not flag('dry_run'):
+            code = status.HTTP_400_BAD_REQUEST
+        else:
+            code = status.HTTP_200_OK
+        return Response(result, status=code)
+
+
+# --- Instrumentation ---
+
+def metrics_view(request):
+    """
+    Prometheus text endpoint. Requires `Authorization: Bearer <METRICS_TOKEN>`
+    when METRICS_TOKEN is set; otherwise only available with DEBUG on.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token:
+        if request.headers.get('Authorization') != f'Bearer {token}':
+            return HttpResponseForbidden()
+    elif not settings.DEBUG:
+        return HttpResponseForbidden()
+    return HttpResponse(render_prometheus(collect_snapshots()),
+                        content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 # --- Model ViewSets ---
 
-class MinistryViewSet(viewsets.ReadOnlyModelViewSet):
+class MinistryViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Ministry.objects.all().order_by('name')
     serializer_class = MinistrySerializer
     permission_classes = [permissions.AllowAny]
 
 
-class DepartmentViewSet(viewsets.ReadOnlyModelViewSet):
+class DepartmentViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = DepartmentSerializer
     permission_classes = [permissions.AllowAny]
 
@@ -119,35 +224,189 @@ class DepartmentViewSet(viewsets.ReadOnlyModelViewSet):
         return queryset
 
 
-class ComplaintViewSet(viewsets.ModelViewSet):
+def scope_complaints(queryset, user):
+    """
+    Restricts a Complaint (or ArchivedComplaint) queryset to what `user` may see.
+    """
+    # Super Admin
+    if user.is_superuser or (hasattr(user, 'profile') and user.profile.role == 'SUPER'):
+        return queryset.order_by('-created_at')
+
+    # Ministry Admin
+    if hasattr(user, 'profile') and user.profile.role == 'ADMIN':
+        try:
+            profile = user.profile
+            # UPDATED: Check if the admin's department/ministry is in the complaint's list
+            if profile.department:
+                return queryset.filter(departments=profile.department).order_by('-created_at').distinct()
+            elif profile.ministry:
+                return queryset.filter(ministries=profile.ministry).order_by('-created_at').distinct()
+        except UserProfile.DoesNotExist:
+            return queryset.none()
+
+    # Citizen (Default)
+    return queryset.filter(created_by=user).order_by('-created_at')
+
+
+class ComplaintViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = Complaint.objects.all()
     serializer_class = ComplaintSerializer
     permission_classes = [permissions.IsAuthenticated, (IsOwnerOrAdmin | IsMinistryAdmin)]
     lookup_field = 'tracking_id'
 
     def get_queryset(self):
-        user = self.request.user
-        # Super Admin
-        if user.is_superuser or (hasattr(user, 'profile') and user.profile.role == 'SUPER'):
-            return Complaint.objects.all().order_by('-created_at')
+        queryset = scope_complaints(Complaint.objects.all(), self.request.user)
+        if self.action in ('list', 'export'):
+            queryset = queryset.select_related('created_by').prefetch_related(
+                'ministries', 'departments', 'updates__user'
+            )
+        return queryset
 
-        # Ministry Admin
-        if hasattr(user, 'profile') and user.profile.role == 'ADMIN':
-            try:
-                profile = user.profile
-                # UPDATED: Check if the admin's department/ministry is in the complaint's list
-                if profile.department:
-                    return Complaint.objects.filter(departments=profile.department).order_by('-created_at').distinct()
-                elif profile.ministry:
-                    return Complaint.objects.filter(ministries=profile.ministry).order_by('-created_at').distinct()
-            except UserProfile.DoesNotExist:
-                return Complaint.objects.none()
-
-        # Citizen (Default)
-        return Complaint.objects.filter(created_by=user).order_by('-created_at')
+    def is_compact(self):
+        """
+        ?compact=1 returns IDs for ministries/departments/created_by plus one
+        side-loaded `included` map instead of repeating the objects per row.
+        """
+        return self.request.query_params.get('compact', '').lower() in ('1', 'true', 'yes')
+
+    def get_serializer_class(self):
+        if self.action == 'export' or (self.action == 'list' and self.is_compact()):
+            return CompactComplaintSerializer
+        return super().get_serializer_class()
+
+    def get_object(self):
+        """
+        Accepts the full tracking ID or the short code (both unique-index lookups).
+        """
+        lookup = short_codes.lookup(self.kwargs[self.lookup_field])
+        if lookup is None:
+            raise Http404
+        obj = get_object_or_404(self.filter_queryset(self.get_queryset()), **lookup)
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    def get_archived(self, reference):
+        """
+        The archived complaint in scope for a tracking ID or short code, or None.
+        """
+        lookup = short_codes.lookup(reference)
+        if lookup is None:
+            return None
+        return scope_complaints(ArchivedComplaint.objects.all(), self.request.user).prefetch_related(
+            'ministries', 'departments', 'updates__user'
+        ).select_related('created_by').filter(**lookup).first()
+
+    def list(self, request, *args, **kwargs):
+        if not self.is_compact():
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        complaints = list(page if page is not None else queryset)
+        data = self.get_serializer(complaints, many=True).data
+        if page is not None:
+            response = self.get_paginated_response(data)
+        else:
+            response = Response({'results': data})
+        response.data['included'] = build_included(complaints)
+        return response
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        All complaints in scope (up to COMPLAINT_EXPORT_MAX_ROWS) in the compact format.
+        """
+        limit = getattr(settings, 'COMPLAINT_EXPORT_MAX_ROWS', 5000)
+        complaints = list(self.filter_queryset(self.get_queryset())[:limit + 1])
+        truncated = len(complaints) > limit
+        complaints = complaints[:limit]
+        return Response({
+            'count': len(complaints),
+            'truncated': truncated,
+            'results': self.get_serializer(complaints, many=True).data,
+            'included': build_included(complaints),
+        })
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            # Transparent fallback to cold storage for archived complaints
+            archived = self.get_archived(kwargs.get(self.lookup_field))
+            if archived is None:
+                raise
+            return Response(ArchivedComplaintSerializer(archived, context=self.get_serializer_context()).data)
+
+    @action(detail=True, methods=['get'])
+    def timeline(self, request, tracking_id=None):
+        """
+        The complaint's event log, oldest first. Pass ?after=<next> for the
+        following page. Archived complaints keep their timeline.
+        """
+        try:
+            complaint_id = self.get_object().pk
+        except Http404:
+            archived = self.get_archived(tracking_id)
+            if archived is None:
+                raise
+            complaint_id = archived.pk
+
+        max_limit = getattr(settings, 'EVENT_TIMELINE_PAGE_SIZE', 100)
+        try:
+            after = max(int(request.query_params.get('after', 0)), 0)
+            limit = min(max(int(request.query_params.get('limit', max_limit)), 1), max_limit)
+        except ValueError:
+            return Response({"error": "'after' and 'limit' must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+
+        page, next_after = events.timeline(complaint_id, after=after, limit=limit)
+        return Response({
+            'next': next_after,
+            'results': [
+                {'seq': e.id, 'kind': e.kind, 'at': e.created_at, 'actor': e.actor_id, 'data': e.data}
+                for e in page
+            ],
+        })
+
+    @action(detail=False, methods=['get'], url_path=r'track/(?P<code>[0-9A-Za-z-]+)')
+    def track(self, request, code=None):
+        """
+        Phone-desk lookup by what the citizen quotes: the short code or full
+        tracking ID (index hits) or, for references sent before short codes
+        existed, a tracking ID prefix of 8+ hex digits (an index range scan,
+        tried only when nothing matches exactly). Live complaints first, then the archive.
+        """
+        lookup = short_codes.lookup(code)
+        prefix = short_codes.uuid_prefix_range(code) if len(code.replace('-', '')) >= 8 else None
+        if lookup is None and prefix is None:
+            return Response({"error": "Not a tracking code."}, status=status.HTTP_400_BAD_REQUEST)
+
+        limit = getattr(settings, 'TRACK_MAX_MATCHES', 10)
+        context = self.get_serializer_context()
+        for match in (lookup, prefix and {'tracking_id__range': prefix}):
+            if not match:
+                continue
+            live = self.get_queryset().filter(**match).select_related('created_by').prefetch_related(
+                'ministries', 'departments', 'updates__user')
+            results = ComplaintSerializer(live[:limit], many=True, context=context).data
+            if len(results) < limit:
+                archived = scope_complaints(ArchivedComplaint.objects.all(), request.user).filter(
+                    **match).select_related('created_by').prefetch_related('ministries', 'departments', 'updates__user')
+                results += ArchivedComplaintSerializer(archived[:limit - len(results)], many=True, context=context).data
+            if results:
+                return Response({'count': len(results), 'results': results})
+        raise Http404
 
     def perform_create(self, serializer):
-        serializer.save(created_by=self.request.user)
+        # Complaint, M2M links, routing and outbox events commit together
+        with transaction.atomic(), events.acting_as(self.request.user):
+            complaint = serializer.save(created_by=self.request.user)
+            # Inline routing: suggests (and, if none were chosen, assigns) departments
+            route_complaint(complaint)
+
+    def perform_update(self, serializer):
+        # Keeps the change-sequence lock until commit (see complaints.sync)
+        with transaction.atomic(), events.acting_as(self.request.user):
+            serializer.save()
 
     @action(detail=False, methods=['get'])
     def stats(self, request):
@@ -161,8 +420,82 @@ class ComplaintViewSet(viewsets.ModelViewSet):
             'rejected': queryset.filter(status='REJECTED').count()
         })
 
+    @action(detail=False, methods=['post'], url_path='bulk-update',
+            permission_classes=[permissions.IsAuthenticated, IsMinistryAdmin])
+    def bulk_update(self, request):
+        """
+        Changes the status of many complaints (and optionally adds a remark)
+        in a single request: one jurisdiction query, one UPDATE, one
+        bulk_create and one batched notification job.
+        """
+        serializer = ComplaintBulkUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        requested = set(serializer.validated_data['tracking_ids'])
+        new_status = serializer.validated_data['status']
+        remark = serializer.validated_data.get('remark', '').strip()
+
+        # Jurisdiction check: only complaints visible to this admin can be touched
+        current = dict(
+            self.get_queryset().filter(tracking_id__in=requested)
+            .order_by().values_list('tracking_id', 'status').distinct()
+        )
+        forbidden = requested - set(current)
+        if forbidden:
+            return Response(
+                {"error": "Some complaints do not exist or are outside your jurisdiction.",
+                 "tracking_ids": sorted(str(t) for t in forbidden)},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        changed = [tid for tid, old in current.items() if old != new_status]
+        # Status-change emails already carry the remark; the rest get a remark-only email
+        remarked = [tid for tid, old in current.items() if old == new_status] if remark else []
+
+        with transaction.atomic():
+            # Queryset.update() skips pre_save/post_save, so notifications are batched below
+            now = timezone.now()
+            seq = sync.next_seq()  # One change-sequence number for the whole batch
+            fields = {'status': new_status, 'updated_at': now, 'resolved_at': None, 'change_seq': seq}
+            if new_status in Complaint.CLOSED_STATUSES:
+                # Closed complaints leave the SLA scan
+                fields.update(resolved_at=now, due_at=None)
+            Complaint.objects.filter(tracking_id__in=changed).update(**fields)
+            reopened = [] if new_status in Complaint.CLOSED_STATUSES else [
+                tid for tid in changed if current[tid] in Complaint.CLOSED_STATUSES
+            ]
+            if reopened:
+                # Reopened complaints get a fresh deadline (per priority) and rejoin the SLA scan
+                by_priority = defaultdict(list)
+                for tid, priority in Complaint.objects.filter(tracking_id__in=reopened).values_list(
+                        'tracking_id', 'ai_suggested_priority'):
+                    by_priority[priority].append(tid)
+                for priority, tids in by_priority.items():
+                    Complaint.objects.filter(tracking_id__in=tids).update(
+                        reopened_at=now, escalated_at=None, due_at=now + timedelta(hours=sla_hours(priority)))
+            events.record_many('status', [(tid, {'from': current[tid], 'to': new_status}) for tid in changed],
+                               actor_id=request.user.pk, at=now)
+            if remark:
+                updates = ComplaintUpdate.objects.bulk_create(
+                    [ComplaintUpdate(complaint_id=tid, user=request.user, update_text=remark, change_seq=seq)
+                     for tid in current],
+                    batch_size=1000
+                )
+                events.record_many('remark', [(u.complaint_id, {'update': u.pk}) for u in updates],
+                                   actor_id=request.user.pk, at=now)
+            outbox.enqueue(
+                'complaint.bulk_updated', 'complaints.tasks.send_bulk_update_notifications',
+                args=[[str(t) for t in changed], [str(t) for t in remarked], remark or None],
+            )
+
+        return Response({
+            "message": f"Updated {len(changed)} complaints to {new_status}.",
+            "updated": len(changed),
+            "unchanged": len(current) - len(changed),
+            "remarks_added": len(current) if remark else 0,
+        }, status=status.HTTP_200_OK)
+
 
-class ComplaintUpdateViewSet(viewsets.ModelViewSet):
+class ComplaintUpdateViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = ComplaintUpdate.objects.all().order_by('-created_at')
     serializer_class = ComplaintUpdateSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -174,4 +507,179 @@ class ComplaintUpdateViewSet(viewsets.ModelViewSet):
         return ComplaintUpdate.objects.none()
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
\ No newline at end of file
+        with transaction.atomic():
+            serializer.save(user=self.request.user)
+
+    def perform_update(self, serializer):
+        # Keeps the change-sequence lock until commit (see complaints.sync)
+        with transaction.atomic():
+            serializer.save()
+
+    def perform_destroy(self, instance):
+        # The tombstone's sequence number commits with the delete
+        with transaction.atomic():
+            instance.delete()
+
+
+# --- Delta Sync ---
+
+class SyncView(APIView):
+    """
+    GET /api/sync/?since=<token>: complaints and updates changed since the
+    token (in the caller's scope), plus tombstones for deleted/archived ones.
+    Omit `since` for a full sync; follow `token` while `has_more` is true.
+    Reads always hit the primary so the token and rows come from one snapshot.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        try:
+            since = sync.decode_token(request.query_params.get('since'))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        max_limit = getattr(settings, 'SYNC_MAX_PAGE_SIZE', 500)
+        try:
+            limit = min(max(int(request.query_params.get('limit', max_limit)), 1), max_limit)
+        except ValueError:
+            limit = max_limit
+
+        feed = sync.changes(scope_complaints(Complaint.objects.all(), request.user), request.user, since, limit)
+        context = {'request': request}
+        data = {
+            'token': sync.encode_token(feed['cutoff']),
+            'has_more': feed['cutoff'] < feed['head'],
+        }
+        if feed['reset']:
+            # Token older than the tombstone retention window: drop local data first
+            data['reset'] = True
+        if feed['complaints']:
+            data['complaints'] = SyncComplaintSerializer(feed['complaints'], many=True, context=context).data
+            data['included'] = build_included(feed['complaints'])
+        if feed['updates']:
+            data['updates'] = SyncComplaintUpdateSerializer(feed['updates'], many=True).data
+        if feed['tombstones']:
+            data['deleted'] = [
+                {'kind': t.kind, 'id': t.object_id, 'complaint': t.complaint_id, 'reason': t.reason}
+                for t in feed['tombstones']
+            ]
+        return Response(data)
+
+
+# --- Routing ---
+
+class RoutingSuggestView(APIView):
+    """
+    Suggests departments for a draft complaint so the submission form can pre-fill them.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = RoutingSuggestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        suggestions = suggest_departments(
+            data['title'], data.get('description', ''),
+            ministry_ids=data.get('ministry_ids') or None,
+        )
+        return Response({'suggestions': suggestions})
+
+
+# --- Analytics ---
+
+class AnalyticsView(ReplicaReadMixin, APIView):
+    """
+    Trend analytics for ministries, served only from DailyComplaintRollup.
+    Query params: from, to (YYYY-MM-DD, default last 30 days), ministry, department.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsMinistryAdmin]
+
+    def get(self, request):
+        today = timezone.localdate()
+        date_to = parse_date(request.query_params.get('to', '')) or today
+        date_from = parse_date(request.query_params.get('from', '')) or date_to - timedelta(days=29)
+        if date_from > date_to:
+            return Response({"error": "'from' must be before 'to'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        rollups = DailyComplaintRollup.objects.filter(day__range=(date_from, date_to))
+        ministry_id = request.query_params.get('ministry')
+        department_id = request.query_params.get('department')
+
+        profile = request.user.profile
+        if profile.role != 'SUPER' and not request.user.is_superuser:
+            # Admins are pinned to their own jurisdiction
+            ministry_id = profile.ministry_id
+            department_id = profile.department_id or department_id
+            if department_id and not Department.objects.filter(pk=department_id, ministry_id=ministry_id).exists():
+                return Response({"error": "Department is outside your jurisdiction."},
+                                status=status.HTTP_403_FORBIDDEN)
+
+        if department_id:
+            rollups = rollups.filter(department_id=department_id)
+        else:
+            rollups = rollups.filter(department__isnull=True)
+            if ministry_id:
+                rollups = rollups.filter(ministry_id=ministry_id)
+
+        data = analytics.summarize(rollups, today=today)
+        data.update({'from': date_from, 'to': date_to, 'ministry': ministry_id, 'department': department_id})
+        return Response(data)
+
+
+# --- Reports ---
+
+class MinistryReportViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Monthly ministry reports (complaints.reports). POST {"period": "YYYY-MM",
+    "format": "xlsx"|"pdf", "ministry": id (super admins)} requests one: 200 if
+    it is ready, 202 while a worker builds it. Poll the report, then GET .../download/.
+    """
+    serializer_class = MinistryReportSerializer
+    permission_classes = [permissions.IsAuthenticated, IsReportMinistryAdmin]
+
+    def get_queryset(self):
+        queryset = MinistryReport.objects.select_related('ministry').order_by('-period', 'ministry__name', 'format')
+        user = self.request.user
+        if not (user.is_superuser or user.profile.role == 'SUPER'):
+            queryset = queryset.filter(ministry_id=user.profile.ministry_id)
+        return queryset
+
+    def create(self, request, *args, **kwargs):
+        serializer = MinistryReportRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ministry = serializer.validated_data.get('ministry')
+
+        profile = request.user.profile
+        if request.user.is_superuser or profile.role == 'SUPER':
+            if ministry is None:
+                return Response({"ministry": ["This field is required."]}, status=status.HTTP_400_BAD_REQUEST)
+            ministry_id = ministry.pk
+        else:
+            # Admins are pinned to their own ministry
+            ministry_id = profile.ministry_id
+            if ministry is not None and ministry.pk != ministry_id:
+                return Response({"error": "Ministry is outside your jurisdiction."}, status=status.HTTP_403_FORBIDDEN)
+
+        report, _ = reports.request(ministry_id, serializer.validated_data['period'],
+                                    serializer.validated_data['format'], user=request.user)
+        data = self.get_serializer(report).data
+        return Response(data, status=status.HTTP_200_OK if report.status == 'READY' else status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """
+        The latest built file (served even while a refresh is queued). The
+        fingerprint is the ETag, so an unchanged report costs a 304.
+        """
+        report = self.get_object()
+        if not report.file:
+            return Response({"error": "The report has not been generated yet.", "status": report.status},
+                            status=status.HTTP_409_CONFLICT)
+        etag = f'"{report.fingerprint}"'
+        if request.headers.get('If-None-Match') == etag:
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = FileResponse(report.file.open('rb'), as_attachment=True, filename=reports.filename(report),
+                                    content_type=reports.CONTENT_TYPES[report.format])
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
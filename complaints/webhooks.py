@@ -0,0 +1,303 @@
+import hashlib
+import hmac
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import (
+    ArchivedComplaint, ChangeSequence, Complaint, ComplaintEvent, WebhookDelivery, WebhookDispatchGap,
+    WebhookEndpoint,
+)
+
+logger = logging.getLogger(__name__)
+
+CURSOR = 'webhooks.cursor'
+SIGNATURE_HEADER = 'X-Gunaso-Signature'
+BATCH_HEADER = 'X-Gunaso-Batch'
+
+# Due = pending, or leased to a worker whose lease (available_at) has expired
+DUE = Q(status='PENDING') | Q(status='DELIVERING')
+
+
+# --- Signing ---
+
+def sign(secret, body, timestamp=None):
+    """
+    Signature header for a request body: "t=<unix time>,v1=<hex HMAC-SHA256 of 't.body'>".
+    The timestamp is signed too, so a captured request can't be replayed later.
+    """
+    timestamp = int(timestamp or time.time())
+    digest = hmac.new(secret.encode(), f'{timestamp}.'.encode() + body, hashlib.sha256).hexdigest()
+    return f't={timestamp},v1={digest}'
+
+
+def verify_signature(secret, body, header, tolerance=300):
+    """
+    Receiver-side check of a signature header (see sign()).
+    """
+    try:
+        parts = dict(item.split('=', 1) for item in (header or '').split(','))
+        timestamp = int(parts['t'])
+    except (KeyError, ValueError):
+        return False
+    if abs(time.time() - timestamp) > tolerance:
+        return False
+    expected = sign(secret, body, timestamp).split('v1=', 1)[1]
+    return hmac.compare_digest(expected, parts.get('v1', ''))
+
+
+# --- Fan-out ---
+
+def _payload(seq, complaint_id, kind, actor_id, data, at):
+    return {'id': seq, 'kind': kind, 'complaint': str(complaint_id), 'at': at.isoformat(),
+            'actor': actor_id, 'data': data}
+
+
+def dispatch(batch_size=2000):
+    """
+    Turns new event-log rows into one delivery per subscribed endpoint (by the
+    complaint's ministries and the endpoint's event kinds). The cursor row is
+    locked for the whole transaction, so each event is queued once. Ids are
+    allocated before commit, so a slower transaction may still commit a lower
+    id than the cursor: ids skipped below it are kept as gaps and dispatched
+    once they commit.
+    Returns the number of deliveries queued.
+    """
+    fields = ('id', 'complaint_id', 'kind', 'actor_id', 'data', 'created_at')
+    with transaction.atomic():
+        cursor = ChangeSequence.objects.select_for_update().filter(name=CURSOR).first()
+        if cursor is None:
+            # First run: subscriptions start now, history is not replayed to endpoints
+            head = ComplaintEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+            ChangeSequence.objects.create(name=CURSOR, value=head)
+            return 0
+
+        gaps = WebhookDispatchGap.objects.all()
+        filled = list(
+            ComplaintEvent.objects.filter(id__in=gaps.values('event_id')).order_by('id').values_list(*fields)
+        )
+        if filled:
+            gaps.filter(event_id__in=[row[0] for row in filled]).delete()
+        # Never filled: the inserting transaction rolled back
+        expired = timezone.now() - timedelta(seconds=getattr(settings, 'WEBHOOK_GAP_SECONDS', 900))
+        gaps.filter(created_at__lt=expired).delete()
+
+        new = list(ComplaintEvent.objects.filter(id__gt=cursor.value).order_by('id').values_list(*fields)[:batch_size])
+        if new:
+            seen = {row[0] for row in new}
+            WebhookDispatchGap.objects.bulk_create([
+                WebhookDispatchGap(event_id=event_id) for event_id in range(cursor.value + 1, new[-1][0])
+                if event_id not in seen
+            ], batch_size=1000, ignore_conflicts=True)
+            cursor.value = new[-1][0]
+            cursor.save(update_fields=['value'])
+        rows = filled + new
+        if not rows:
+            return 0
+
+        endpoints = defaultdict(list)
+        for endpoint_id, ministry_id, kinds in WebhookEndpoint.objects.filter(is_active=True).values_list(
+                'id', 'ministry_id', 'event_kinds'):
+            endpoints[ministry_id].append((endpoint_id, set(kinds or ())))
+
+        deliveries = []
+        if endpoints:
+            complaint_ids = {row[1] for row in rows}
+            ministries = defaultdict(set)
+            for model, field in ((Complaint, 'complaint_id'), (ArchivedComplaint, 'archivedcomplaint_id')):
+                links = model.ministries.through.objects.filter(**{f'{field}__in': complaint_ids})
+                for complaint_id, ministry_id in links.values_list(field, 'ministry_id'):
+                    ministries[complaint_id].add(ministry_id)
+
+            for row in rows:
+                payload = None
+                for ministry_id in ministries.get(row[1], ()):
+                    for endpoint_id, kinds in endpoints.get(ministry_id, ()):
+                        if kinds and row[2] not in kinds:
+                            continue
+                        payload = payload or _payload(*row)
+                        deliveries.append(WebhookDelivery(endpoint_id=endpoint_id, event_id=row[0], payload=payload))
+            WebhookDelivery.objects.bulk_create(deliveries, batch_size=1000, ignore_conflicts=True)
+    return len(deliveries)
+
+
+# --- Delivery ---
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def _session(endpoint):
+    """
+    One keep-alive requests.Session per endpoint and process, with a
+    connection pool sized to the endpoint's concurrency limit.
+    """
+    with _sessions_lock:
+        session = _sessions.get(endpoint.pk)
+        if session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, endpoint.max_concurrency))
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers['User-Agent'] = 'GunasoPortal-Webhooks/1'
+            _sessions[endpoint.pk] = session
+    return session
+
+
+def _backoff(attempts):
+    """
+    Exponential backoff with jitter, so a recovering endpoint isn't hit by
+    every failed batch at the same moment.
+    """
+    base = getattr(settings, 'WEBHOOK_RETRY_BASE_SECONDS', 10)
+    cap = getattr(settings, 'WEBHOOK_RETRY_MAX_SECONDS', 3600)
+    delay = min(cap, base * (2 ** (attempts - 1)))
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+def in_flight(endpoint_id, now=None):
+    now = now or timezone.now()
+    return (WebhookDelivery.objects.filter(endpoint_id=endpoint_id, status='DELIVERING', available_at__gt=now)
+            .values('batch_id').distinct().count())
+
+
+def claim(endpoint_id):
+    """
+    Leases the next batch of due deliveries for an endpoint, unless it already
+    has max_concurrency batches in flight. Locking the endpoint row serializes
+    claims for that endpoint only. Returns (endpoint, batch_id, deliveries) or None.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        endpoint = WebhookEndpoint.objects.select_for_update().filter(pk=endpoint_id, is_active=True).first()
+        if endpoint is None or in_flight(endpoint.pk, now) >= endpoint.max_concurrency:
+            return None
+        ids = list(
+            WebhookDelivery.objects.filter(DUE, endpoint=endpoint, available_at__lte=now)
+            .order_by('event_id').values_list('pk', flat=True)[:endpoint.batch_size]
+        )
+        if not ids:
+            return None
+        batch_id = uuid.uuid4()
+        lease = now + timedelta(seconds=getattr(settings, 'WEBHOOK_LEASE_SECONDS', 60))
+        WebhookDelivery.objects.filter(pk__in=ids).update(
+            status='DELIVERING', batch_id=batch_id, available_at=lease, attempts=F('attempts') + 1
+        )
+    return endpoint, batch_id, list(WebhookDelivery.objects.filter(pk__in=ids).order_by('event_id'))
+
+
+def send_batch(endpoint, batch_id, deliveries):
+    """
+    POSTs one signed batch and records the outcome. Returns True on a 2xx.
+    """
+    import requests
+
+    body = json.dumps({
+        'batch': str(batch_id),
+        'ministry': endpoint.ministry_id,
+        'events': [d.payload for d in deliveries],
+    }, separators=(',', ':')).encode()
+    headers = {
+        'Content-Type': 'application/json',
+        SIGNATURE_HEADER: sign(endpoint.secret, body),
+        BATCH_HEADER: str(batch_id),
+    }
+    try:
+        response = _session(endpoint).post(endpoint.url, data=body, headers=headers,
+                                           timeout=getattr(settings, 'WEBHOOK_TIMEOUT_SECONDS', 10))
+        status_code = response.status_code
+        error = '' if response.ok else f'HTTP {status_code}: {response.text[:500]}'
+    except requests.RequestException as e:
+        status_code, error = None, str(e)[:2000]
+
+    finish(endpoint, batch_id, deliveries, status_code, error)
+    return not error
+
+
+def finish(endpoint, batch_id, deliveries, status_code, error):
+    """
+    Marks a batch sent, or schedules a retry; rows out of attempts go to the
+    dead-letter queue (status DEAD). Only rows still leased to `batch_id` are touched.
+    """
+    now = timezone.now()
+    held = WebhookDelivery.objects.filter(pk__in=[d.pk for d in deliveries], batch_id=batch_id, status='DELIVERING')
+    with transaction.atomic():
+        if not error:
+            held.update(status='SENT', sent_at=now, response_status=status_code, last_error='', batch_id=None)
+            WebhookEndpoint.objects.filter(pk=endpoint.pk).update(last_success_at=now, last_error='')
+            return
+
+        max_attempts = getattr(settings, 'WEBHOOK_MAX_ATTEMPTS', 12)
+        dead = held.filter(attempts__gte=max_attempts).update(
+            status='DEAD', response_status=status_code, last_error=error, batch_id=None
+        )
+        for attempts in sorted({d.attempts for d in deliveries if d.attempts < max_attempts}):
+            held.filter(attempts=attempts).update(
+                status='PENDING', available_at=now + _backoff(attempts), response_status=status_code,
+                last_error=error, batch_id=None
+            )
+        WebhookEndpoint.objects.filter(pk=endpoint.pk).update(last_error=error)
+    logger.warning(f"Webhook batch {batch_id} to {endpoint.url} failed ({len(deliveries)} events, "
+                   f"{dead} dead-lettered): {error}")
+
+
+def deliver(endpoint_id, max_batches=20):
+    """
+    Sends due batches for one endpoint until none are left. Stops at the first
+    failure so an endpoint that is down isn't hammered. Returns (sent, failed) events.
+    """
+    sent, failed = 0, 0
+    for _ in range(max_batches):
+        claimed = claim(endpoint_id)
+        if claimed is None:
+            break
+        if send_batch(*claimed):
+            sent += len(claimed[2])
+        else:
+            failed += len(claimed[2])
+            break
+    return sent, failed
+
+
+def free_slots():
+    """
+    {endpoint_id: batches that may start now} for active endpoints with due deliveries.
+    """
+    now = timezone.now()
+    due = (WebhookDelivery.objects.filter(DUE, available_at__lte=now, endpoint__is_active=True)
+           .order_by().values_list('endpoint_id', flat=True).distinct())
+    slots = {}
+    for pk, limit in WebhookEndpoint.objects.filter(pk__in=list(due)).values_list('pk', 'max_concurrency'):
+        free = limit - in_flight(pk, now)
+        if free > 0:
+            slots[pk] = free
+    return slots
+
+
+def requeue(queryset):
+    """
+    Puts dead-lettered (or pending) deliveries back in line with a fresh attempt budget.
+    """
+    return queryset.filter(status__in=('DEAD', 'PENDING')).update(
+        status='PENDING', attempts=0, available_at=timezone.now(), batch_id=None
+    )
+
+
+def purge_sent(older_than_days=None):
+    days = older_than_days or getattr(settings, 'WEBHOOK_RETENTION_DAYS', 7)
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = WebhookDelivery.objects.filter(status='SENT', sent_at__lt=cutoff).delete()
+    return deleted
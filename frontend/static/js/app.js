@@ -0,0 +1,51 @@
+// Shared by every page. Pages are rendered by complaints.frontend, which embeds a bootstrap JSON
+// (API location, page URLs, the signed-in user's profile and the ministry list) so the first
+// paint doesn't wait for API round-trips.
+const GP = JSON.parse(document.getElementById('gp-bootstrap').textContent);
+const API_URL = GP.api_url;
+
+// --- Session ---
+
+function tokenExpiry(token) {
+    try { return JSON.parse(atob(token.split('.')[1].replace(/-/g, '+').replace(/_/g, '/'))).exp; } catch (e) { return null; }
+}
+
+// Tokens live in localStorage for API calls; the access token is mirrored in a cookie so the
+// next page load can embed the profile. The API itself never reads the cookie.
+function setSession(access, refresh) {
+    localStorage.setItem('accessToken', access);
+    if (refresh) localStorage.setItem('refreshToken', refresh);
+    const exp = tokenExpiry(access);
+    const maxAge = exp ? Math.max(exp - Math.floor(Date.now() / 1000), 0) : 300;
+    const secure = location.protocol === 'https:' ? '; Secure' : '';
+    document.cookie = `${GP.access_cookie}=${access}; Path=/; Max-Age=${maxAge}; SameSite=Strict${secure}`;
+}
+
+function clearSession() {
+    localStorage.clear();
+    document.cookie = `${GP.access_cookie}=; Path=/; Max-Age=0; SameSite=Strict`;
+    // Cached pages embed the profile of whoever was signed in
+    if ('caches' in window) caches.delete('gp-pages');
+}
+
+function logout() { clearSession(); window.location.href = GP.urls.login; }
+
+// Profile embedded in the page when the session cookie was valid, else one API call
+async function currentProfile(headers) {
+    if (GP.profile) return GP.profile;
+    const res = await fetch(`${API_URL}/profile/`, { headers });
+    if (!res.ok) throw new Error(`Profile request failed (${res.status})`);
+    GP.profile = await res.json();
+    return GP.profile;
+}
+
+// --- Formatting ---
+
+// Short code citizens quote to the phone desk (tracking ID prefix for older complaints)
+function trackingRef(c) { return c.short_code ? `${c.short_code.slice(0, 4)}-${c.short_code.slice(4)}` : `${c.tracking_id.substring(0,8)}...`; }
+
+// --- Offline support ---
+
+if ('serviceWorker' in navigator) {
+    window.addEventListener('load', () => navigator.serviceWorker.register(GP.urls.sw).catch(() => {}));
+}
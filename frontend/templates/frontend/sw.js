@@ -0,0 +1,79 @@
+// Gunaso Portal service worker (served by complaints.frontend.service_worker at the site root).
+// - App shell (hashed static files): precached, then cache-first; a new deploy means new URLs and a new version.
+// - Reference data (ministries, departments): stale-while-revalidate.
+// - Pages: network-first, falling back to the last copy when offline.
+// - Everything else, including all other API calls, goes straight to the network.
+const CONFIG = {{ config|safe }};
+const SHELL_CACHE = `gp-shell-${CONFIG.version}`;
+const DATA_CACHE = `gp-data-${CONFIG.version}`;
+const PAGE_CACHE = 'gp-pages';  // Cleared by app.js on logout: pages embed the user's profile
+
+self.addEventListener('install', (event) => {
+    event.waitUntil(caches.open(SHELL_CACHE).then((cache) => cache.addAll(CONFIG.shell)).then(() => self.skipWaiting()));
+});
+
+self.addEventListener('activate', (event) => {
+    const keep = [SHELL_CACHE, DATA_CACHE, PAGE_CACHE];
+    event.waitUntil(
+        caches.keys()
+            .then((names) => Promise.all(names.filter((n) => n.startsWith('gp-') && !keep.includes(n)).map((n) => caches.delete(n))))
+            .then(() => self.clients.claim())
+    );
+});
+
+async function cacheFirst(request) {
+    const cached = await caches.match(request);
+    if (cached) return cached;
+    const response = await fetch(request);
+    if (response.ok || response.type === 'opaque') {
+        const cache = await caches.open(SHELL_CACHE);
+        cache.put(request, response.clone());
+    }
+    return response;
+}
+
+async function staleWhileRevalidate(request) {
+    const cache = await caches.open(DATA_CACHE);
+    const cached = await cache.match(request);
+    const refresh = fetch(request).then((response) => {
+        if (response.ok) cache.put(request, response.clone());
+        return response;
+    });
+    if (cached) {
+        refresh.catch(() => {});
+        return cached;
+    }
+    return refresh;
+}
+
+async function networkFirst(request) {
+    const cache = await caches.open(PAGE_CACHE);
+    try {
+        const response = await fetch(request);
+        if (response.ok) cache.put(request, response.clone());
+        return response;
+    } catch (e) {
+        const cached = await cache.match(request, { ignoreSearch: true });
+        if (cached) return cached;
+        throw e;
+    }
+}
+
+self.addEventListener('fetch', (event) => {
+    const request = event.request;
+    if (request.method !== 'GET') return;
+    const url = new URL(request.url);
+
+    if (url.origin !== self.location.origin) {
+        // CDN copies of vendor assets not fetched locally yet (pinned URLs, so safe to keep)
+        if (CONFIG.cdnHosts.includes(url.host)) event.respondWith(cacheFirst(request));
+        return;
+    }
+    if (url.pathname.startsWith(CONFIG.staticUrl)) {
+        event.respondWith(cacheFirst(request));
+    } else if (CONFIG.referenceApi.includes(url.pathname)) {
+        event.respondWith(staleWhileRevalidate(request));
+    } else if (request.mode === 'navigate' && CONFIG.pages.includes(url.pathname)) {
+        event.respondWith(networkFirst(request));
+    }
+});
@@ -3,6 +3,7 @@ Django settings for grievance_portal project.
 """
 
 from pathlib import Path
+import importlib.util
 import os
 import dj_database_url
 from dotenv import load_dotenv
@@ -43,13 +44,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'complaints.middleware.InstrumentationMiddleware',  # Outermost: times the whole request
+    'complaints.middleware.ProfilingMiddleware',  # Opt-in cProfile + SQL trace (complaints/profiling.py)
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware', # Essential for serving static files
+    'complaints.middleware.CompressionMiddleware',  # Brotli/gzip for everything WhiteNoise doesn't serve
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'complaints.middleware.ReplicaStickyMiddleware',  # Reads after a write stay on the primary
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -59,7 +64,7 @@ ROOT_URLCONF = 'grievance_portal.urls'
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [],
+        'DIRS': [os.path.join(BASE_DIR, 'frontend', 'templates')],  # Portal pages (complaints/frontend.py)
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
@@ -75,13 +80,59 @@ TEMPLATES = [
 WSGI_APPLICATION = 'grievance_portal.wsgi.application'
 
 # Database
+# DB_POOL_MODE picks how processes hold PostgreSQL connections:
+#   persistent - one connection per thread, reused for CONN_MAX_AGE seconds (default)
+#   pool       - psycopg 3 connection pool per process, sized by DB_POOL_MIN_SIZE/DB_POOL_MAX_SIZE
+#   pgbouncer  - persistent connections to a PgBouncer in transaction mode (no server-side cursors)
+# Every process (gunicorn worker, Celery child) holds up to DB_POOL_MAX_SIZE connections per alias,
+# so processes x DB_POOL_MAX_SIZE must stay below the server's max_connections.
+DB_POOL_MODE = os.environ.get('DB_POOL_MODE', 'persistent').lower()
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 600))
+DB_POOL_MIN_SIZE = int(os.environ.get('DB_POOL_MIN_SIZE', 1))
+DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', 4))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))  # Seconds to wait for a free connection
+
+
+def database_config(config):
+    # Drop dead connections (e.g. after a failover) before a request uses them
+    config['CONN_HEALTH_CHECKS'] = True
+    config['CONN_MAX_AGE'] = DB_CONN_MAX_AGE
+    if config['ENGINE'] != 'django.db.backends.postgresql':
+        return config
+
+    # Same backend, plus connection/pool wait timing in /metrics
+    config['ENGINE'] = 'complaints.db_backend'
+    if DB_POOL_MODE == 'pool':
+        config['CONN_MAX_AGE'] = 0  # The pool keeps connections open instead
+        config.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': DB_POOL_MIN_SIZE,
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': DB_POOL_TIMEOUT,
+            'max_idle': 300,
+            'max_lifetime': 1800,
+        }
+    elif DB_POOL_MODE == 'pgbouncer':
+        # Named cursors do not survive transaction pooling
+        config['DISABLE_SERVER_SIDE_CURSORS'] = True
+    return config
+
+
 DATABASES = {
-    'default': dj_database_url.config(
-        default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}",
-        conn_max_age=600
-    )
+    'default': database_config(dj_database_url.config(default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}"))
 }
 
+# Read replicas: comma-separated URLs, e.g. DATABASE_REPLICA_URLS=postgres://...,postgres://...
+# Read-only views use them (see complaints/db_router.py); writes always go to 'default'.
+REPLICA_DATABASES = []
+for i, url in enumerate(u for u in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if u.strip()):
+    alias = f'replica_{i}'
+    DATABASES[alias] = database_config(dj_database_url.parse(url.strip()))
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['complaints.db_router.PrimaryReplicaRouter']
+REPLICA_STICKY_SECONDS = 10  # Reads stay on the primary this long after a user's write
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -107,11 +158,19 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 # Where Django looks for your custom static files (images, css) during development
 # AND where it copies them from during 'collectstatic'
 STATICFILES_DIRS = [
-    os.path.join(BASE_DIR, 'frontend'), # Since your images are in MOEST Project/frontend/images
+    os.path.join(BASE_DIR, 'frontend', 'static'),  # Portal images, scripts and fetched vendor assets
 ]
 
-# WhiteNoise Storage - Compression and Caching
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# WhiteNoise Storage - Compression and Caching: hashed file names (served with far-future
+# immutable headers) plus gzip/Brotli copies written by collectstatic.
+# STORAGES replaces STATICFILES_STORAGE, which Django 5.1+ no longer reads.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+}
+
+# Portal pages (complaints/frontend.py)
+FRONTEND_REFERENCE_CACHE_SECONDS = 300  # Ministry list embedded in every page
 
 # Media Files (User Uploads)
 MEDIA_URL = '/media/'
@@ -122,15 +181,95 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework Settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'complaints.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'complaints.renderers.InstrumentedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10
 }
 
+# msgpack responses (Accept: application/msgpack) when the package is installed
+if importlib.util.find_spec('msgpack'):
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] += ('complaints.renderers.MsgPackRenderer',)
+
+COMPLAINT_EXPORT_MAX_ROWS = 5000  # Rows returned by /api/complaints/export/
+BROTLI_QUALITY = 5  # 0-11; 4-6 balances CPU and size for dynamic responses
+
+SIMPLE_JWT = {
+    # Adds role/ministry_id/department_id claims to issued tokens
+    'TOKEN_OBTAIN_SERIALIZER': 'complaints.serializers.PortalTokenObtainPairSerializer',
+}
+
+# Cache Configuration (Redis when available, per-process memory otherwise)
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# The sticky-to-primary flag lives in the cache: per-process memory can't share it between workers
+if REPLICA_DATABASES and not os.environ.get('REDIS_URL'):
+    from django.core.exceptions import ImproperlyConfigured
+    raise ImproperlyConfigured('DATABASE_REPLICA_URLS requires REDIS_URL (a cache shared by all web workers).')
+
+# Seconds an authenticated user + profile stays cached (0 disables the cache). Role, ministry and
+# deactivation changes reach every worker at once only through Redis; per-process memory keeps
+# serving the old entry in other workers until it expires, hence the shorter default there.
+AUTH_USER_CACHE_TIMEOUT = int(os.environ.get('AUTH_USER_CACHE_TIMEOUT', 60 if os.environ.get('REDIS_URL') else 5))
+
+# Instrumentation (see complaints/middleware.py and `manage.py perf_report`)
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True') == 'True'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+METRICS_FLUSH_INTERVAL = 10  # Seconds between per-process snapshot publishes
+SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', 1000))
+
+# On-demand profiling: super admins add `X-Profile: 1`; profiles are listed in the admin
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'True') == 'True'
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0))  # Fraction of all requests
+PROFILING_TASK_SAMPLE_RATES = {}  # e.g. {'complaints.tasks.process_complaint_ai': 0.01}; or `manage.py profile_next`
+PROFILING_MAX_QUERIES = 500  # SQL statements kept per profile
+PROFILING_RETENTION_DAYS = 7
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {'format': '{asctime} {levelname} {name}: {message}', 'style': '{'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'simple'},
+    },
+    'root': {'handlers': ['console'], 'level': 'WARNING'},
+    'loggers': {
+        'complaints': {'handlers': ['console'], 'level': os.environ.get('LOG_LEVEL', 'INFO'), 'propagate': False},
+    },
+}
+
+# Complaint routing (see complaints/routing.py)
+ROUTING_AUTO_ASSIGN_SCORE = 2  # Minimum rule score to auto-assign a department; 0 = suggest only
+ROUTING_VERSION_CHECK_SECONDS = 30  # How often each process checks for rule changes
+
+# Transactional outbox (see complaints/outbox.py and `manage.py outbox_relay`)
+OUTBOX_PUBLISH_ON_COMMIT = True  # Try publishing right after commit; the relay retries failures
+OUTBOX_CIRCUIT_SECONDS = 30  # Skip immediate publishing this long after a broker failure
+OUTBOX_MAX_ATTEMPTS = 10
+OUTBOX_RETRY_BASE_SECONDS = 5
+OUTBOX_RETRY_MAX_SECONDS = 900
+
 # Celery Configuration
 CELERY_BROKER_URL = os.environ.get('REDIS_URL', 'memory://')
 CELERY_RESULT_BACKEND = 'django-db'
@@ -139,6 +278,142 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Asia/Kathmandu'
 
+# CELERY_TASK_ALWAYS_EAGER=True runs tasks inline (local dev without a worker), AI calls included,
+# inside the request that enqueued them. Off by default, also without Redis.
+CELERY_TASK_ALWAYS_EAGER = os.environ.get('CELERY_TASK_ALWAYS_EAGER', 'False') == 'True'
+CELERY_TASK_EAGER_PROPAGATES = True
+
+# Most tasks are fire-and-forget: don't write a django-db result row for each one
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_RESULT_EXPIRES = 60 * 60 * 24
+
+# Queues: a slow Gemini backlog must never delay notification emails.
+# Start one worker pool per queue profile (see Procfile).
+CELERY_TASK_DEFAULT_QUEUE = 'default'
+CELERY_TASK_ROUTES = {
+    'complaints.tasks.process_complaint_ai': {'queue': 'ai'},
+    'complaints.tasks.triage_*': {'queue': 'ai'},
+    'complaints.tasks.send_*': {'queue': 'notifications'},
+    'complaints.tasks.escalate_overdue_complaints': {'queue': 'notifications'},
+    'complaints.tasks.import_*': {'queue': 'imports'},
+    'complaints.tasks.update_analytics_rollups': {'queue': 'analytics'},
+    'complaints.tasks.archive_old_complaints': {'queue': 'analytics'},
+    'complaints.tasks.purge_sync_tombstones': {'queue': 'analytics'},
+    'complaints.tasks.purge_request_profiles': {'queue': 'analytics'},
+    'complaints.tasks.dispatch_webhooks': {'queue': 'webhooks'},
+    'complaints.tasks.deliver_webhook_batches': {'queue': 'webhooks'},
+    'complaints.tasks.purge_webhook_deliveries': {'queue': 'analytics'},
+    'complaints.tasks.generate_ministry_report': {'queue': 'reports'},
+    'complaints.tasks.request_monthly_reports': {'queue': 'reports'},
+}
+
+# Workers reserve one task at a time so a long AI call doesn't hold a queue of others hostage
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_TASK_ACKS_LATE = True
+CELERY_TASK_REJECT_ON_WORKER_LOST = True
+CELERY_TASK_TIME_LIMIT = 600  # Hard ceiling for any task (seconds)
+CELERY_BROKER_CONNECTION_TIMEOUT = 3
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'visibility_timeout': 3600,  # Must exceed the longest task when acks_late is on
+    'socket_connect_timeout': 3,
+    'socket_timeout': 10,
+}
+
+# AI triage backend (complaints.ai); SDKs are imported lazily by the provider
+# Tiered: local classifier first, low-confidence cases escalated to Gemini
+AI_PROVIDER = os.environ.get('AI_PROVIDER', 'complaints.ai.TieredProvider')
+AI_ESCALATION_PROVIDER = 'complaints.ai.GeminiProvider'
+AI_GEMINI_MODEL = os.environ.get('AI_GEMINI_MODEL', 'gemini-2.5-flash-preview-09-2025')
+AI_LOCAL_MODEL_PATH = os.environ.get('AI_LOCAL_MODEL_PATH', str(BASE_DIR / 'var' / 'triage_model.json'))
+AI_LOCAL_CONFIDENCE = float(os.environ.get('AI_LOCAL_CONFIDENCE', 0.8))  # Below this, ask the LLM
+AI_TRIAGE_BATCH_SIZE = 1000
+
+# Per-task limits for the Gemini triage task
+AI_TASK_RATE_LIMIT = os.environ.get('AI_TASK_RATE_LIMIT', '60/m')  # Per worker process
+AI_TASK_SOFT_TIME_LIMIT = 90
+AI_TASK_TIME_LIMIT = 120
+
+# Periodic tasks (run with `celery -A grievance_portal beat`)
+CELERY_BEAT_SCHEDULE = {
+    'update-analytics-rollups': {
+        'task': 'complaints.tasks.update_analytics_rollups',
+        'schedule': 600.0,  # Every 10 minutes
+    },
+    'escalate-overdue-complaints': {
+        'task': 'complaints.tasks.escalate_overdue_complaints',
+        'schedule': 60.0,
+    },
+    'send-admin-digests': {
+        'task': 'complaints.tasks.send_admin_digests',
+        'schedule': 900.0,  # Each admin still gets at most one digest per chosen period
+    },
+    'archive-old-complaints': {
+        'task': 'complaints.tasks.archive_old_complaints',
+        'schedule': 60 * 60 * 24,  # Daily
+    },
+    'purge-sync-tombstones': {
+        'task': 'complaints.tasks.purge_sync_tombstones',
+        'schedule': 60 * 60 * 24,  # Daily
+    },
+    'purge-request-profiles': {
+        'task': 'complaints.tasks.purge_request_profiles',
+        'schedule': 60 * 60 * 24,  # Daily
+    },
+    'dispatch-webhooks': {
+        'task': 'complaints.tasks.dispatch_webhooks',
+        'schedule': 10.0,
+    },
+    'purge-webhook-deliveries': {
+        'task': 'complaints.tasks.purge_webhook_deliveries',
+        'schedule': 60 * 60 * 24,  # Daily
+    },
+    'request-monthly-reports': {
+        'task': 'complaints.tasks.request_monthly_reports',
+        'schedule': 60 * 60 * 24,  # Daily: late changes to last month are picked up, unchanged reports aren't rebuilt
+    },
+}
+
+# SLA: resolution deadline (hours) per AI-suggested priority; None = not yet triaged
+SLA_HOURS = {'HIGH': 72, 'MEDIUM': 168, 'LOW': 336, None: 168}
+SLA_BATCH_SIZE = 500  # Complaints escalated per transaction
+SLA_MAX_BATCHES = 20  # Upper bound per beat run
+
+# Admin digests (complaints/digests.py); frequency is a per-user preference on UserProfile
+DIGEST_MAX_ITEMS = 20  # Complaints listed per email (the rest are counted)
+
+# Delta sync (/api/sync/, complaints/sync.py)
+SYNC_MAX_PAGE_SIZE = 500  # Rows per stream per response
+SYNC_TOMBSTONE_DAYS = 30  # Clients offline longer than this get reset=true and resync
+
+# Complaint event log
+EVENT_TIMELINE_PAGE_SIZE = 100  # Max events per /timeline/ page
+
+# Outbound webhooks (complaints/webhooks.py); per-endpoint batch size and concurrency live on WebhookEndpoint
+WEBHOOK_GAP_SECONDS = 900  # Event ids skipped while uncommitted are re-checked this long (longer than any transaction)
+WEBHOOK_TIMEOUT_SECONDS = 10
+WEBHOOK_LEASE_SECONDS = 60  # A batch not finished by then is retried by another worker
+WEBHOOK_MAX_ATTEMPTS = 12  # Then the delivery is dead-lettered (status DEAD)
+WEBHOOK_RETRY_BASE_SECONDS = 10
+WEBHOOK_RETRY_MAX_SECONDS = 3600
+WEBHOOK_MAX_BATCHES_PER_TASK = 20
+WEBHOOK_RETENTION_DAYS = 7  # Delivered rows are purged after this
+
+# Ministry reports (complaints/reports.py): built by a Celery job, files cached by data fingerprint
+REPORT_FRESH_SECONDS = 300  # A report verified this recently is served without re-checking its data
+REPORT_LEASE_SECONDS = 1800  # A build not finished by then may be requested again
+REPORT_CHUNK_SIZE = 2000  # Complaints fetched per query while streaming the listing
+REPORT_PDF_MAX_ROWS = 2000  # Complaints listed in the PDF; the XLSX lists them all
+REPORT_SCHEDULED_FORMATS = ('xlsx', 'pdf')  # Built for every ministry after each month
+
+# Bulk intake of offline complaints (complaints/intake.py)
+INTAKE_MAX_ROWS = 20000  # Rows accepted per file or request
+INTAKE_CHUNK_SIZE = 1000  # Complaints inserted per transaction (and per batch triage job)
+
+# Archival: closed complaints older than this move to the archive tables (complaints/archive.py)
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 365))
+ARCHIVE_BATCH_SIZE = 500  # Complaints per transaction
+ARCHIVE_MAX_BATCHES = 100  # Upper bound per beat run
+
 # Email Configuration
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
@@ -152,6 +427,10 @@ if not EMAIL_HOST_USER:
     EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
 # Django Jazzmin Settings
+# Admin changelists switch to planner estimates above this many rows (PostgreSQL only)
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 100000
+ADMIN_INLINE_UPDATES_LIMIT = 20  # Newest updates shown inline on a complaint
+
 JAZZMIN_SETTINGS = {
     "site_title": "Gunaso Portal Admin",
     "site_header": "Gunaso Portal",
@@ -6,6 +6,11 @@ from django.urls import path, include
 from django.conf import settings  # Import settings
 from django.conf.urls.static import static  # Import static
 
+from django.views.generic import RedirectView
+
+from complaints import frontend
+from complaints.views import metrics_view
+
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
@@ -24,6 +29,22 @@ urlpatterns = [
 
     # 4. API Auth (Browsing)
     path('api-auth/', include('rest_framework.urls')),
+
+    # 5. Prometheus metrics
+    path('metrics', metrics_view, name='metrics'),
+
+    # 6. Portal pages and their service worker (served from the root so it can control every page)
+    path('', frontend.page, {'name': 'index'}, name='frontend-index'),
+    path('login/', frontend.page, {'name': 'login'}, name='frontend-login'),
+    path('register/', frontend.page, {'name': 'register'}, name='frontend-register'),
+    path('dashboard/', frontend.page, {'name': 'dashboard'}, name='frontend-dashboard'),
+    path('sw.js', frontend.service_worker, name='frontend-sw'),
+
+    # Old links to the static .html pages
+    path('index.html', RedirectView.as_view(pattern_name='frontend-index')),
+    path('login.html', RedirectView.as_view(pattern_name='frontend-login')),
+    path('register.html', RedirectView.as_view(pattern_name='frontend-register')),
+    path('admin_dashboard.html', RedirectView.as_view(pattern_name='frontend-dashboard')),
 ]
 
 # --- THE FIX: Serve user-uploaded media files in development ---